@@ -0,0 +1,2 @@
+"""Benchmark suite for the To-Do Application"""
+# benchmarks/__init__.py
@@ -0,0 +1,65 @@
+"""Entry Point script - Runs the benchmarks with python -m benchmarks"""
+# benchmarks/__main__.py
+
+import json
+import tempfile
+from pathlib import Path
+from typing import List, Optional
+
+import typer
+
+from benchmarks.compare import compare_runs, format_change
+from benchmarks.generate import PROFILES
+from benchmarks.run import BENCHMARKS, run_benchmarks
+from todo import database
+
+app = typer.Typer()
+
+@app.command()
+def run(
+    output: Optional[Path] = typer.Option(None, "--output", "-o", help="JSON file to write the results to. Default: standard output"),
+    sizes: List[int] = typer.Option([1000, 10000, 100000], "--size", "-s", help="Number of to-dos in the generated database. Repeat for several sizes, up to 1000000"),
+    backends: List[str] = typer.Option(list(database.BACKENDS), "--backend", "-b", help="Storage backend to benchmark. Repeat for several backends"),
+    profile: str = typer.Option("uniform", "--profile", "-p", help=f"Shape of the generated to-dos: {', '.join(PROFILES)}"),
+    repeat: int = typer.Option(5, "--repeat", "-r", min=1, help="Timed runs per benchmark"),
+    only: List[str] = typer.Option([], "--only", help="Run only the benchmarks whose name starts with this prefix, such as todoer or cli.list"),
+) -> None:
+    """Time the handlers, the Todoer methods and the CLI commands"""
+    if profile not in PROFILES:
+        typer.secho(f'Unknown profile "{profile}", choose one of: {", ".join(PROFILES)}', fg=typer.colors.RED)
+        raise typer.Exit(1)
+    unknown = [backend for backend in backends if backend not in database.BACKENDS]
+    if unknown:
+        typer.secho(f'Unknown backend "{unknown[0]}", choose one of: {", ".join(database.BACKENDS)}', fg=typer.colors.RED)
+        raise typer.Exit(1)
+    if only and not any(name.startswith(prefix) for name in BENCHMARKS for prefix in only):
+        typer.secho(f"No benchmark matches {', '.join(only)}", fg=typer.colors.RED)
+        raise typer.Exit(1)
+    with tempfile.TemporaryDirectory(prefix="todo-bench-") as work_dir:
+        report = run_benchmarks(Path(work_dir), sizes, backends, profile, repeat, only)
+    text = json.dumps(report, indent=4)
+    if output is None:
+        typer.echo(text)
+    else:
+        output.write_text(text + "\n")
+        typer.secho(f"{len(report['results'])} results written to {output}", fg=typer.colors.GREEN)
+
+@app.command()
+def compare(
+    old: Path = typer.Argument(..., help="Results of the earlier run"),
+    new: Path = typer.Argument(..., help="Results of the later run"),
+    threshold: float = typer.Option(0.2, "--threshold", "-t", help="Relative slowdown reported as a regression"),
+    min_ms: float = typer.Option(1.0, "--min-ms", help="Slowdowns smaller than this many milliseconds are never regressions"),
+) -> None:
+    """Compare two runs and exit with status 1 if anything regressed"""
+    changes = compare_runs(json.loads(old.read_text()), json.loads(new.read_text()), threshold, min_ms / 1000)
+    typer.echo(f"{'benchmark':<32}{'backend':<9}{'size':>9}{'old':>14}{'new':>14}{'ratio':>9}")
+    for change in changes:
+        typer.secho(format_change(change), fg=typer.colors.RED if change.regression else None)
+    regressions = sum(change.regression for change in changes)
+    if regressions:
+        typer.secho(f"{regressions} regression(s) above {threshold:.0%}", fg=typer.colors.RED)
+        raise typer.Exit(1)
+
+if __name__ == "__main__":
+    app(prog_name="benchmarks")
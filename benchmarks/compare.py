@@ -0,0 +1,41 @@
+"""This module compares two benchmark runs and flags regressions"""
+# benchmarks/compare.py
+
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+class Change(NamedTuple):                                                           # one benchmark present in both runs
+    name: str
+    backend: str
+    size: int
+    old: float                                                                      # best time of the old run, in seconds
+    new: float
+    regression: bool
+
+def _key(result: Dict[str, Any]) -> Tuple[str, str, int, str]:
+    return result["name"], result["backend"], result["size"], result.get("profile", "uniform")
+
+def compare_runs(
+    old: Dict[str, Any],
+    new: Dict[str, Any],
+    threshold: float = 0.2,
+    min_seconds: float = 0.001,
+) -> List[Change]:
+    """Return the benchmarks of both runs, flagging those that got slower by more than threshold"""
+    old_results = {_key(result): result for result in old["results"]}
+    changes = []
+    for result in new["results"]:
+        previous: Optional[Dict[str, Any]] = old_results.get(_key(result))
+        if previous is None:                                                        # benchmarks added since the old run have nothing to compare with
+            continue
+        old_time, new_time = previous["best"], result["best"]                       # the best of several runs is the least noisy figure
+        regression = new_time > old_time * (1 + threshold) and new_time - old_time > min_seconds  # tiny absolute differences are timer noise, whatever their ratio
+        changes.append(Change(result["name"], result["backend"], result["size"], old_time, new_time, regression))
+    return changes
+
+def format_change(change: Change) -> str:
+    ratio = change.new / change.old if change.old else float("inf")
+    flag = "REGRESSION" if change.regression else ""
+    return (
+        f"{change.name:<32}{change.backend:<9}{change.size:>9}"
+        f"{change.old * 1000:>12.2f}ms{change.new * 1000:>12.2f}ms{ratio:>8.2f}x  {flag}"
+    ).rstrip()
@@ -0,0 +1,47 @@
+"""This module generates synthetic to-do databases for the benchmarks"""
+# benchmarks/generate.py
+
+import random
+from pathlib import Path
+from typing import Any, Dict, Iterator, NamedTuple, Tuple
+
+from todo import database
+
+WORDS = (
+    "buy", "milk", "call", "mom", "review", "deploy", "billing", "service", "fix", "bug",
+    "write", "report", "book", "flight", "pay", "rent", "clean", "kitchen", "walk", "dog",
+    "update", "notes", "plan", "sprint", "renew", "passport", "water", "plants", "order", "parts",
+    "refactor", "parser", "email", "team", "schedule", "dentist", "backup", "laptop", "read", "paper",
+)
+
+class Profile(NamedTuple):                                                          # the shape of a generated to-do list
+    priority_weights: Tuple[int, int, int]                                          # relative frequency of priorities 1, 2 and 3
+    done_ratio: float                                                               # share of to-dos marked done
+    description_words: Tuple[int, int, int]                                         # fewest, most common and most words per description
+
+PROFILES = {
+    "uniform": Profile((1, 1, 1), 0.5, (1, 4, 12)),
+    "backlog": Profile((1, 6, 3), 0.1, (2, 6, 40)),                                 # mostly open, mostly priority 2, a long tail of long descriptions
+    "done": Profile((3, 2, 1), 0.9, (1, 3, 8)),                                     # an old list where almost everything is done
+}
+
+def generate_todos(count: int, profile: str = "uniform", seed: int = 0) -> Iterator[Dict[str, Any]]:
+    """Yield count synthetic to-dos shaped by the named profile"""
+    shape = PROFILES[profile]
+    rng = random.Random(seed)                                                       # seeded, so every run benchmarks the same list
+    low, mode, high = shape.description_words
+    for n in range(count):
+        length = round(rng.triangular(low, high, mode))
+        description = " ".join(rng.choice(WORDS) for _ in range(length))
+        yield {
+            "Description": f"{description.capitalize()} #{n}.",                     # the number keeps descriptions distinct
+            "Priority": rng.choices((1, 2, 3), shape.priority_weights)[0],
+            "Done": rng.random() < shape.done_ratio,
+        }
+
+def write_database(
+    db_path: Path, backend: str, count: int, profile: str = "uniform", seed: int = 0
+) -> int:
+    """Write a synthetic database with count to-dos and return the error code"""
+    handler = database.get_handler(db_path, backend)
+    return handler.write_todos(list(generate_todos(count, profile, seed))).error
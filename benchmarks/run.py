@@ -0,0 +1,207 @@
+"""This module times the handlers, the Todoer methods and the CLI commands"""
+# benchmarks/run.py
+
+import platform
+import shutil
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+from typer.testing import CliRunner
+
+from benchmarks.generate import write_database
+from todo import __version__, cli, config, database, todo
+
+Prepare = Callable[[Path, str, int], Callable[[], Any]]                             # gets a fresh copy of the database, its backend and its size, and returns the operation to time
+
+BENCHMARKS: Dict[str, Prepare] = {}
+PAGE_SIZE = 50                                                                      # the page size used by the paging benchmarks
+BATCH_SIZE = 100                                                                    # the number of to-dos touched by the batch benchmarks
+
+def benchmark(name: str) -> Callable[[Prepare], Prepare]:                           # registers a benchmark under the name it is reported with
+    def register(prepare: Prepare) -> Prepare:
+        BENCHMARKS[name] = prepare
+        return prepare
+    return register
+
+def middle(size: int) -> int:
+    return size // 2 + 1
+
+def batch(size: int) -> List[int]:                                                  # spread over the whole list, so no backend gets only cheap positions
+    step = max(size // BATCH_SIZE, 1)
+    return list(range(1, size + 1, step))[:BATCH_SIZE]
+
+@benchmark("handler.read_todos")
+def _read_todos(db_path: Path, backend: str, size: int) -> Callable[[], Any]:
+    return database.get_handler(db_path, backend).read_todos
+
+@benchmark("handler.write_todos")
+def _write_todos(db_path: Path, backend: str, size: int) -> Callable[[], Any]:
+    handler = database.get_handler(db_path, backend)
+    todo_list = handler.read_todos().todo_list
+    return lambda: handler.write_todos(todo_list)
+
+@benchmark("handler.iter_todos")
+def _iter_todos(db_path: Path, backend: str, size: int) -> Callable[[], Any]:
+    handler = database.get_handler(db_path, backend)
+    return lambda: sum(1 for _ in handler.iter_todos())
+
+@benchmark("handler.iter_todos.last_page")
+def _iter_last_page(db_path: Path, backend: str, size: int) -> Callable[[], Any]:   # the newest to-dos, as printed by "todo list -o new_to_old --limit 50"
+    handler = database.get_handler(db_path, backend)
+    return lambda: list(zip(range(PAGE_SIZE), handler.iter_todos(reverse=True)))
+
+@benchmark("todoer.get_todo_list")
+def _get_todo_list(db_path: Path, backend: str, size: int) -> Callable[[], Any]:
+    return todo.Todoer(db_path, backend).get_todo_list
+
+@benchmark("todoer.load_table")
+def _load_table(db_path: Path, backend: str, size: int) -> Callable[[], Any]:
+    return todo.Todoer(db_path, backend).load_table
+
+@benchmark("todoer.add")
+def _add(db_path: Path, backend: str, size: int) -> Callable[[], Any]:
+    todoer = todo.Todoer(db_path, backend)
+    return lambda: todoer.add(["Benchmark", "the", "add", "command"], 2)
+
+@benchmark("todoer.add_many")
+def _add_many(db_path: Path, backend: str, size: int) -> Callable[[], Any]:
+    todoer = todo.Todoer(db_path, backend)
+    descriptions = [["Batch", "item", str(n)] for n in range(BATCH_SIZE)]
+    return lambda: todoer.add_many(descriptions, 2)
+
+@benchmark("todoer.import_todos")
+def _import_todos(db_path: Path, backend: str, size: int) -> Callable[[], Any]:
+    todoer = todo.Todoer(db_path, backend)
+    todos = [{"Description": f"Imported item {n}.", "Priority": 2, "Done": False} for n in range(BATCH_SIZE)]
+    return lambda: todoer.import_todos(iter(todos))
+
+@benchmark("todoer.set_done")
+def _set_done(db_path: Path, backend: str, size: int) -> Callable[[], Any]:
+    todoer = todo.Todoer(db_path, backend)
+    return lambda: todoer.set_done(middle(size))
+
+@benchmark("todoer.set_undone")
+def _set_undone(db_path: Path, backend: str, size: int) -> Callable[[], Any]:
+    todoer = todo.Todoer(db_path, backend)
+    return lambda: todoer.set_undone(middle(size))
+
+@benchmark("todoer.set_done_many")
+def _set_done_many(db_path: Path, backend: str, size: int) -> Callable[[], Any]:
+    todoer = todo.Todoer(db_path, backend)
+    return lambda: todoer.set_done_many(batch(size))
+
+@benchmark("todoer.remove")
+def _remove(db_path: Path, backend: str, size: int) -> Callable[[], Any]:
+    todoer = todo.Todoer(db_path, backend)
+    return lambda: todoer.remove(middle(size))
+
+@benchmark("todoer.remove_many")
+def _remove_many(db_path: Path, backend: str, size: int) -> Callable[[], Any]:
+    todoer = todo.Todoer(db_path, backend)
+    return lambda: todoer.remove_many(batch(size))
+
+@benchmark("todoer.remove_all")
+def _remove_all(db_path: Path, backend: str, size: int) -> Callable[[], Any]:
+    return todo.Todoer(db_path, backend).remove_all
+
+@benchmark("todoer.search_text.build")
+def _search_build(db_path: Path, backend: str, size: int) -> Callable[[], Any]:     # the first search, which builds the text index
+    todoer = todo.Todoer(db_path, backend)
+    return lambda: todoer.search_text("deploy")
+
+@benchmark("todoer.search_text")
+def _search(db_path: Path, backend: str, size: int) -> Callable[[], Any]:
+    todoer = todo.Todoer(db_path, backend)
+    todoer.search_text("deploy")                                                    # builds the index outside the timed call
+    return lambda: todoer.search_text("billing service")
+
+@contextmanager
+def configured(work_dir: Path) -> Iterator[None]:                                   # points the application's config file at the benchmark's scratch directory
+    saved = config.CONFIG_DIR_PATH, config.CONFIG_FILE_PATH
+    config.CONFIG_DIR_PATH, config.CONFIG_FILE_PATH = work_dir, work_dir/"config.ini"
+    try:
+        yield
+    finally:
+        config.CONFIG_DIR_PATH, config.CONFIG_FILE_PATH = saved
+
+def command(*args: str) -> Prepare:                                                 # a benchmark running one CLI command end to end through Typer
+    def prepare(db_path: Path, backend: str, size: int) -> Callable[[], Any]:
+        config.init_app(str(db_path), backend)
+        argv = [arg.format(middle=middle(size), last=size) for arg in args]
+        runner = CliRunner()
+        def invoke() -> None:
+            result = runner.invoke(cli.app, argv)
+            if result.exit_code != 0:
+                raise RuntimeError(f"todo {' '.join(argv)} failed: {result.output}")
+        return invoke
+    return prepare
+
+CLI_BENCHMARKS = {
+    "cli.list": ("list", "--limit", "50"),
+    "cli.list.jsonl": ("list", "--format", "jsonl"),
+    "cli.sort": ("sort", "--order", "des", "--format", "jsonl"),
+    "cli.sort.top": ("sort", "--by", "done,-priority", "--limit", "20"),
+    "cli.search.text": ("search", "--text", "billing"),
+    "cli.search.priority": ("search", "--priority", "1", "--format", "jsonl"),
+    "cli.search.query": ("search", "--query", "id < 100 and priority = 1 and not done", "--format", "jsonl"),
+    "cli.stats": ("stats",),
+    "cli.export": ("export",),
+    "cli.add": ("add", "Benchmark", "the", "CLI"),
+    "cli.mark_done": ("mark_done", "{middle}"),
+    "cli.remove": ("remove", "{middle}", "--force"),
+}
+for _name, _args in CLI_BENCHMARKS.items():
+    benchmark(_name)(command(*_args))
+
+def run_benchmarks(
+    work_dir: Path,
+    sizes: Sequence[int],
+    backends: Sequence[str],
+    profile: str = "uniform",
+    repeat: int = 5,
+    only: Optional[Sequence[str]] = None,
+) -> Dict[str, Any]:
+    """Time every benchmark for each backend and size and return the results"""
+    results = []
+    names = [name for name in BENCHMARKS if not only or any(name.startswith(prefix) for prefix in only)]
+    with configured(work_dir):
+        for backend in backends:
+            for size in sizes:
+                pristine = work_dir/f"{backend}-{size}"
+                pristine.mkdir(parents=True, exist_ok=True)
+                write_database(pristine/"todo.db", backend, size, profile)          # generated once, then copied before every run
+                for name in names:
+                    runs = [_time_once(BENCHMARKS[name], pristine, work_dir/"run", backend, size) for _ in range(repeat)]
+                    results.append({
+                        "name": name,
+                        "backend": backend,
+                        "size": size,
+                        "profile": profile,
+                        "best": min(runs),
+                        "median": statistics.median(runs),
+                        "runs": runs,
+                    })
+                shutil.rmtree(pristine)
+    return {
+        "meta": {
+            "version": __version__,
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+def _time_once(prepare: Prepare, pristine: Path, run_dir: Path, backend: str, size: int) -> float:
+    shutil.rmtree(run_dir, ignore_errors=True)
+    shutil.copytree(pristine, run_dir)                                              # every run starts from the same database, without a text index
+    operation = prepare(run_dir/"todo.db", backend, size)
+    start = time.perf_counter()
+    operation()
+    return time.perf_counter() - start
@@ -0,0 +1,55 @@
+import asyncio
+import threading
+
+import pytest
+
+from todo import ID_ERROR, SUCCESS, database
+from todo.aio import AsyncTodoer
+
+@pytest.fixture(params=database.BACKENDS)
+def async_todoer(request, tmp_path):                                            # an empty database of every backend
+    db_file = tmp_path/"todo.db"
+    database.init_database(db_file, request.param)
+    return AsyncTodoer(db_file, request.param)
+
+def test_concurrent_mutations_share_one_commit(async_todoer, monkeypatch):
+    todoer = async_todoer._todoer
+    groups = []
+    commit_ops = todoer.commit_ops
+    monkeypatch.setattr(todoer, "commit_ops", lambda ops: groups.append(len(ops)) or commit_ops(ops))
+    async def main():
+        async with async_todoer:
+            added = await asyncio.gather(*(async_todoer.add([f"Task {n}"]) for n in range(20)))
+            assert [current.todo["ID"] for current in added] == list(range(1, 21))
+            done, missing, removed = await asyncio.gather(
+                async_todoer.set_done(3), async_todoer.set_done(99), async_todoer.remove(20),
+            )
+            assert (done.error, missing.error, removed.error) == (SUCCESS, ID_ERROR, SUCCESS)
+            return await async_todoer.get_todo_list()
+    todo_list = asyncio.run(main())
+    assert groups == [20, 3]                                                    # one read-modify-write per group of mutations arriving together
+    assert len(todo_list) == 19 and todo_list[2]["Done"] is True
+    assert todoer.stats(verify=True).consistent
+
+def test_readers_share_one_load(async_todoer, monkeypatch):
+    todoer = async_todoer._todoer
+    todoer.add_many([["Get milk"], ["Wash the car"]])
+    loads = []
+    release = threading.Event()
+    get_todo_list = todoer.get_todo_list
+    def slow_load():
+        loads.append(1)
+        release.wait(5)
+        return get_todo_list()
+    monkeypatch.setattr(todoer, "get_todo_list", slow_load)
+    async def main():
+        async with async_todoer:
+            readers = [asyncio.ensure_future(async_todoer.get_todo_list()) for _ in range(10)]
+            await asyncio.sleep(0.01)                                           # the event loop stays free while the load runs
+            release.set()
+            lists = await asyncio.gather(*readers)
+            assert all(todo_list is lists[0] for todo_list in lists)
+            await async_todoer.add(["Pay rent"])
+            return await async_todoer.get_todo_list()
+    assert len(asyncio.run(main())) == 3                                        # a read after a commit loads the list again
+    assert len(loads) == 2
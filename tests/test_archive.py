@@ -0,0 +1,86 @@
+import json
+
+import pytest
+from typer.testing import CliRunner
+
+from todo import archive, cli, config, database, query, todo
+
+runner = CliRunner()
+
+@pytest.fixture(params=database.BACKENDS)
+def mock_config(request, tmp_path, monkeypatch):                                # a database of every backend with six to-dos, three of them done
+    monkeypatch.setattr(config, "CONFIG_DIR_PATH", tmp_path)
+    monkeypatch.setattr(config, "CONFIG_FILE_PATH", tmp_path/"config.ini")
+    db_file = tmp_path/"todo.db"
+    config.init_app(str(db_file), request.param)
+    database.init_database(db_file, request.param)
+    todoer = todo.Todoer(db_file, request.param)
+    todoer.add_many([[f"Task {n}"] for n in range(1, 7)], tags=["ops"])
+    todoer.set_done_many([2, 3, 6])
+    return todoer
+
+def archived_ids(todoer):
+    return [found["ID"] for found in archive.Archive(todoer._db_path).iter_todos()]
+
+def test_archive_moves_done_todos(mock_config):
+    assert mock_config.archive(done_over=50) == database.CountResponse(0, todo.SUCCESS)  # three of six is not over half
+    assert mock_config.archive(compression="xz") == database.CountResponse(3, todo.SUCCESS)
+    assert [found["ID"] for found in mock_config.get_todo_list()] == [1, 4, 5]
+    assert mock_config.stats(verify=True).consistent
+    assert mock_config.add(["Task 7"]).todo["ID"] == 7                          # the ID of the archived last to-do isn't given out again
+    mock_config.set_done(4)
+    assert mock_config.archive().count == 1
+    assert [path.name for path in archive.Archive(mock_config._db_path).segments()] == ["000001.jsonl.xz", "000002.jsonl.gz"]
+    assert archived_ids(mock_config) == [2, 3, 4, 6]                            # the segments are merged in ID order
+
+def test_indexes_follow_archive(mock_config):
+    matching = query.compile_query(query.tag_filter(["ops"]))
+    assert len(mock_config.query(matching)) == 6
+    mock_config.archive()
+    assert [todo_id for todo_id, _ in mock_config.query(matching)] == [1, 4, 5]
+    assert [todo_id for todo_id, _ in mock_config.search_text("task")] == [1, 4, 5]
+
+def test_compile_filter():
+    todo_item = {"ID": 7, "Description": "Deploy the db.", "Priority": 1, "Done": True, "Tags": ["ops"]}
+    for text, expected in [
+        ('text~"ploy" and tag=ops', True),
+        ('words~"ploy"', False),
+        ("priority<=1 and done and id>5", True),
+        ("not done or tag!=ops", False),
+    ]:
+        assert query.compile_filter(query.parse(text))(todo_item) is expected
+
+def test_auto_archive(mock_config, monkeypatch):
+    monkeypatch.setattr(archive, "AUTO_ARCHIVE_MIN_DONE", 5)
+    archive.write_policy(mock_config._db_path, 60)
+    mock_config.set_done(1)                                                     # four of six done is over 60% but below the minimum
+    assert archived_ids(mock_config) == []
+    mock_config.set_done(4)
+    assert archived_ids(mock_config) == [1, 2, 3, 4, 6]
+    assert [found["ID"] for found in mock_config.get_todo_list()] == [5]
+    archive.write_policy(mock_config._db_path, None)
+    assert archive.read_policy(mock_config._db_path) is None
+
+def test_list_and_search_include_archived(mock_config):
+    assert runner.invoke(cli.app, ["archive"]).stdout == "3 done to-dos were archived\n"
+    listed = runner.invoke(cli.app, ["list", "--format", "jsonl"])
+    assert [json.loads(line)["ID"] for line in listed.stdout.splitlines()] == [1, 4, 5]
+    listed = runner.invoke(cli.app, ["list", "--include-archived", "-o", "new_to_old", "-l", "2", "--format", "jsonl"])
+    lines = listed.stdout.splitlines()
+    assert [json.loads(line)["ID"] for line in lines[:2]] == [6, 5]
+    assert "--include-archived --cursor r5." in lines[2]                        # archived and live rows both resume by ID
+    listed = runner.invoke(cli.app, ["list", "--include-archived", "-t", "ops", "-c", "r5.0", "-o", "new_to_old", "--format", "jsonl"])
+    assert [json.loads(line)["ID"] for line in listed.stdout.splitlines()] == [4, 3, 2, 1]
+    found = runner.invoke(cli.app, ["search", "-q", "done", "--include-archived", "--format", "jsonl"])
+    assert [json.loads(line)["ID"] for line in found.stdout.splitlines()] == [2, 3, 6]
+    found = runner.invoke(cli.app, ["search", "-t", "task 6", "--format", "jsonl"])
+    assert found.stdout == ""
+
+def test_archive_options(mock_config):
+    result = runner.invoke(cli.app, ["archive", "-c", "zip"])
+    assert result.exit_code == 1 and "Unknown compression" in result.stdout
+    result = runner.invoke(cli.app, ["archive", "--auto", "40"])
+    assert result.stdout.splitlines()[1] == "3 done to-dos were archived"
+    assert archive.read_policy(mock_config._db_path) == 40
+    assert runner.invoke(cli.app, ["archive", "--auto", "0"]).stdout == "Automatic archiving is off\n"
+    assert archive.read_policy(mock_config._db_path) is None
@@ -0,0 +1,54 @@
+import pytest
+from typer.testing import CliRunner
+
+from todo import cli, config, database, todo
+
+runner = CliRunner()
+
+@pytest.fixture(params=database.BACKENDS)
+def mock_config(request, tmp_path, monkeypatch):                                # a two-item database of every backend
+    monkeypatch.setattr(config, "CONFIG_DIR_PATH", tmp_path)
+    monkeypatch.setattr(config, "CONFIG_FILE_PATH", tmp_path/"config.ini")
+    db_file = tmp_path/"todo.db"
+    config.init_app(str(db_file), request.param)
+    database.init_database(db_file, request.param)
+    todoer = todo.Todoer(db_file, request.param)
+    todoer.add_many([["Get milk"], ["Wash the car"]], 2)
+    return todoer
+
+SCRIPT = """
+# weekly chores
+add Pay "the rent" -p 1
+todo mark_done 1 3
+remove 2 --force
+mark_undone 1
+"""
+
+def test_script_is_committed_once(mock_config, monkeypatch):
+    commits = []
+    commit_group = todo.Todoer._commit_group
+    monkeypatch.setattr(todo.Todoer, "_commit_group", lambda self, ops, commit=None: commits.append(len(ops)) or commit_group(self, ops, commit))
+    result = runner.invoke(cli.app, ["batch"], input=SCRIPT)
+    assert result.exit_code == 0
+    assert 'to-do # 3: "Pay the rent." was added with priority: 1' in result.stdout
+    assert result.stdout.endswith("4 commands were committed\n")
+    assert commits == [4]
+    assert mock_config.get_todo_list() == [
+        {"ID": 1, "Description": "Get milk.", "Priority": 2, "Done": False},
+        {"ID": 3, "Description": "Pay the rent.", "Priority": 1, "Done": True},
+    ]
+    assert mock_config.stats(verify=True).consistent
+
+def test_dry_run_and_failures_write_nothing(mock_config, tmp_path):
+    before = mock_config.get_todo_list()
+    result = runner.invoke(cli.app, ["batch", "--dry-run"], input=SCRIPT)
+    assert result.exit_code == 0 and "no change was written" in result.stdout
+    result = runner.invoke(cli.app, ["batch"], input="add Buy bread\nremove 9 --force\n")
+    assert result.exit_code == 1
+    assert 'Line 2: "remove 9 --force" failed with "to-do id error"' in result.stdout
+    script = tmp_path/"script.txt"
+    script.write_text("add Buy bread\nlist\nmark_done x\nadd -p 7 Buy jam\nclear\n")
+    result = runner.invoke(cli.app, ["batch", str(script)])
+    assert result.exit_code == 1
+    assert [line.split(":")[0] for line in result.stdout.splitlines()] == ["Line 2", "Line 3", "Line 4", "Line 5"]
+    assert mock_config.get_todo_list() == before
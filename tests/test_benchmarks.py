@@ -0,0 +1,23 @@
+from benchmarks.compare import compare_runs
+from benchmarks.generate import generate_todos
+from benchmarks.run import run_benchmarks
+from todo import config
+
+def test_generated_todos_are_reproducible():
+    todos = list(generate_todos(200, "done", seed=1))
+    assert todos == list(generate_todos(200, "done", seed=1))
+    assert len({todo["Description"] for todo in todos}) == 200
+    assert sum(todo["Done"] for todo in todos) > 150                                # the "done" profile marks about 90% done
+
+def test_run_and_compare(tmp_path):
+    config_file = config.CONFIG_FILE_PATH
+    report = run_benchmarks(tmp_path, [20], ["json", "sqlite"], repeat=2, only=["todoer.add", "cli.list"])
+    assert config.CONFIG_FILE_PATH == config_file                                   # the real config file is left alone
+    assert {(result["name"], result["backend"]) for result in report["results"]} == {
+        (name, backend)
+        for name in ("todoer.add", "todoer.add_many", "cli.list", "cli.list.jsonl")
+        for backend in ("json", "sqlite")
+    }
+    slower = {"results": [dict(result, best=result["best"] * 2 + 0.01) for result in report["results"]]}
+    assert all(change.regression for change in compare_runs(report, slower))
+    assert not any(change.regression for change in compare_runs(slower, report))
@@ -0,0 +1,85 @@
+import json
+
+import pytest
+from typer.testing import CliRunner
+
+from todo import ID_ERROR, SUCCESS, binarydb, cli, config, database, todo
+from todo.binarydb import BinaryDatabaseHandler
+
+runner = CliRunner()
+
+@pytest.fixture
+def mock_binary_file(tmp_path):                                                 # a binary database holding three to-dos
+    db_file = tmp_path/"todo.todo"
+    database.get_handler(db_file, "binary").write_todos([
+        {"Description": "Get milk.", "Priority": 2, "Done": False},
+        {"Description": "Wash the café car.", "Priority": 1, "Done": False},
+        {"Description": "Pay rent.", "Priority": 3, "Done": True, "Note": "monthly"},
+    ])
+    return db_file
+
+def test_flags_are_written_in_place(mock_binary_file):
+    todoer = todo.Todoer(mock_binary_file, "binary")
+    handler = BinaryDatabaseHandler(mock_binary_file)
+    stamp = handler.stamp()
+    assert todoer.set_done(2) == ({"ID": 2, "Description": "Wash the café car.", "Priority": 1, "Done": True}, SUCCESS)
+    assert todoer.remove(1).todo["Description"] == "Get milk."
+    assert todoer.set_undone(1).error == ID_ERROR
+    assert handler.stamp()[:2] == stamp[:2] and handler.stamp() != stamp       # same inode and size: nothing but a few bytes was rewritten
+    assert todoer.get_todo_list() == [
+        {"ID": 2, "Description": "Wash the café car.", "Priority": 1, "Done": True},
+        {"ID": 3, "Description": "Pay rent.", "Priority": 3, "Done": True, "Note": "monthly"},
+    ]
+    assert todoer.stats().consistent and todoer.stats(verify=True).consistent   # the counters followed the in-place writes
+    assert todoer.remove(3).error == SUCCESS
+    assert todoer.add(["Walk", "the", "dog"], 2).todo["ID"] == 4                # a removed last to-do keeps its ID from being given out again
+    assert [row.todo_id for row in handler.iter_todos(reverse=True)] == [4, 2]
+
+def test_format_is_detected(mock_binary_file):
+    assert isinstance(database.get_handler(mock_binary_file), BinaryDatabaseHandler)  # configured as json, as before the conversion
+    assert type(database.get_handler(mock_binary_file, detect=False)) is database.DatabaseHandler
+    assert [todo["ID"] for todo in todo.Todoer(mock_binary_file).get_todo_list()] == [1, 2, 3]
+
+def test_migrate_to_binary_and_back(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "CONFIG_DIR_PATH", tmp_path)
+    monkeypatch.setattr(config, "CONFIG_FILE_PATH", tmp_path/"config.ini")
+    json_file = tmp_path/"todo.json"
+    todo_list = [{"Description": "Get milk.", "Priority": 2, "Done": True}]
+    json_file.write_text(json.dumps(todo_list))
+    config.init_app(str(json_file))
+    assert runner.invoke(cli.app, ["migrate", "--to", "binary"]).exit_code == 0
+    assert config.get_settings() == (tmp_path/"todo.todo", "binary")
+    assert (tmp_path/"todo.todo").read_bytes().startswith(database.BINARY_MAGIC)
+    assert runner.invoke(cli.app, ["mark_done", "1"]).exit_code == 0
+    json_file.unlink()
+    assert runner.invoke(cli.app, ["migrate", "--to", "json"]).exit_code == 0
+    assert json.loads(json_file.read_text()) == [{"ID": 1, **todo_list[0]}]
+
+def test_import_appends_records(mock_binary_file):
+    handler = BinaryDatabaseHandler(mock_binary_file)
+    handler.remove_todos([3])
+    imported = handler.import_todos([[{"Description": "Imported.", "Priority": 1, "Done": False}], []])
+    assert imported == (1, SUCCESS)
+    assert [todo["ID"] for todo in database.live_todos(handler.read_todos().todo_list)] == [1, 2, 4]
+    assert handler.get_todos([4, 3, 1]).todo_list == [
+        {"ID": 4, "Description": "Imported.", "Priority": 1, "Done": False},
+        {"ID": 1, "Description": "Get milk.", "Priority": 2, "Done": False},
+    ]
+
+def test_interrupted_group_is_finished(mock_binary_file, monkeypatch):
+    writes = []
+    pwrite = binarydb.os.pwrite
+    def crash_after_two(fd, data, offset):                                      # the process dies after the generation and one record reached the file
+        if len(writes) == 2:
+            raise OSError("crashed")
+        writes.append(offset)
+        return pwrite(fd, data, offset)
+    monkeypatch.setattr(binarydb.os, "pwrite", crash_after_two)
+    done = {"op": "update", "ids": [1, 2], "set": {"Done": True}}
+    assert BinaryDatabaseHandler(mock_binary_file).commit([done])[0].error != SUCCESS
+    monkeypatch.setattr(binarydb.os, "pwrite", pwrite)
+    assert binarydb.redo_path(mock_binary_file).exists()
+    handler = BinaryDatabaseHandler(mock_binary_file)                           # the next command replays the log before it reads anything
+    assert not binarydb.redo_path(mock_binary_file).exists()
+    assert [todo["Done"] for todo in handler.read_todos().todo_list] == [True, True, True]
+    assert todo.Todoer(mock_binary_file, "binary").stats().stats.done == 3      # the counters stored before the group no longer match its stamp
@@ -0,0 +1,121 @@
+import itertools
+import json
+
+import pytest
+
+from todo import ID_ERROR, database
+
+todo_list = [
+    {"Description": f"Task {{{n}}} \\n \"quoted\".", "Priority": n % 3 + 1, "Done": n % 2 == 0}
+    for n in range(1, 8)
+]
+numbered = [{"ID": n, **todo} for n, todo in enumerate(todo_list, 1)]           # the same to-dos as stored, carrying their IDs
+
+@pytest.fixture(params=["json", "uncached json", "journal", "sqlite", "binary", "compact json"])
+def handler(request, tmp_path):                                                 # the same seven to-dos stored by every backend
+    if request.param == "uncached json":                                        # streamed from the file itself rather than from the snapshot cache
+        handler = database.get_handler(tmp_path/"todo.json")
+        handler.write_todos(todo_list)
+        database.cache_path(tmp_path/"todo.json").unlink()
+        return handler
+    if request.param == "compact json":                                         # a file not written by write_todos() is streamed through the fallback path
+        db_file = tmp_path/"todo.json"
+        db_file.write_text(json.dumps(todo_list))
+        return database.get_handler(db_file)
+    handler = database.get_handler(tmp_path/"todo.db", request.param)
+    handler.write_todos(todo_list[:-1])
+    handler.add_todo(todo_list[-1])                                             # leaves a pending record in the journal backend
+    return handler
+
+def ids(rows):
+    return [row.todo_id for row in rows]
+
+def test_iter_todos_both_orders(handler):
+    assert [row.todo for row in handler.iter_todos()] == numbered
+    assert ids(handler.iter_todos()) == [1, 2, 3, 4, 5, 6, 7]
+    assert [row.todo for row in handler.iter_todos(reverse=True)] == numbered[::-1]
+    assert ids(handler.iter_todos(reverse=True)) == [7, 6, 5, 4, 3, 2, 1]
+
+def test_iter_todos_offset_and_resume(handler):
+    for reverse, expected in ((False, [4, 5, 6, 7]), (True, [4, 3, 2, 1])):
+        first_page = list(zip(range(2), handler.iter_todos(reverse, offset=1)))
+        last_row = first_page[-1][1]
+        rest = handler.iter_todos(reverse, after=(last_row.todo_id, last_row.resume))
+        assert ids(rest) == expected
+
+def test_iter_todos_empty(tmp_path):
+    handler = database.get_handler(tmp_path/"todo.json")
+    handler.write_todos([])
+    assert list(handler.iter_todos()) == []
+    assert list(handler.iter_todos(reverse=True)) == []
+
+def test_batch_mutations(handler):
+    assert handler.update_todos([2, 7], {"Done": True}).todo_list == [
+        dict(numbered[1], Done=True), dict(numbered[6], Done=True),
+    ]
+    assert handler.remove_todos([3, 1, 4]).todo_list == [numbered[2], numbered[0], numbered[3]]
+    assert ids(handler.iter_todos()) == [2, 5, 6, 7]                            # the remaining to-dos keep their IDs
+    assert handler.remove_todos([2, 3]).error == ID_ERROR                       # an ID that names no to-do rejects the whole batch
+    assert handler.update_todos([5], {"Priority": 3}).todo_list == [dict(numbered[4], Priority=3)]
+    assert len(database.live_todos(handler.read_todos().todo_list)) == 4
+
+def test_repeated_ids_in_one_group(handler):                                    # each mutation of a group sees the ones before it
+    responses = handler.commit([
+        {"op": "remove", "ids": [3]},
+        {"op": "remove", "ids": [3]},
+        {"op": "update", "ids": [3], "set": {"Done": True}},
+        {"op": "update", "ids": [5], "set": {"Done": True}},
+        {"op": "update", "ids": [5], "set": {"Priority": 1}},
+    ])
+    assert [response.error for response in responses] == [0, ID_ERROR, ID_ERROR, 0, 0]
+    assert ids(handler.iter_todos()) == [1, 2, 4, 5, 6, 7]
+    assert handler.get_todos([5]).todo_list == [dict(numbered[4], Done=True, Priority=1)]
+
+def test_ids_are_never_reused(handler):
+    handler.remove_todos([7])
+    assert handler.add_todo({"Description": "New.", "Priority": 1, "Done": False}).error == 0
+    assert ids(handler.iter_todos(reverse=True))[:2] == [8, 6]
+    handler.clear_todos()
+    handler.add_todo({"Description": "Newer.", "Priority": 1, "Done": False})
+    assert ids(handler.iter_todos()) == [9]
+
+def test_cursor_survives_removal(handler):
+    for reverse, removed, expected in ((False, 2, [4, 5, 6, 7]), (True, 6, [4, 3, 1])):
+        last_row = list(itertools.islice(handler.iter_todos(reverse), 3))[-1]
+        handler.remove_todos([removed])                                         # the later to-dos move within the file
+        assert ids(handler.iter_todos(reverse, after=(last_row.todo_id, last_row.resume))) == expected
+
+def test_iter_todos_foreign_resume_position(handler):                           # cursors printed while "todo serve" was running hold the to-do ID as their position
+    assert ids(handler.iter_todos(after=(2, 2))) == [3, 4, 5, 6, 7]
+    assert ids(handler.iter_todos(reverse=True, after=(5, 5))) == [4, 3, 2, 1]
+
+def test_snapshot_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "CACHE_SWITCH_ROWS", 2)
+    db_file = tmp_path/"todo.json"
+    handler = database.get_handler(db_file)
+    handler.write_todos(todo_list)
+    stamp = database.stat_stamp(db_file)
+    assert database.load_cache(db_file, stamp) == numbered                      # written along with the database
+    marked = [dict(todo, Description="cached") for todo in numbered]
+    database.store_cache(db_file, stamp, marked)
+    assert handler.read_todos().todo_list == marked                             # a matching cache is used instead of the file
+    assert [row.todo for row in handler.iter_todos()] == numbered[:2] + marked[2:]  # listings switch to it after the first rows
+    assert [row.todo for row in handler.iter_todos(reverse=True)] == numbered[:4:-1] + marked[4::-1]
+    db_file.write_text(json.dumps(todo_list[:3]))                               # changed behind the handler's back
+    assert handler.read_todos().todo_list == numbered[:3]
+    assert database.load_cache(db_file, database.stat_stamp(db_file)) == numbered[:3]  # and rebuilt by the read
+
+def test_snapshot_cache_rebuilt_by_listing(tmp_path):
+    db_file = tmp_path/"todo.json"
+    database.get_handler(db_file).write_todos(todo_list)
+    cache = database.cache_path(db_file)
+    cache.write_bytes(b"not a snapshot")                                        # a corrupt cache is ignored
+    handler = database.get_handler(db_file)
+    assert list(zip(range(2), handler.iter_todos()))                            # a listing that stops early leaves the cache alone
+    assert cache.read_bytes() == b"not a snapshot"
+    assert [row.todo for row in handler.iter_todos()] == numbered
+    assert database.load_cache(db_file, database.stat_stamp(db_file)) == numbered
+
+def test_get_todos(handler):
+    handler.remove_todos([4])
+    assert handler.get_todos([6, 1, 4, 99]).todo_list == [numbered[5], numbered[0]]  # IDs that name no to-do are skipped
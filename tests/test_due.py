@@ -0,0 +1,85 @@
+import pytest
+from typer.testing import CliRunner
+
+from todo import cli, config, database, todo
+from todo.dueindex import DueIndex, index_path
+
+runner = CliRunner()
+
+NOW = "2026-10-18T12:00"
+
+@pytest.fixture(params=database.BACKENDS)
+def mock_config(request, tmp_path, monkeypatch):                                # a database of every backend with three due dates and one to-do without
+    monkeypatch.setattr(config, "CONFIG_DIR_PATH", tmp_path)
+    monkeypatch.setattr(config, "CONFIG_FILE_PATH", tmp_path/"config.ini")
+    monkeypatch.setattr(todo, "due_now", lambda: NOW)
+    db_file = tmp_path/"todo.db"
+    config.init_app(str(db_file), request.param)
+    database.init_database(db_file, request.param)
+    todoer = todo.Todoer(db_file, request.param)
+    todoer.add(["Pay rent"], 1, "2026-11-01T09:00")
+    todoer.add(["Renew passport"], 2, "2026-10-01T00:00")
+    todoer.add(["Book flights"], 2, "2026-10-20T18:30")
+    todoer.add(["Get milk"])
+    return todoer
+
+def test_parse_due():
+    assert todo.parse_due("2026-11-01 09:00:30") == "2026-11-01T09:00"
+    assert todo.parse_due("2026-11-01") == "2026-11-01T00:00"
+    with pytest.raises(ValueError):
+        todo.parse_due("next friday")
+
+def ids(rows):
+    return [todo_id for todo_id, _ in rows]
+
+def test_next_and_overdue(mock_config):
+    assert ids(mock_config.due_todos()) == [3, 1]
+    assert ids(mock_config.due_todos(limit=1)) == [3]
+    assert ids(mock_config.due_todos(overdue=True)) == [2]
+    assert mock_config.due_todos(limit=1)[0][1]["Due"] == "2026-10-20T18:30"
+    assert "Due" not in mock_config.get_todo_list()[3]                          # no Due key for to-dos added without one
+
+def test_index_follows_mutations(mock_config, monkeypatch):
+    mock_config.due_todos()
+    monkeypatch.setattr(DueIndex, "rebuild", lambda *args: pytest.fail("rebuilt"))  # every mutation below updates the index instead
+    mock_config.set_done(3)
+    mock_config.add(["Call mom"], 2, "2026-10-19T08:00")
+    mock_config.remove(1)
+    mock_config.set_undone(2)
+    assert ids(mock_config.due_todos()) == [5]
+    assert ids(mock_config.due_todos(overdue=True)) == [2]
+    mock_config.remove_all()
+    assert mock_config.due_todos() == []
+
+def test_index_is_rebuilt_after_outside_changes(mock_config):
+    mock_config.due_todos()
+    mock_config._db_handler.commit([{"op": "remove", "ids": [3]}])              # bypasses every index
+    assert ids(mock_config.due_todos()) == [1]
+
+def test_unreadable_index_falls_back_to_a_scan(mock_config):
+    mock_config.due_todos()
+    index_path(mock_config._db_path).write_bytes(b"not an index" * 100)
+    assert ids(mock_config.due_todos()) == [3, 1]
+
+@pytest.mark.parametrize("indexed", [False, True])
+def test_sort_and_search_rows_carry_due(mock_config, monkeypatch, indexed):
+    from todo import sortindex
+    monkeypatch.setattr(sortindex, "SORT_INDEX_MIN_ROWS", 0 if indexed else 10**9)  # sorted through the index or in memory
+    expected = {1: "2026-11-01T09:00", 2: "2026-10-01T00:00", 3: "2026-10-20T18:30", 4: None}
+    for _ in range(2):                                                          # the first call builds the indexes, the second reads them
+        assert {todo_id: found.get("Due") for todo_id, found in mock_config.sort_todos([("priority", False)])} == expected
+        assert {todo_id: found.get("Due") for todo_id, found in mock_config.search_text("e")} == {1: expected[1], 2: expected[2], 4: None}
+
+def test_cli(mock_config):
+    result = runner.invoke(cli.app, ["add", "Water", "plants", "--due", "2026-10-19 07:15"])
+    assert result.exit_code == 0 and "due: 2026-10-19T07:15" in result.stdout
+    assert runner.invoke(cli.app, ["add", "Nap", "--due", "soon"]).exit_code != 0
+    result = runner.invoke(cli.app, ["due", "--next", "2", "--format", "csv"])
+    assert result.stdout.splitlines() == [
+        "ID,Description,Priority,Done,Due,Tags",
+        "5,Water plants.,2,False,2026-10-19T07:15,",
+        "3,Book flights.,2,False,2026-10-20T18:30,",
+    ]
+    result = runner.invoke(cli.app, ["batch"], input='add "Fix bike" --due 2026-09-30\n')
+    assert result.exit_code == 0
+    assert ids(mock_config.due_todos(overdue=True)) == [6, 2]
@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+from todo import ID_ERROR, SUCCESS, todo
+from todo.journal import JournalDatabaseHandler, journal_path
+
+@pytest.fixture
+def mock_json_file(tmp_path):                                                   # same single-item database as in test_todo.py
+    todo = [{"Description": "Get milk", "Priority": 2, "Done": False}]
+    db_file = tmp_path/"todo.json"
+    with db_file.open("w") as db:
+        json.dump(todo, db, indent=4)
+    return db_file
+
+def test_mutations_are_appended_and_replayed(mock_json_file):
+    todoer = todo.Todoer(mock_json_file, "journal")
+    snapshot = mock_json_file.read_text()
+    assert todoer.add(["Wash", "the", "car"], 1).error == SUCCESS
+    assert todoer.set_done(1).todo["Done"] is True
+    assert todoer.remove(2).todo["Description"] == "Wash the car."
+    assert todoer.set_done(5).error == ID_ERROR
+    assert mock_json_file.read_text() == snapshot                               # the snapshot is untouched until the journal is compacted
+    assert len(journal_path(mock_json_file).read_text().splitlines()) == 4      # header plus one record per successful mutation
+    assert todoer.get_todo_list() == [
+        {"ID": 1, "Description": "Get milk", "Priority": 2, "Done": True},
+    ]
+    assert todoer.add(["Walk", "the", "dog"], 2).todo["ID"] == 3                # ID 2 stays retired after its removal
+
+def test_compaction_folds_journal_into_snapshot(mock_json_file):
+    handler = JournalDatabaseHandler(mock_json_file, compact_min_bytes=0, compact_ratio=0)
+    handler.add_todo({"Description": "Clean the house.", "Priority": 1, "Done": False})
+    assert not journal_path(mock_json_file).exists()
+    assert len(json.loads(mock_json_file.read_text())) == 2
+
+def test_stale_journal_is_ignored(mock_json_file):
+    handler = JournalDatabaseHandler(mock_json_file)
+    handler.add_todo({"Description": "Clean the house.", "Priority": 1, "Done": False})
+    stale = journal_path(mock_json_file).read_text()
+    handler.compact()
+    journal_path(mock_json_file).write_text(stale)                              # simulates a crash between replacing the snapshot and deleting the journal
+    assert len(handler.read_todos().todo_list) == 2
+    handler.add_todo({"Description": "Wash the car.", "Priority": 2, "Done": False})
+    assert len(handler.read_todos().todo_list) == 3
+
+def test_torn_record_is_ignored(mock_json_file):
+    handler = JournalDatabaseHandler(mock_json_file)
+    handler.add_todo({"Description": "Clean the house.", "Priority": 1, "Done": False})
+    with journal_path(mock_json_file).open("a") as journal:
+        journal.write('{"op": "add", "todo": {"Desc')
+    assert len(handler.read_todos().todo_list) == 2
+    handler.add_todo({"Description": "Wash the car.", "Priority": 2, "Done": False})
+    assert len(handler.read_todos().todo_list) == 3
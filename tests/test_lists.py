@@ -0,0 +1,50 @@
+import json
+
+import pytest
+from typer.testing import CliRunner
+
+from todo import SUCCESS, cli, config, database, lists, query, todo
+
+runner = CliRunner()
+
+@pytest.fixture
+def mock_config(tmp_path, monkeypatch):                                         # a default json list and an "ops" sqlite list, each in its own file
+    monkeypatch.setattr(config, "CONFIG_DIR_PATH", tmp_path)
+    monkeypatch.setattr(config, "CONFIG_FILE_PATH", tmp_path/"config.ini")
+    result = runner.invoke(cli.app, ["init", "--db-path", str(tmp_path/"todo.json")])
+    assert result.exit_code == 0
+    result = runner.invoke(cli.app, ["--list", "ops", "init", "--db-path", str(tmp_path/"ops.sqlite3"), "--backend", "sqlite"])
+    assert result.exit_code == 0
+    return tmp_path
+
+def test_lists_are_registered_in_config(mock_config):
+    assert config.get_lists() == {
+        "default": (mock_config/"todo.json", "json"),
+        "ops": (mock_config/"ops.sqlite3", "sqlite"),
+    }
+    assert config.init_app(str(mock_config/"other.json")) == SUCCESS            # init of one list keeps the others
+    assert config.get_settings("ops") == (mock_config/"ops.sqlite3", "sqlite")
+    (mock_config/config.SETTINGS_CACHE_NAME).unlink()
+    assert list(config.get_lists()) == ["default", "ops"]
+
+def test_commands_work_on_the_chosen_list(mock_config):
+    assert runner.invoke(cli.app, ["--list", "ops", "add", "Deploy", "billing", "-p", "1"]).exit_code == 0
+    assert runner.invoke(cli.app, ["add", "Fix", "billing"]).exit_code == 0
+    assert [t["Description"] for t in todo.Todoer(mock_config/"todo.json").get_todo_list()] == ["Fix billing."]
+    assert [t["Description"] for t in todo.Todoer(mock_config/"ops.sqlite3", "sqlite").get_todo_list()] == ["Deploy billing."]
+    result = runner.invoke(cli.app, ["--list", "home", "list"])
+    assert result.exit_code == 1 and "todo --list home init" in result.stdout
+    assert runner.invoke(cli.app, ["--list", "a b", "list"]).exit_code == 1
+
+def test_search_all_lists(mock_config):
+    todo.Todoer(mock_config/"todo.json").add_many([["Fix billing"], ["Buy milk"]], 2)
+    todo.Todoer(mock_config/"ops.sqlite3", "sqlite").add_many([["Deploy billing"], ["Rotate keys"]], 1)
+    result = runner.invoke(cli.app, ["search", "--all-lists", "--text", "billing", "--format", "jsonl"])
+    assert result.exit_code == 0
+    assert [json.loads(line) for line in result.stdout.splitlines()] == [
+        {"List": "default", "ID": 1, "Description": "Fix billing.", "Priority": 2, "Done": False},
+        {"List": "ops", "ID": 1, "Description": "Deploy billing.", "Priority": 1, "Done": False},
+    ]
+    node = query.parse("priority = 1")
+    assert [(todo_id, name) for todo_id, _, name in lists.search_lists(config.get_lists(), node)] == [(1, "ops"), (2, "ops")]
+    assert list(lists.search_lists(config.get_lists(), node, workers=1)) == list(lists.search_lists(config.get_lists(), node, workers=2))  # with one worker the lists are searched without a pool
@@ -0,0 +1,41 @@
+import json
+import multiprocessing
+
+import pytest
+
+from todo import SUCCESS, database, todo
+from todo.locking import GroupCommit, _read_result, queue_path
+
+def add_todos(db_path, count):                                                  # runs in a separate process
+    todoer = todo.Todoer(db_path)
+    return sum(todoer.add([f"Task {n}"]).error != SUCCESS for n in range(count))
+
+def test_concurrent_writers_lose_nothing(tmp_path):
+    db_file = tmp_path/"todo.json"
+    database.init_database(db_file)
+    with multiprocessing.get_context("fork").Pool(4) as pool:
+        errors = pool.starmap(add_todos, [(db_file, 10)] * 4)
+    assert errors == [0, 0, 0, 0]
+    assert len(todo.Todoer(db_file).get_todo_list()) == 40
+
+def test_queued_mutations_commit_together(tmp_path):
+    db_file = tmp_path/"todo.json"
+    group_commit = GroupCommit(db_file)
+    queued = group_commit._enqueue({"op": "add", "todos": ["queued"]})          # left by a writer that is waiting for the lock
+    groups = []
+    def commit(ops):
+        groups.append(ops)
+        return [database.DBResponse(op["todos"], SUCCESS) for op in ops]
+    assert group_commit.submit({"op": "add", "todos": ["own"]}, commit) == (["own"], SUCCESS)
+    assert groups == [[{"op": "add", "todos": ["queued"]}, {"op": "add", "todos": ["own"]}]]
+    assert _read_result(queued) == (["queued"], SUCCESS)                        # the waiting writer finds its response once it gets the lock
+    assert list(queue_path(db_file).iterdir()) == []
+
+def test_failed_write_keeps_database(tmp_path):
+    db_file = tmp_path/"todo.json"
+    handler = database.get_handler(db_file)
+    handler.write_todos([{"Description": "Get milk.", "Priority": 2, "Done": False}])
+    with pytest.raises(TypeError):
+        handler.write_todos([{"Description": object()}])
+    assert json.loads(db_file.read_text())[0]["Description"] == "Get milk."
+    assert not [path for path in tmp_path.iterdir() if path.suffix == ".tmp"]   # no temporary file is left behind
@@ -0,0 +1,72 @@
+import json
+
+import pytest
+from typer.testing import CliRunner
+
+from todo import bitmaps, cli, config, database, query, todo
+from todo.table import TodoTable
+
+runner = CliRunner()
+
+@pytest.fixture
+def mock_config(tmp_path, monkeypatch):                                         # a six-item database, with the to-do of ID 3 removed
+    monkeypatch.setattr(config, "CONFIG_DIR_PATH", tmp_path)
+    monkeypatch.setattr(config, "CONFIG_FILE_PATH", tmp_path/"config.ini")
+    db_file = tmp_path/"todo.json"
+    database.init_database(db_file)
+    config.init_app(str(db_file))
+    todoer = todo.Todoer(db_file)
+    for n, priority in zip(range(1, 7), (2, 1, 3, 1, 2, 3)):
+        todoer.add([f"Deploy service {n}" if n % 2 else f"Write notes {n}"], priority)
+    todoer.set_done_many([1, 4])
+    todoer.remove(3)
+    return db_file
+
+def test_parse_precedence():
+    assert query.parse('not done and priority <= 2 or TEXT ~ "a \\"b\\""') == query.Or([
+        query.And([query.Not(query.Compare("done", "=", True)), query.Compare("priority", "<=", 2)]),
+        query.Text('a "b"'),
+    ])
+    for bad in ("", "priority", "priority ~ 2", "done = maybe", "colour = 1", "(done", "done done"):
+        with pytest.raises(query.QueryError):
+            query.parse(bad)
+
+@pytest.mark.parametrize("text, expected", [
+    ("priority <= 2 and not done", [2, 5]),
+    ("id > 2 and id != 5", [4, 6]),
+    ('done or words~"deploy"', [1, 4, 5]),
+    ('not (priority = 1 or text~"notes 6")', [1, 5]),
+    ("id < 0 or priority > 3", []),
+    ("id < 100000000000 and id != 100000000000 and not id = 100000000000", [1, 2, 4, 5, 6]),  # bounds far beyond the highest ID build no huge masks
+    ("id >= 100000000000", []),
+    ("done = false", [2, 5, 6]),
+])
+def test_query_plans(mock_config, text, expected):
+    todoer = todo.Todoer(mock_config)
+    assert [todo_id for todo_id, _ in todoer.query(query.compile_query(query.parse(text)))] == expected
+
+def test_bitmaps_follow_mutations(mock_config):
+    todoer = todo.Todoer(mock_config)
+    plan = query.compile_query(query.parse("priority = 3 or done"))
+    assert [todo_id for todo_id, _ in todoer.query(plan)] == [1, 4, 6]
+    assert bitmaps.index_path(mock_config).exists()
+    todoer.add(["Urgent"], 3)
+    todoer.set_undone(4)
+    todoer.remove(6)
+    stamp = todoer._db_handler.stamp()
+    stored = todoer._bitmap_index.load(stamp)                                   # updated in place rather than rebuilt
+    rebuilt = bitmaps.Bitmaps.from_table(TodoTable.from_todos(todoer.get_todo_list()))
+    assert (stored.live, stored.done, stored.priorities) == (rebuilt.live, rebuilt.done, rebuilt.priorities)
+    assert [todo_id for todo_id, _ in todoer.query(plan)] == [1, 7]
+
+def test_bitmap_helpers():
+    assert bitmaps.ids_of(bitmaps.bitmap_from_ids([9, 1, 64])) == [1, 9, 64]
+    assert bitmaps.ids_of(0) == []
+
+def test_search_command(mock_config):
+    result = runner.invoke(cli.app, ["search", "--query", "priority<=2 and not done", "--format", "jsonl"])
+    assert result.exit_code == 0
+    assert [json.loads(line)["ID"] for line in result.stdout.splitlines()] == [2, 5]
+    result = runner.invoke(cli.app, ["search", "--text", "deploy", "--done", "--format", "jsonl"])
+    assert [json.loads(line)["ID"] for line in result.stdout.splitlines()] == [1]
+    assert runner.invoke(cli.app, ["search", "--query", "priority <"]).exit_code == 1
@@ -0,0 +1,40 @@
+import csv
+import io
+import json
+
+import pytest
+
+from todo import render
+
+rows = [
+    (1, {"Description": "Get milk.", "Priority": 2, "Done": False, "Tags": ["home", "shop"]}),
+    (3, {"Description": 'Say "hi", then leave.', "Priority": 1, "Done": True}),
+]
+
+def test_table(capsys):
+    assert render.render_todos(rows, "table", color=False) == 2
+    out = capsys.readouterr().out
+    assert "\x1b[" not in out                                                   # no ANSI codes when color is off
+    assert "3   | (1)      | True | Say \"hi\", then leave.\n" in out
+
+@pytest.mark.parametrize("output_format", ["json", "jsonl"])
+def test_json_formats(capsys, output_format):
+    render.render_todos(iter(rows), output_format)
+    out = capsys.readouterr().out
+    records = json.loads(out) if output_format == "json" else [json.loads(line) for line in out.splitlines()]
+    assert records == [{"ID": todo_id, **todo} for todo_id, todo in rows]
+
+def test_empty_json(capsys):
+    render.render_todos([], "json")
+    assert json.loads(capsys.readouterr().out) == []
+
+@pytest.mark.parametrize("output_format, delimiter", [("csv", ","), ("tsv", "\t")])
+def test_csv_formats(capsys, monkeypatch, output_format, delimiter):
+    monkeypatch.setattr(render, "BUFFER_SIZE", 16)                              # forces several blocks
+    render.render_todos(rows, output_format)
+    records = list(csv.reader(io.StringIO(capsys.readouterr().out), delimiter=delimiter))
+    assert records == [
+        ["ID", "Description", "Priority", "Done", "Due", "Tags"],
+        ["1", "Get milk.", "2", "False", "", "home shop"],
+        ["3", 'Say "hi", then leave.', "1", "True", "", ""],
+    ]
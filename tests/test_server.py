@@ -0,0 +1,83 @@
+import asyncio
+import json
+import socket
+import threading
+
+import pytest
+from typer.testing import CliRunner
+
+from todo import ID_ERROR, SUCCESS, cli, client, config, database, query, todo
+from todo.server import TodoServer
+from todo.stats import Stats
+
+runner = CliRunner()
+
+@pytest.fixture(params=["always", "interval"])
+def served(request, tmp_path, monkeypatch):                                     # a daemon running in a background thread for a three-item database
+    monkeypatch.setattr(config, "CONFIG_DIR_PATH", tmp_path)
+    monkeypatch.setattr(config, "CONFIG_FILE_PATH", tmp_path/"config.ini")
+    db_file = tmp_path/"todo.json"
+    config.init_app(str(db_file))
+    database.get_handler(db_file).write_todos([
+        {"Description": f"Task {n}.", "Priority": n, "Done": False} for n in (1, 2, 3)
+    ])
+    server = TodoServer(db_file, "json", request.param, flush_interval=60)      # the interval never elapses during a test
+    assert server.load() == SUCCESS
+    loop = asyncio.new_event_loop()
+    stop = asyncio.Event()
+    thread = threading.Thread(target=loop.run_until_complete, args=(server.serve_until(stop),))
+    thread.start()
+    while not client.socket_path(db_file).exists():
+        pass
+    yield db_file
+    loop.call_soon_threadsafe(stop.set)
+    thread.join()
+    loop.close()
+
+def test_remote_todoer(served):
+    remote = client.connect(served)
+    assert remote.add(["Task", "4"], 1) == ({"ID": 4, "Description": "Task 4.", "Priority": 1, "Done": False}, SUCCESS)
+    assert remote.set_done_many([1, 4]).error == SUCCESS
+    assert remote.remove(9).error == ID_ERROR
+    assert [row.todo_id for row in remote.iter_todos(reverse=True, offset=1)] == [3, 2, 1]
+    assert remote.search_text("task 4") == [(4, {"ID": 4, "Description": "Task 4.", "Priority": 1, "Done": True})]
+    assert remote.remove(2).error == SUCCESS
+    assert [row.todo_id for row in remote.iter_todos()] == [1, 3, 4]
+    assert [found["ID"] for found in remote.get_todos([4, 2, 9])] == [4]
+    assert remote.stats(verify=True) == (Stats(3, 2, {1: (2, 2), 3: (1, 0)}), True, SUCCESS)
+    assert [todo_id for todo_id, _ in remote.query(query.compile_query(query.parse("done and priority < 3")))] == [1, 4]
+    assert remote.flush() == SUCCESS
+    assert todo.Todoer(served).get_todo_list() == remote.get_todo_list()        # what the daemon holds has reached the database
+    assert todo.Todoer(served).stats() == remote.stats()                        # and so have its counters
+    assert todo.Todoer(served).get_todos([4, 1]) == remote.get_todos([4, 1])
+    remote.close()
+
+def test_commands_use_the_daemon(served):
+    database.get_handler(served).write_todos([])                                # a change made without the daemon is picked up
+    result = runner.invoke(cli.app, ["add", "Task", "4"])
+    assert result.exit_code == 0
+    result = runner.invoke(cli.app, ["list", "--format", "jsonl"])
+    assert [json.loads(line)["Description"] for line in result.stdout.splitlines()] == ["Task 4."]
+
+@pytest.mark.parametrize("args", [["list"], ["stats"], ["search", "-t", "task"], ["sort"], ["due"]])
+def test_daemon_closing_mid_request(tmp_path, monkeypatch, args):
+    monkeypatch.setattr(config, "CONFIG_DIR_PATH", tmp_path)
+    monkeypatch.setattr(config, "CONFIG_FILE_PATH", tmp_path/"config.ini")
+    db_file = tmp_path/"todo.json"
+    config.init_app(str(db_file))
+    database.init_database(db_file)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)                # a daemon that dies after reading the first request
+    listener.bind(str(client.socket_path(db_file)))
+    listener.listen()
+    listener.settimeout(5)                                                      # a command that never connects fails the test instead of hanging it
+    def accept_and_close():
+        connection, _ = listener.accept()
+        with connection:
+            connection.makefile("rb").readline()
+    thread = threading.Thread(target=accept_and_close, daemon=True)
+    thread.start()
+    result = runner.invoke(cli.app, args)
+    thread.join()
+    listener.close()
+    assert result.exit_code == 1
+    assert "daemon stopped answering" in result.stdout and "Traceback" not in result.stdout
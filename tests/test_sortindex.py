@@ -0,0 +1,48 @@
+import json
+
+import pytest
+from typer.testing import CliRunner
+
+from todo import cli, config, database, sortindex, todo
+from todo.table import TodoTable, parse_sort_keys
+
+runner = CliRunner()
+
+@pytest.fixture
+def mock_config(tmp_path, monkeypatch):                                         # a five-item database whose sorts always go through the sort index
+    monkeypatch.setattr(config, "CONFIG_DIR_PATH", tmp_path)
+    monkeypatch.setattr(config, "CONFIG_FILE_PATH", tmp_path/"config.ini")
+    monkeypatch.setattr(sortindex, "SORT_INDEX_MIN_ROWS", 0)
+    db_file = tmp_path/"todo.json"
+    database.init_database(db_file)
+    config.init_app(str(db_file))
+    todoer = todo.Todoer(db_file)
+    for n, priority in zip(range(1, 6), (2, 1, 3, 1, 2)):
+        todoer.add([f"task {n}"], priority)
+    return db_file
+
+def in_memory(todoer, spec, limit=None):
+    table = TodoTable.from_todos(todoer.get_todo_list())
+    return table.sorted_ids(parse_sort_keys(spec), limit)
+
+def test_index_follows_mutations(mock_config):
+    todoer = todo.Todoer(mock_config)
+    specs = ("priority", "-priority", "done,-description", "-done,priority,-id")
+    for spec in specs:
+        assert [todo_id for todo_id, _ in todoer.sort_todos(parse_sort_keys(spec))] == in_memory(todoer, spec)
+    assert sortindex.index_path(mock_config).exists()
+    todoer.add(["Task", "6"], 1)
+    todoer.set_done_many([2, 6])
+    todoer.remove(3)
+    assert todoer._sort_index.is_current(todoer._db_handler.stamp())            # updated in place rather than rebuilt
+    for spec in specs:
+        for limit in (None, 2):
+            assert [todo_id for todo_id, _ in todoer.sort_todos(parse_sort_keys(spec), limit)] == in_memory(todoer, spec, limit)
+
+def test_sort_command_keys_and_limit(mock_config):
+    result = runner.invoke(cli.app, ["sort", "--by=done,-priority", "--limit", "2", "--format", "jsonl"])
+    assert result.exit_code == 0
+    assert [json.loads(line)["ID"] for line in result.stdout.splitlines()] == [3, 1]
+    result = runner.invoke(cli.app, ["sort", "--order", "des", "--format", "jsonl"])
+    assert [json.loads(line)["ID"] for line in result.stdout.splitlines()] == [3, 1, 5, 2, 4]  # ties stay in insertion order
+    assert runner.invoke(cli.app, ["sort", "--by", "colour"]).exit_code == 1
@@ -0,0 +1,50 @@
+import json
+import sqlite3
+
+import pytest
+from typer.testing import CliRunner
+
+from todo import ID_ERROR, SUCCESS, cli, config, database, todo
+
+runner = CliRunner()
+
+@pytest.fixture
+def mock_sqlite_file(tmp_path):                                                 # creates an SQLite database holding two to-dos
+    db_file = tmp_path/"todo.sqlite3"
+    database.get_handler(db_file, "sqlite").write_todos([
+        {"Description": "Get milk.", "Priority": 2, "Done": False},
+        {"Description": "Wash the car.", "Priority": 1, "Done": False},
+    ])
+    return db_file
+
+def test_single_row_mutations(mock_sqlite_file):
+    todoer = todo.Todoer(mock_sqlite_file, "sqlite")
+    assert todoer.add(["Clean", "the", "house"], 3).error == SUCCESS
+    assert todoer.set_done(2) == ({"ID": 2, "Description": "Wash the car.", "Priority": 1, "Done": True}, SUCCESS)
+    assert todoer.remove(1).todo["Description"] == "Get milk."
+    assert todoer.set_undone(1).error == ID_ERROR
+    assert todoer.remove(3).error == SUCCESS
+    assert todoer.add(["Walk", "the", "dog"], 2).todo["ID"] == 4                # AUTOINCREMENT never hands out a removed ID again
+    assert todoer.get_todo_list() == [
+        {"ID": 2, "Description": "Wash the car.", "Priority": 1, "Done": True},
+        {"ID": 4, "Description": "Walk the dog.", "Priority": 2, "Done": False},
+    ]
+
+def test_indexes_exist(mock_sqlite_file):
+    with sqlite3.connect(mock_sqlite_file) as connection:
+        indexes = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"todos_priority", "todos_done"} <= indexes
+
+def test_migrate_command(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "CONFIG_DIR_PATH", tmp_path)
+    monkeypatch.setattr(config, "CONFIG_FILE_PATH", tmp_path/"config.ini")
+    json_file = tmp_path/"todo.json"
+    todo_list = [{"Description": "Get milk.", "Priority": 2, "Done": True}]
+    json_file.write_text(json.dumps(todo_list))
+    config.init_app(str(json_file))
+    result = runner.invoke(cli.app, ["migrate", "--to", "sqlite"])
+    assert result.exit_code == 0
+    assert config.get_settings()[1] == "sqlite"
+    db_path = database.get_database_path(config.CONFIG_FILE_PATH)
+    assert db_path == tmp_path/"todo.sqlite3"
+    assert todo.Todoer(db_path, "sqlite").get_todo_list() == [{"ID": 1, **todo_list[0]}]
@@ -0,0 +1,33 @@
+import subprocess
+import sys
+
+from todo import __app_name__, __version__
+
+IMPORT_BUDGET_US = 250_000                                                      # generous: "import todo.cli" takes well under 100 ms here, almost all of it Typer and Click
+LAZY_MODULES = ("configparser", "csv", "sqlite3", "todo.journal", "todo.sqlitedb", "todo.textindex")
+
+def import_times(*args):                                                        # runs a fresh interpreter with -X importtime and returns {module: cumulative microseconds}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args], capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, module = line.split("|")
+            if cumulative.strip().isdigit():
+                times[module.strip()] = int(cumulative)
+    return result.stdout, times
+
+def test_version_skips_the_cli():
+    stdout, times = import_times("-m", "todo", "--version")
+    assert stdout == f"{__app_name__} v{__version__}\n"
+    assert "typer" not in times and "todo.cli" not in times
+
+def test_cli_import_budget():
+    _, times = import_times("-c", "import todo.cli")
+    assert times["todo.cli"] < IMPORT_BUDGET_US
+    assert not [module for module in LAZY_MODULES if module in times]           # these are imported by the commands that need them
+
+def test_config_resolves_its_directory_lazily():
+    _, times = import_times("-c", "import todo.config")
+    assert "typer" not in times                                                 # config_dir_path() imports it on first use
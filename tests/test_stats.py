@@ -0,0 +1,74 @@
+import json
+
+import pytest
+from typer.testing import CliRunner
+
+from todo import SUCCESS, cli, config, database, todo
+from todo.stats import Stats, count_todos
+
+runner = CliRunner()
+
+@pytest.fixture(params=database.BACKENDS)
+def todoer(request, tmp_path):                                                  # an empty database of every backend
+    db_file = tmp_path/"todo.db"
+    database.init_database(db_file, request.param)
+    return todo.Todoer(db_file, request.param)
+
+def check(todoer, expected):                                                    # the stored counters agree with a full scan
+    assert todoer.stats() == (expected, True, SUCCESS)
+    assert todoer.stats(verify=True) == (expected, True, SUCCESS)
+
+def test_counters_follow_mutations(todoer):
+    check(todoer, Stats(0, 0, {}))
+    todoer.add_many([["Get milk"], ["Wash the car"], ["Pay rent"]], 2)
+    todoer.add(["Call mom"], 1)
+    check(todoer, Stats(4, 0, {1: (1, 0), 2: (3, 0)}))
+    todoer.set_done_many([1, 4, 4])
+    todoer.set_undone(1)
+    check(todoer, Stats(4, 1, {1: (1, 1), 2: (3, 0)}))
+    todoer.remove(4)
+    assert todoer.set_done(9).error != SUCCESS                                  # a rejected mutation changes no counter
+    check(todoer, Stats(3, 0, {2: (3, 0)}))
+    todoer.remove_all()
+    check(todoer, Stats(0, 0, {}))
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_verify_repairs_counters(tmp_path, backend):
+    db_file = tmp_path/"todo.db"
+    todoer = todo.Todoer(db_file, backend)
+    database.get_handler(db_file, backend).write_todos([
+        {"Description": "Get milk.", "Priority": 2, "Done": True},
+        {"Description": "Wash the car.", "Priority": 3, "Done": False},
+    ])
+    handler = database.get_handler(db_file, backend)
+    assert handler.write_counts({2: [7, 7]}) == SUCCESS                         # counters that no longer match the list
+    assert todoer.stats().stats.total == 7
+    assert todoer.stats(verify=True) == (Stats(2, 1, {2: (1, 1), 3: (1, 0)}), False, SUCCESS)
+    assert handler.read_counts() == count_todos(todoer.get_todo_list())
+
+def test_missing_counters_are_rebuilt(tmp_path):                                # databases written before the counters existed
+    db_file = tmp_path/"todo.json"
+    with db_file.open("w") as db:
+        json.dump([{"Description": "Get milk.", "Priority": 2, "Done": False}], db)
+    todoer = todo.Todoer(db_file)
+    assert todoer.stats() == (Stats(1, 0, {2: (1, 0)}), False, SUCCESS)
+    assert todoer.stats() == (Stats(1, 0, {2: (1, 0)}), True, SUCCESS)
+
+def test_stats_command(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "CONFIG_DIR_PATH", tmp_path)
+    monkeypatch.setattr(config, "CONFIG_FILE_PATH", tmp_path/"config.ini")
+    db_file = tmp_path/"todo.json"
+    config.init_app(str(db_file))
+    database.init_database(db_file)
+    todoer = todo.Todoer(db_file)
+    todoer.add_many([["Get milk"], ["Wash the car"]], 1)
+    todoer.set_done(2)
+    result = runner.invoke(cli.app, ["stats", "--format", "json"])
+    assert result.exit_code == 0
+    assert json.loads(result.stdout) == {
+        "total": 2, "open": 1, "done": 1, "ratio": 0.5, "priorities": {"1": {"total": 2, "done": 1}},
+    }
+    result = runner.invoke(cli.app, ["stats", "--verify"])
+    assert result.exit_code == 0
+    assert "Done:   1 (50.0%)" in result.stdout
+    assert "match a full scan" in result.stdout
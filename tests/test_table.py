@@ -0,0 +1,39 @@
+import pytest
+
+from todo.table import TodoTable, parse_sort_keys
+
+todo_list = [
+    {"ID": 1, "Description": "Get milk.", "Priority": 2, "Done": False},
+    {"ID": 2, "Description": "Walk the dog.", "Priority": 1, "Done": True},
+    {"ID": 4, "Description": "Get milk.", "Priority": 3, "Done": False},        # ID 3 was removed
+    {"ID": 5, "Description": "Pay rent.", "Priority": 1, "Done": False},
+]
+
+def test_table_round_trip():
+    table = TodoTable.from_todos(iter(todo_list))
+    assert len(table) == 4
+    assert list(table.rows()) == [(todo["ID"], todo) for todo in todo_list]
+    assert table.descriptions[0] is table.descriptions[2]                           # equal descriptions share one string
+
+def test_table_queries():
+    table = TodoTable.from_todos(todo_list)
+    table.append({"ID": 6, "Description": "Call home.", "Priority": 2, "Done": True})
+    assert table.ids_by_priority() == [2, 5, 1, 6, 4]                           # equal priorities keep their list order
+    assert table.ids_by_priority(reverse=True) == [4, 1, 6, 2, 5]
+    assert list(table.rows([6])) == [(6, {"ID": 6, "Description": "Call home.", "Priority": 2, "Done": True})]
+
+def test_sorted_ids_by_several_keys():
+    table = TodoTable.from_todos(todo_list)
+    keys = parse_sort_keys("done,-priority")
+    assert table.sorted_ids(keys) == [4, 1, 5, 2]
+    assert table.sorted_ids(parse_sort_keys("description,-id")) == [4, 1, 5, 2]
+    assert table.sorted_ids(parse_sort_keys("-description")) == [2, 5, 1, 4]
+    for spec in ("done,-priority", "-description,priority", "priority", "-priority", "id", "-id"):
+        for limit in (1, 2, 3):                                                     # the heap picks the same to-dos as the full sort
+            assert table.sorted_ids(parse_sort_keys(spec), limit) == table.sorted_ids(parse_sort_keys(spec))[:limit]
+
+def test_parse_sort_keys():
+    assert parse_sort_keys("priority, -done", reverse=True) == [("priority", True), ("done", False)]
+    assert parse_sort_keys("id,priority") == [("id", False)]                        # keys after the unique ID never matter
+    with pytest.raises(ValueError):
+        parse_sort_keys("priority,colour")
@@ -0,0 +1,101 @@
+import pytest
+from typer.testing import CliRunner
+
+from todo import bitmaps, cli, config, database, query, todo
+
+runner = CliRunner()
+
+@pytest.fixture(params=database.BACKENDS)
+def mock_config(request, tmp_path, monkeypatch):                                # a database of every backend with four to-dos, three of them tagged
+    monkeypatch.setattr(config, "CONFIG_DIR_PATH", tmp_path)
+    monkeypatch.setattr(config, "CONFIG_FILE_PATH", tmp_path/"config.ini")
+    db_file = tmp_path/"todo.db"
+    config.init_app(str(db_file), request.param)
+    database.init_database(db_file, request.param)
+    todoer = todo.Todoer(db_file, request.param)
+    todoer.add(["Restart db"], 1, tags=["ops", "db"])
+    todoer.add(["Plan sprint"], tags=["ops", "blocked"])
+    todoer.add(["Fix docs"])
+    todoer.add(["Tune index"], tags=["db"])
+    return todoer
+
+def ids(rows):
+    return [todo_id for todo_id, _ in rows]
+
+def matching(todoer, *values, **paging):
+    return ids(todoer.query(query.compile_query(query.tag_filter(list(values))), **paging))
+
+def test_tag_filter():
+    assert query.tag_filter(["Ops", "!blocked,db"]) == query.And([
+        query.Tag("ops"), query.Or([query.Not(query.Tag("blocked")), query.Tag("db")]),
+    ])
+    assert query.parse('tag="sprint-42" and tag != ops') == query.And([
+        query.Tag("sprint-42"), query.Not(query.Tag("ops")),
+    ])
+    for bad in ([], ["!"], ["a b"], ["ops,"]):
+        with pytest.raises(query.QueryError):
+            query.tag_filter(bad)
+
+def test_unquoted_tags_in_queries():
+    assert query.parse("tag=t1 and tag!=sprint-42") == query.And([
+        query.Tag("t1"), query.Not(query.Tag("sprint-42")),
+    ])
+    assert query.parse("(tag=Team/db.v2 or tag = 42)") == query.Or([query.Tag("team/db.v2"), query.Tag("42")])
+    assert query.parse("tag=t1 and priority<-1") == query.And([query.Tag("t1"), query.Compare("priority", "<", -1)])
+    for bad in ("tag=", "tag=-ops", "tag<t1"):
+        with pytest.raises(query.QueryError):
+            query.parse(bad)
+
+def test_set_algebra(mock_config):
+    assert mock_config.get_todo_list()[0]["Tags"] == ["db", "ops"]
+    assert matching(mock_config, "ops") == [1, 2]
+    assert matching(mock_config, "ops", "!blocked") == [1]
+    assert matching(mock_config, "ops,db") == [1, 2, 4]
+    assert matching(mock_config, "!db") == [2, 3]
+    assert matching(mock_config, "missing") == []
+    assert matching(mock_config, "ops,db", reverse=True, limit=2) == [4, 2]
+    assert matching(mock_config, "ops,db", after=1, limit=1) == [2]
+
+def test_bitmaps_follow_mutations(mock_config, monkeypatch):
+    matching(mock_config, "ops")
+    monkeypatch.setattr(bitmaps.Bitmaps, "from_table", lambda table: pytest.fail("rebuilt"))
+    mock_config.remove(1)
+    mock_config.add_many([["Page on-call"], ["Rotate keys"]], tags=["ops"])
+    mock_config.set_done(2)
+    assert matching(mock_config, "ops") == [2, 5, 6]
+    assert matching(mock_config, "db") == [4]
+    mock_config.remove_all()
+    assert matching(mock_config, "ops") == []
+
+def test_only_named_tags_are_decompressed(mock_config):
+    matching(mock_config, "ops")
+    loaded = bitmaps.BitmapIndex(mock_config._db_path).load(mock_config._db_handler.stamp())
+    assert set(loaded.packed) == {"ops", "db", "blocked"} and loaded.tags == {}
+    loaded.tag("db")
+    assert set(loaded.tags) == {"db"}
+
+@pytest.mark.parametrize("indexed", [False, True])
+def test_rows_of_every_command_carry_tags(mock_config, monkeypatch, indexed):
+    from todo import sortindex
+    monkeypatch.setattr(sortindex, "SORT_INDEX_MIN_ROWS", 0 if indexed else 10**9)  # sorted through the index or in memory
+    mock_config.add(["Renew certs"], due="2026-11-01", tags=["sec"])
+    expected = {1: ["db", "ops"], 2: ["blocked", "ops"], 4: ["db"], 5: ["sec"]}
+    for _ in range(2):                                                          # the first call builds the indexes, the second reads them
+        assert {todo_id: found["Tags"] for todo_id, found in mock_config.sort_todos([("id", False)]) if "Tags" in found} == expected
+        assert {todo_id: found.get("Tags") for todo_id, found in mock_config.search_text("e")} == {1: ["db", "ops"], 4: ["db"], 5: ["sec"]}
+        assert [found["Tags"] for _, found in mock_config.due_todos(now="2026-01-01T00:00")] == [["sec"]]
+
+def test_cli(mock_config):
+    result = runner.invoke(cli.app, ["add", "Rotate", "keys", "-t", "OPS", "-t", "sec"])
+    assert result.exit_code == 0 and "tags: ops, sec" in result.stdout
+    assert runner.invoke(cli.app, ["add", "Nap", "--tag", "!x"]).exit_code != 0
+    result = runner.invoke(cli.app, ["list", "--tag", "ops", "--tag", "!blocked", "--format", "csv", "--limit", "1"])
+    assert result.stdout.splitlines()[:2] == ["ID,Description,Priority,Done,Due,Tags", "1,Restart db.,1,False,,db ops"]
+    assert "--tag ops --tag '!blocked' --cursor f1.0" in result.stdout          # the next page keeps the filter
+    result = runner.invoke(cli.app, ["list", "--tag", "ops", "--tag", "!blocked", "--limit", "1", "--cursor", "f1.0"])
+    assert "Rotate keys. #ops #sec" in result.stdout
+    result = runner.invoke(cli.app, ["search", "--query", 'tag=db and not done', "--format", "csv"])
+    assert result.stdout.splitlines()[1:] == ["1,Restart db.,1,False,,db ops", "4,Tune index.,2,False,,db"]
+    result = runner.invoke(cli.app, ["batch"], input="add Renew certs -t sec\n")
+    assert result.exit_code == 0
+    assert matching(mock_config, "sec") == [5, 6]
@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from todo import todo
+from todo.textindex import index_path
+
+@pytest.fixture
+def mock_json_file(tmp_path):
+    todo_list = [
+        {"Description": "Get milk.", "Priority": 2, "Done": False},
+        {"Description": "Deploy the billing service.", "Priority": 1, "Done": False},
+        {"Description": "Review deployment notes.", "Priority": 3, "Done": True},
+    ]
+    db_file = tmp_path/"todo.json"
+    db_file.write_text(json.dumps(todo_list, indent=4))
+    return db_file
+
+def test_substring_and_word_search(mock_json_file):
+    todoer = todo.Todoer(mock_json_file)
+    assert [todo_id for todo_id, _ in todoer.search_text("DEPLOY")] == [2, 3]
+    assert [todo_id for todo_id, _ in todoer.search_text("deploy", whole_words=True)] == [2]
+    assert [todo_id for todo_id, _ in todoer.search_text("mi")] == [1]              # shorter than a trigram
+    assert todoer.search_text("nothing like this") == []
+    assert index_path(mock_json_file).exists()
+
+def test_index_follows_mutations(mock_json_file):
+    todoer = todo.Todoer(mock_json_file)
+    todoer.search_text("deploy")                                                    # builds the index
+    todoer.remove(1)
+    todoer.add(["Deploy", "the", "docs"], 1)
+    todoer.set_done(2)
+    assert todoer.search_text("deploy") == [
+        (2, {"ID": 2, "Description": "Deploy the billing service.", "Priority": 1, "Done": True}),
+        (3, {"ID": 3, "Description": "Review deployment notes.", "Priority": 3, "Done": True}),
+        (4, {"ID": 4, "Description": "Deploy the docs.", "Priority": 1, "Done": False}),
+    ]
+    todoer.remove_all()
+    assert todoer.search_text("deploy") == []
+
+def test_index_rebuilt_after_outside_change(mock_json_file):
+    todoer = todo.Todoer(mock_json_file)
+    todoer.search_text("milk")
+    mock_json_file.write_text(json.dumps([{"Description": "Buy more milk.", "Priority": 1, "Done": False}]))
+    assert todoer.search_text("milk") == [
+        (1, {"ID": 1, "Description": "Buy more milk.", "Priority": 1, "Done": False}),
+    ]
+
+def test_index_follows_batches(mock_json_file):
+    todoer = todo.Todoer(mock_json_file)
+    todoer.search_text(".")
+    todoer.add_many([["Deploy", "again"], ["Milk", "run"]], 3)
+    todoer.remove_many([3, 1])
+    todoer.set_done_many([2, 4])
+    assert todoer.search_text(".") == [(todo["ID"], todo) for todo in todoer.get_todo_list()]
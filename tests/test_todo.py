@@ -9,16 +9,21 @@ from todo import (
     __app_name__,
     __version__,
     cli,
+    client,
+    config,
+    database,
     todo,
 )
 
 runner = CliRunner()
 
+
 def test_version():                                                             # defines first unit test for testing application version
     result = runner.invoke(cli.app, ["--version"])                              # calls .invoke() on runner to run the application with the --version option.
     assert result.exit_code == 0                                                # asserts that the application’s exit code (result.exit_code) is equal to 0 to check that the application ran successfully.
     assert f"{__app_name__} v{__version__}\n" in result.stdout                  # asserts that the application’s version is present in the standard output, which is available through result.stdout.
 
+
 @pytest.fixture                                                                 # pytest fixtures are functions that are used to manage app states and dependencies. They can provide data for testing and a wide range of value types when explicitly called by our testing software. You can use the mock data that fixtures create across multiple tests.
 def mock_json_file(tmp_path):                                                   # this fixture creates and returns temporary JSON File - "db_file" with a single to-do list item. The tmp_path is a pathlib.Path object that pytest uses to provide a temporary directory for testing purposes
     todo = [{"Description": "Get milk", "Priority": 2, "Done": False}]
@@ -27,6 +32,7 @@ def mock_json_file(tmp_path):
         json.dump(todo, db, indent=4)
     return db_file
 
+
 """the following two dictonaries provide data to test Todoer.add(). 
 The first two keys represent the data you’ll use as arguments to .add(), 
 while the third key holds the expected return value of the method."""
@@ -35,6 +41,7 @@ test_data1 = {
     "description": ["Clean", "the", "house"],
     "priority": 1,
     "todo": {
+        "ID": 2,
         "Description": "Clean the house.",
         "Priority": 1,
         "Done": False,
@@ -44,12 +51,14 @@ test_data2 = {
     "description": ["Wash the car"],
     "priority": 2,
     "todo": {
+        "ID": 2,
         "Description": "Wash the car.",
         "Priority": 2,
         "Done": False,
     },
 }
 
+
 @pytest.mark.parametrize(                                                       # The @pytest.mark.parametrize() decorator marks test_add() for parametrization. When pytest runs this test, it calls test_add() two times. Each call uses one of the parameter sets test_data1, test_data2
     "description, priority, expected",                                          # holds descriptive names for the two required parameters and also a descriptive return value name. The test_add() has the same parameters
     [
@@ -69,4 +78,81 @@ def test_add(mock_json_file, description, priority, expected):
     todoer = todo.Todoer(mock_json_file)                                        # creates an instance of Todoer with mock_json_file as an argument
     assert todoer.add(description, priority) == expected                        # asserts that a call to .add() using description and priority as arguments should return expected
     read = todoer._db_handler.read_todos()                                      # reads the to-do list from the temporary database and stores it in read variable
-    assert len(read.todo_list) == 2                                             # asserts that the length of the to-do list is 2 because mock_json_file() returns a list with one item, and now the test_add() adds a second item to the list.
\ No newline at end of file
+    assert len(read.todo_list) == 2                                             # asserts that the length of the to-do list is 2 because mock_json_file() returns a list with one item, and now the test_add() adds a second item to the list.
+
+
+@pytest.fixture
+def mock_config(tmp_path, monkeypatch):                                         # points the application's config file at a temporary directory holding a five-item database
+    monkeypatch.setattr(config, "CONFIG_DIR_PATH", tmp_path)
+    monkeypatch.setattr(config, "CONFIG_FILE_PATH", tmp_path/"config.ini")
+    db_file = tmp_path/"todo.json"
+    database.init_database(db_file)
+    config.init_app(str(db_file))
+    todoer = todo.Todoer(db_file)
+    for n in range(1, 6):
+        todoer.add([f"Task {n}"], 2)
+    return db_file
+
+
+def test_list_pages_with_cursor(mock_config):                                   # lists the newest two to-dos, then follows the printed cursor to the next page
+    result = runner.invoke(cli.app, ["list", "-o", "new_to_old", "--limit", "2"])
+    assert result.exit_code == 0
+    assert "Task 5." in result.stdout and "Task 4." in result.stdout and "Task 3." not in result.stdout
+    cursor = result.stdout.split("--cursor ")[1].split()[0]
+    result = runner.invoke(cli.app, ["list", "-o", "new_to_old", "--limit", "2", "--cursor", cursor])
+    assert "Task 3." in result.stdout and "Task 2." in result.stdout and "Task 4." not in result.stdout
+    result = runner.invoke(cli.app, ["list", "--offset", "4"])
+    assert "Task 5." in result.stdout and "Next page" not in result.stdout
+
+
+def test_mark_done_ids_and_ranges(mock_config):
+    result = runner.invoke(cli.app, ["mark_done", "1", "3-4"])
+    assert result.exit_code == 0
+    assert [todo["Done"] for todo in todo.Todoer(mock_config).get_todo_list()] == [True, False, True, True, False]
+    assert runner.invoke(cli.app, ["mark_done", "2", "9"]).exit_code == 1         # an invalid ID rejects the whole batch
+    assert todo.Todoer(mock_config).get_todo_list()[1]["Done"] is False
+    result = runner.invoke(cli.app, ["mark_done", "1-999999999"])               # a mistyped bound is refused before any ID is listed
+    assert result.exit_code == 1 and "names more than" in result.stdout
+    assert todo.parse_ids(["2-4", "3", "7-"]) == [2, 3, 4, 7]
+
+
+def test_remove_many_and_add_from_file(mock_config, tmp_path):
+    result = runner.invoke(cli.app, ["remove", "2", "4", "--force"])
+    assert result.exit_code == 0
+    assert [t["Description"] for t in todo.Todoer(mock_config).get_todo_list()] == ["Task 1.", "Task 3.", "Task 5."]
+    result = runner.invoke(cli.app, ["remove", "3"], input="n\n")
+    assert result.exit_code == 0 and "Delete to-do # 3: Task 3.?" in result.stdout
+    assert runner.invoke(cli.app, ["remove", "4"], input="y\n").exit_code == 1  # a removed ID names no to-do
+    tasks = tmp_path/"tasks.txt"
+    tasks.write_text("Task 6\n\nTask 7.\n")
+    result = runner.invoke(cli.app, ["add", "--from-file", str(tasks), "-p", "1"])
+    assert result.exit_code == 0
+    assert todo.Todoer(mock_config).get_todo_list()[-2:] == [
+        {"ID": 6, "Description": "Task 6.", "Priority": 1, "Done": False},
+        {"ID": 7, "Description": "Task 7.", "Priority": 1, "Done": False},
+    ]
+    assert runner.invoke(cli.app, ["mark_done", "3", "5"]).exit_code == 0       # IDs stay the same after removals
+    assert [t["ID"] for t in todo.Todoer(mock_config).get_todo_list() if t["Done"]] == [3, 5]
+
+
+def test_sort_keeps_ids_and_formats(mock_config):
+    todo.Todoer(mock_config).add(["Urgent"], 1)
+    result = runner.invoke(cli.app, ["sort", "--format", "jsonl"])
+    assert result.exit_code == 0
+    first = json.loads(result.stdout.splitlines()[0])
+    assert first == {"ID": 6, "Description": "Urgent.", "Priority": 1, "Done": False}
+    assert runner.invoke(cli.app, ["list", "--format", "xml"]).exit_code == 1
+
+
+def test_settings_follow_config_edits(mock_config, tmp_path):                   # the cached settings are dropped once config.ini changes
+    assert config.get_settings() == (mock_config, "json")
+    other = tmp_path/"other.sqlite3"
+    (tmp_path/"config.ini").write_text(f"[General]\ndatabase = {other}\nbackend = sqlite\n\n# edited by hand\n")
+    assert config.get_settings() == (other, "sqlite")
+
+
+def test_commands_fall_back_without_daemon(mock_config):
+    client.socket_path(mock_config).touch()                                     # a socket file left behind by a killed "todo serve"
+    assert client.connect(mock_config) is None
+    result = runner.invoke(cli.app, ["list", "--format", "jsonl"])
+    assert result.exit_code == 0 and len(result.stdout.splitlines()) == 5
@@ -0,0 +1,58 @@
+import json
+
+import pytest
+from typer.testing import CliRunner
+
+from todo import cli, config, database, todo, trace
+
+runner = CliRunner(mix_stderr=False)
+
+@pytest.fixture
+def mock_config(tmp_path, monkeypatch):                                         # a two-item json database
+    monkeypatch.setattr(config, "CONFIG_DIR_PATH", tmp_path)
+    monkeypatch.setattr(config, "CONFIG_FILE_PATH", tmp_path/"config.ini")
+    monkeypatch.delenv(trace.TRACE_ENV, raising=False)
+    db_file = tmp_path/"todo.json"
+    config.init_app(str(db_file))
+    database.init_database(db_file)
+    todo.Todoer(db_file).add_many([["Get milk"], ["Wash the car"]], 2)
+    return db_file
+
+def spans(text):
+    return [json.loads(line) for line in text.splitlines()]
+
+def test_profile_prints_spans(mock_config):
+    result = runner.invoke(cli.app, ["--profile", "add", "Pay", "rent"])
+    assert result.exit_code == 0
+    records = {record["span"]: record for record in spans(result.stderr)}
+    assert {"config.settings", "commit", "db.write", "command"} <= set(records)
+    assert records["db.write"]["rows"] == 3
+    assert records["db.write"]["bytes_written"] == mock_config.stat().st_size
+    assert records["command"]["depth"] == 0 and records["db.write"]["depth"] == 2
+    assert records["command"]["wall_ms"] >= records["commit"]["wall_ms"] >= records["db.write"]["wall_ms"]
+    assert records["command"]["peak_bytes"] >= records["commit"]["peak_bytes"]  # the peak of a span includes those of the spans inside it
+    assert not trace.enabled()
+
+def test_trace_file_and_sampling(mock_config, tmp_path, monkeypatch):
+    trace_file = tmp_path/"trace.jsonl"
+    monkeypatch.setenv(trace.TRACE_ENV, str(trace_file))
+    monkeypatch.setenv(trace.SAMPLE_ENV, "0")
+    assert runner.invoke(cli.app, ["list"]).exit_code == 0
+    assert not trace_file.exists()
+    monkeypatch.setenv(trace.SAMPLE_ENV, "1")
+    result = runner.invoke(cli.app, ["search", "--text", "milk", "--format", "jsonl"])
+    assert result.exit_code == 0 and result.stderr == ""
+    records = spans(trace_file.read_text())
+    assert {record["command"] for record in records} == {"search"}
+    assert [record for record in records if record["span"] == "render"][0]["rows"] == 1
+
+def test_spans_do_nothing_while_off():
+    assert trace.span("db.read") is trace.NO_SPAN
+    trace.add(rows=1)
+    assert trace.traced("db.read")(lambda value: value + 1)(1) == 2
+
+def test_memory_tracking_can_be_left_out(mock_config, monkeypatch):
+    monkeypatch.setenv(trace.MEMORY_ENV, "0")
+    result = runner.invoke(cli.app, ["--profile", "list"])
+    assert result.exit_code == 0
+    assert all("peak_bytes" not in record and record["wall_ms"] >= 0 for record in spans(result.stderr))
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+from typer.testing import CliRunner
+
+from todo import SUCCESS, cli, config, database, todo, transfer
+
+runner = CliRunner()
+
+@pytest.fixture(params=database.BACKENDS)
+def mock_config(request, tmp_path, monkeypatch):                                # a three-item database of every backend, whose last to-do was removed
+    monkeypatch.setattr(config, "CONFIG_DIR_PATH", tmp_path)
+    monkeypatch.setattr(config, "CONFIG_FILE_PATH", tmp_path/"config.ini")
+    db_file = tmp_path/"todo.db"
+    config.init_app(str(db_file), request.param)
+    database.init_database(db_file, request.param)
+    todoer = todo.Todoer(db_file, request.param)
+    todoer.add_many([["Get milk"], ["Wash the car"], ["Pay rent"]], 1)
+    todoer.remove(3)
+    return todoer
+
+def test_import_appends_in_chunks(mock_config):
+    todos = [{"Description": f"Task {n}.", "Priority": 3, "Done": n % 2 == 0} for n in range(5)]
+    assert mock_config.import_todos(iter(todos), chunk_size=2) == (5, SUCCESS)
+    assert [(row.todo_id, row.todo["Description"]) for row in mock_config.iter_todos()] == [
+        (1, "Get milk."), (2, "Wash the car."), (4, "Task 0."), (5, "Task 1."), (6, "Task 2."), (7, "Task 3."), (8, "Task 4."),
+    ]                                                                           # the ID of the removed to-do isn't given out again
+    assert mock_config.add(["Call mom"]).todo["ID"] == 9
+    assert mock_config.stats(verify=True).consistent
+
+def test_export_and_import_commands(mock_config, tmp_path):
+    result = runner.invoke(cli.app, ["export", "--format", "csv", "--output", str(tmp_path/"out.csv")])
+    assert result.exit_code == 0
+    assert (tmp_path/"out.csv").read_text().splitlines() == [
+        "ID,Description,Priority,Done,Due,Tags", "1,Get milk.,1,False,,", "2,Wash the car.,1,False,,",
+    ]
+    result = runner.invoke(cli.app, ["import", str(tmp_path/"out.csv")])
+    assert result.exit_code == 0
+    result = runner.invoke(cli.app, ["export"])
+    assert [json.loads(line) for line in result.stdout.splitlines()][2:] == [
+        {"ID": 4, "Description": "Get milk.", "Priority": 1, "Done": False},
+        {"ID": 5, "Description": "Wash the car.", "Priority": 1, "Done": False},
+    ]
+
+def test_invalid_rows_are_skipped(tmp_path):
+    lines = [
+        '{"Description": "Get milk", "Priority": 1, "Done": true}\n',
+        '{"Description": "Wash the car", "Priority": 4}\n',
+        "\n",
+        "not json\n",
+        '{"description": "Pay rent", "done": "no"}\n',
+        '{"Description": "Renew passport", "Due": "2026-11-01 09:00"}\n',
+        '{"description": "Book flights", "due": "soon"}\n',
+        '{"Description": "Restart db", "Tags": "ops, DB"}\n',
+    ]
+    errors = []
+    assert list(transfer.read_todos(lines, "jsonl", errors)) == [
+        {"Description": "Get milk.", "Priority": 1, "Done": True},
+        {"Description": "Pay rent.", "Priority": 2, "Done": False},
+        {"Description": "Renew passport.", "Priority": 2, "Done": False, "Due": "2026-11-01T09:00"},
+        {"Description": "Restart db.", "Priority": 2, "Done": False, "Tags": ["db", "ops"]},
+    ]
+    assert [error.line for error in errors] == [2, 4, 7]
+    assert "from 1 to 3" in errors[0].message
+
+@pytest.mark.parametrize("output_format", ["csv", "tsv"])
+def test_due_and_tags_survive_csv_round_trip(mock_config, tmp_path, output_format):
+    mock_config.add(["Restart db"], due="2026-11-01T09:00", tags=["ops", "team/db"])
+    out_file = tmp_path/f"out.{output_format}"
+    assert runner.invoke(cli.app, ["export", "--format", output_format, "--output", str(out_file)]).exit_code == 0
+    mock_config.remove_all()
+    assert runner.invoke(cli.app, ["import", str(out_file)]).exit_code == 0
+    assert [(todo_item.get("Due"), todo_item.get("Tags")) for todo_item in mock_config.get_todo_list()] == [
+        (None, None), (None, None), ("2026-11-01T09:00", ["ops", "team/db"]),
+    ]
@@ -1,9 +1,15 @@
 """Entry Point script - Allows you to run the package as an executable program"""
 # todo/__main__.py
 
-from todo import cli, __app_name__
+import sys
+
+from todo import __app_name__, __version__
 
 def main():
+    if sys.argv[1:] in (["--version"], ["-v"]):             # answered before Typer and the commands are imported, which is most of the start-up time
+        print(f"{__app_name__} v{__version__}")
+        return
+    from todo import cli
     cli.app(prog_name=__app_name__)     # providing a value to prog_name ensures that your users get the correct app name when running the --help option
 
 if __name__ == '__main__':
@@ -0,0 +1,118 @@
+"""This module provides an asyncio front end to the Todoer for services embedding it"""
+# todo/aio.py
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from todo.database import DEFAULT_BACKEND, DBResponse
+from todo.todo import CurrentStats, CurrentTodo, CurrentTodos, Todoer, new_todo
+
+Result = TypeVar("Result")
+
+class AsyncTodoer:                                                                  # offers the methods of todo.Todoer as coroutines. The file I/O runs on a worker thread, so the event loop keeps serving other requests meanwhile.
+    def __init__(self, db_path: Path, backend: str = DEFAULT_BACKEND) -> None:
+        self._todoer = Todoer(db_path, backend)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="todo")  # a single thread: Todoer and its indexes aren't shared between threads, and the writes are serialized anyway
+        self._pending: List[Tuple[Dict[str, Any], "asyncio.Future[DBResponse]"]] = []  # mutations waiting for the next group commit
+        self._flusher: Optional["asyncio.Task[None]"] = None
+        self._load: Optional["asyncio.Future[List[Dict[str, Any]]]"] = None  # the read in flight, which every reader arriving meanwhile awaits too
+
+    async def __aenter__(self) -> "AsyncTodoer":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Wait for the pending mutations and stop the worker thread"""
+        if self._flusher is not None:
+            await self._flusher
+        self._executor.shutdown(wait=True)
+
+    async def get_todo_list(self) -> List[Dict[str, Any]]:                          # the list is shared by every reader of the same load, so it must not be modified
+        """Return the to-do list, sharing one read between concurrent callers"""
+        if self._load is None:
+            load = asyncio.ensure_future(self._run(self._todoer.get_todo_list))
+            self._load = load
+            load.add_done_callback(self._forget_load)
+        return await asyncio.shield(self._load)                                     # a cancelled caller doesn't cancel the read the others are waiting for
+
+    async def stats(self, verify: bool = False) -> CurrentStats:
+        return await self._run(self._todoer.stats, verify)
+
+    async def add(
+        self, description: List[str], priority: int = 2, due: Optional[str] = None, tags: Optional[List[str]] = None
+    ) -> CurrentTodo:
+        todo = new_todo(description, priority, due, tags)
+        write = await self._commit({"op": "add", "todos": [todo]})
+        return CurrentTodo(write.todo_list[0] if write.todo_list else todo, write.error)
+
+    async def set_done(self, todo_id: int) -> CurrentTodo:
+        write = await self._commit({"op": "update", "ids": [todo_id], "set": {"Done": True}})
+        return CurrentTodo(write.todo_list[0] if write.todo_list else {}, write.error)
+
+    async def set_undone(self, todo_id: int) -> CurrentTodo:
+        write = await self._commit({"op": "update", "ids": [todo_id], "set": {"Done": False}})
+        return CurrentTodo(write.todo_list[0] if write.todo_list else {}, write.error)
+
+    async def remove(self, todo_id: int) -> CurrentTodo:
+        write = await self._commit({"op": "remove", "ids": [todo_id]})
+        return CurrentTodo(write.todo_list[0] if write.todo_list else {}, write.error)
+
+    async def remove_all(self) -> CurrentTodo:
+        write = await self._commit({"op": "clear"})
+        return CurrentTodo({}, write.error)
+
+    async def add_many(
+        self,
+        descriptions: List[List[str]],
+        priority: int = 2,
+        due: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+    ) -> CurrentTodos:
+        todos = [new_todo(description, priority, due, tags) for description in descriptions]
+        write = await self._commit({"op": "add", "todos": todos})
+        return CurrentTodos(write.todo_list or todos, write.error)
+
+    async def set_done_many(self, todo_ids: List[int]) -> CurrentTodos:
+        write = await self._commit({"op": "update", "ids": todo_ids, "set": {"Done": True}})
+        return CurrentTodos(write.todo_list, write.error)
+
+    async def set_undone_many(self, todo_ids: List[int]) -> CurrentTodos:
+        write = await self._commit({"op": "update", "ids": todo_ids, "set": {"Done": False}})
+        return CurrentTodos(write.todo_list, write.error)
+
+    async def remove_many(self, todo_ids: List[int]) -> CurrentTodos:
+        write = await self._commit({"op": "remove", "ids": todo_ids})
+        return CurrentTodos(write.todo_list, write.error)
+
+    async def _run(self, function: Callable[..., Result], *args: Any) -> Result:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    async def _commit(self, op: Dict[str, Any]) -> DBResponse:                      # mutations arriving while a group is being written are committed together by the next one
+        future: "asyncio.Future[DBResponse]" = asyncio.get_running_loop().create_future()
+        self._pending.append((op, future))
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.ensure_future(self._flush())
+        return await asyncio.shield(future)                                         # a cancelled caller's mutation may still be committed, like a request already sent
+
+    async def _flush(self) -> None:
+        while self._pending:
+            group, self._pending = self._pending, []
+            try:
+                responses = await self._run(self._todoer.commit_ops, [op for op, _ in group])  # one read-modify-write under the database lock for the whole group
+            except Exception as error:                                              # such as a to-do json can't serialize: every mutation of the group fails with it
+                for _, future in group:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+            self._load = None                                                       # readers arriving from now on see the new list
+            for (_, future), response in zip(group, responses):
+                if not future.done():
+                    future.set_result(response)
+
+    def _forget_load(self, load: "asyncio.Future[List[Dict[str, Any]]]") -> None:
+        if self._load is load:
+            self._load = None
@@ -0,0 +1,105 @@
+"""This module keeps archived to-dos in compressed segment files next to the database"""
+# todo/archive.py
+
+import heapq
+import importlib
+import json
+import os
+import re
+from itertools import islice
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from todo.database import TodoRow
+
+COMPRESSIONS = {"gz": "gzip", "xz": "lzma"}                                         # segment file extension: the standard library module that reads and writes it
+DEFAULT_COMPRESSION = "gz"                                                          # gzip is several times faster, lzma makes smaller segments
+SEGMENT_RE = re.compile(r"(\d+)\.jsonl\.(gz|xz)")                                   # the sequence number and compression of a segment, as in 000001.jsonl.gz
+POLICY_NAME = "policy.json"
+AUTO_ARCHIVE_MIN_DONE = 1000                                                        # the automatic policy leaves smaller numbers of done to-dos in the list, where they cost little
+
+def archive_dir(db_path: Path) -> Path:
+    """Return the directory holding the archive of a database"""
+    return db_path.with_name(db_path.name + ".archive")
+
+def read_policy(db_path: Path) -> Optional[float]:                                  # checked after mutations that mark to-dos done, so a list without a policy costs one failed open()
+    """Return the share of done to-dos, in percent, above which they are archived automatically, or None"""
+    try:
+        with (archive_dir(db_path)/POLICY_NAME).open("r") as policy:
+            return float(json.load(policy)["done_over"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+def write_policy(db_path: Path, done_over: Optional[float]) -> None:                # None turns automatic archiving off. Raises OSError.
+    """Store the automatic archiving policy of a database"""
+    path = archive_dir(db_path)/POLICY_NAME
+    if done_over is None:
+        path.unlink(missing_ok=True)
+        return
+    path.parent.mkdir(exist_ok=True)
+    path.write_text(json.dumps({"done_over": done_over}))
+
+class Archive:                                                                      # append-only: every run of "todo archive" writes one new segment and never changes the older ones
+    def __init__(self, db_path: Path) -> None:
+        self._dir = archive_dir(db_path)
+
+    def segments(self) -> List[Path]:
+        """Return the segment files, oldest first"""
+        try:
+            names = os.listdir(self._dir)
+        except OSError:                                                             # nothing was archived yet
+            return []
+        return sorted(self._dir/name for name in names if SEGMENT_RE.fullmatch(name))  # the numbers are zero-padded, so the names sort in the order they were written
+
+    def write_segment(self, todos: List[Dict[str, Any]], compression: str = DEFAULT_COMPRESSION) -> Path:  # raises OSError
+        """Store to-dos, ascending by ID, in a new segment and return its path"""
+        self._dir.mkdir(exist_ok=True)
+        segments = self.segments()
+        number = int(segments[-1].name.partition(".")[0]) + 1 if segments else 1
+        path = self._dir/f"{number:06d}.jsonl.{compression}"
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            with tmp_path.open("wb") as raw:
+                with _open(raw, compression, "wb") as segment:
+                    for start in range(0, len(todos), 1000):                        # one encoder call per thousand to-dos
+                        segment.write("".join(json.dumps(todo) + "\n" for todo in todos[start:start + 1000]).encode())
+                raw.flush()
+                os.fsync(raw.fileno())                                              # the to-dos are removed from the database next, so the segment must survive a crash first
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        return path
+
+    def iter_segment(self, path: Path) -> Iterator[Dict[str, Any]]:
+        """Yield the to-dos of one segment, decompressing it as they are consumed"""
+        with path.open("rb") as raw, _open(raw, path.suffix[1:], "rb") as segment:
+            for line in segment:
+                yield json.loads(line)
+
+    def iter_todos(self, reverse: bool = False) -> Iterator[Dict[str, Any]]:        # segments overlap in ID ranges, since any older to-do may be marked done later, so they are merged
+        """Yield every archived to-do in ID order"""
+        merged = heapq.merge(*(self.iter_segment(path) for path in self.segments()), key=_todo_id)
+        if reverse:                                                                 # compressed files can only be read forwards, so a descending listing holds the archive in memory
+            return iter(sorted(merged, key=_todo_id, reverse=True))
+        return merged
+
+def with_archived(
+    rows: Iterable[TodoRow],
+    db_path: Path,
+    reverse: bool = False,
+    offset: int = 0,
+    after: Optional[int] = None,
+    keep: Optional[Callable[[Dict[str, Any]], bool]] = None,
+) -> Iterator[TodoRow]:                                                             # rows are those of the database from the start, in the listing order. after is the last ID of the previous page and keep filters the archived to-dos.
+    """Yield the rows of a listing merged with the archived to-dos"""
+    archived = (TodoRow(todo["ID"], todo, 0) for todo in Archive(db_path).iter_todos(reverse) if keep is None or keep(todo))  # an archived row resumes by ID only
+    merged: Iterator[TodoRow] = heapq.merge(rows, archived, key=lambda row: row.todo_id, reverse=reverse)
+    if after is not None:
+        merged = (row for row in merged if (row.todo_id < after if reverse else row.todo_id > after))
+    return islice(merged, offset, None)
+
+def _todo_id(todo: Dict[str, Any]) -> int:
+    return todo["ID"]
+
+def _open(raw: IO[bytes], compression: str, mode: str) -> Any:                      # only the module of the compression in use is imported
+    return importlib.import_module(COMPRESSIONS[compression]).open(raw, mode)
@@ -0,0 +1,68 @@
+"""This module reads the command scripts run by "todo batch" """
+# todo/batch.py
+
+import shlex
+from typing import Any, Dict, Iterable, List, Mapping, NamedTuple
+
+import click
+
+from todo.todo import new_todo, parse_ids
+from todo.transfer import RowError
+
+BATCH_COMMANDS = ("add", "mark_done", "mark_undone", "remove", "clear")             # the commands a script may hold: those that change the list
+
+class Step(NamedTuple):                                                             # one command of a script and the mutation it stands for
+    line: int
+    command: str                                                                    # as written in the script
+    op: Dict[str, Any]
+
+def read_script(
+    lines: Iterable[str], commands: Mapping[str, click.Command], errors: List[RowError]
+) -> List[Step]:                                                                    # commands maps command names to the click commands of the CLI, whose options and arguments every line is parsed with
+    """Return the steps of a script, appending the lines that aren't valid commands to errors"""
+    steps = []
+    for line_number, line in enumerate(lines, 1):
+        text = line.strip()
+        if not text or text.startswith("#"):                                        # blank lines and comments
+            continue
+        try:
+            words = shlex.split(text)                                               # quoting works as in a shell
+            if words[0] == "todo":                                                  # lines copied from a shell script keep working
+                words = words[1:]
+            if not words:
+                continue
+            op = _parse(words, commands)
+        except (ValueError, OSError) as exc:                                        # OSError: a file named by "add --from-file" can't be read
+            errors.append(RowError(line_number, str(exc)))
+            continue
+        if op is not None:
+            steps.append(Step(line_number, text, op))
+    return steps
+
+def _parse(words: List[str], commands: Mapping[str, click.Command]) -> Any:         # returns the mutation of a command, or None for "clear --no-force", and raises ValueError
+    name, args = words[0], words[1:]
+    if name not in BATCH_COMMANDS:
+        raise ValueError(f'"{name}" can\'t run in a batch, use one of: {", ".join(BATCH_COMMANDS)}')
+    if name == "clear" and not {"--force", "--no-force"} & set(args):               # a batch never prompts, so the answer must be written out
+        raise ValueError('"clear" needs --force in a batch')
+    try:
+        params = commands[name].make_context(name, args).params                     # parsed and validated as on the command line, without running the command
+    except click.ClickException as exc:
+        raise ValueError(exc.format_message()) from None
+    if name == "add":
+        descriptions = [params["description"]] if params["description"] else []
+        if params["from_file"] is not None:
+            with params["from_file"].open("r") as lines:
+                descriptions.extend([line.strip()] for line in lines if line.strip())
+        if not descriptions:
+            raise ValueError('Missing argument "DESCRIPTION..."')
+        return {
+            "op": "add",
+            "todos": [new_todo(description, params["priority"], params["due"], params["tags"]) for description in descriptions],
+        }
+    if name == "clear":
+        return {"op": "clear"} if params["force"] else None
+    todo_ids = parse_ids(params["todo_ids"])
+    if name == "remove":                                                            # the script itself stands for the confirmation, so --force makes no difference
+        return {"op": "remove", "ids": todo_ids}
+    return {"op": "update", "ids": todo_ids, "set": {"Done": name == "mark_done"}}
@@ -0,0 +1,396 @@
+"""This module provides the binary storage backend of fixed-width records read through mmap"""
+# todo/binarydb.py
+
+import json
+import mmap
+import os
+import struct
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from todo import DB_READ_ERROR, DB_WRITE_ERROR, ID_ERROR, SUCCESS, trace
+from todo.database import (
+    BINARY_MAGIC, COPY_BLOCK, TOMBSTONE, CountResponse, DatabaseHandler, DBResponse, TodoRow,
+    _fd_stamp, compact, number_todos, with_id,
+)
+from todo.locking import try_exclusive_lock
+from todo.stats import Counters, count_in, count_out, count_todos, store_counts
+
+HEADER = struct.Struct("<8sQQ")                                                     # magic, generation, number of records. The records follow the header and the heap follows the records.
+RECORD = struct.Struct("<QQIIiBB2x")                                                # ID, heap offset, description bytes, extra bytes, priority, done flag, deleted flag
+GENERATION_AT = 8                                                                   # offsets of the fields rewritten in place: the generation within the header ...
+PRIORITY_AT = 24                                                                    # ... and the priority, done and deleted fields within a record
+DONE_AT = 28
+DELETED_AT = 29
+FIELDS = ("ID", "Description", "Priority", "Done")                                  # every other key of a to-do is kept as a JSON object after its description, see _pack()
+DECODE_MIN_ROWS = 128                                                               # records decoded with one iter_unpack() call by iter_todos(). Runs start short, so the first page comes back quickly, and grow for long listings.
+DECODE_MAX_ROWS = 16384
+IN_PLACE_KEYS = {"Priority", "Done"}                                                # updates of these fixed-width fields are written over the old values instead of rewriting the file
+Write = Tuple[int, bytes]                                                           # an in-place write: the file offset and the bytes written there
+
+class BinaryDatabaseHandler(DatabaseHandler):                                       # stores one fixed-width record per to-do, so marking a to-do done or removing it overwrites a byte instead of rewriting the whole list
+    def __init__(self, db_path: Path) -> None:
+        super().__init__(db_path)
+        if redo_path(db_path).exists():                                             # a writer crashed in the middle of a group. If another writer holds the lock, it finishes the group before its own.
+            with try_exclusive_lock(db_path) as locked:
+                if locked:
+                    try:
+                        redo(db_path)
+                    except OSError:
+                        pass
+
+    @trace.traced("db.read")
+    def read_todos(self) -> DBResponse:                                             # decoded straight from the mapped file, so it needs no snapshot cache
+        try:
+            with self._db_path.open("rb") as db, _map(db) as (view, count):
+                todo_list = compact(_todos_between(view, count, 0, count))
+                trace.add(rows=len(todo_list), bytes_read=len(view))
+        except (OSError, ValueError):                                               # ValueError: not a file of fixed-width records
+            return DBResponse([], DB_READ_ERROR)
+        return DBResponse(todo_list, SUCCESS)
+
+    def write_todos(
+        self, todo_list: List[Dict[str, Any]], counters: Optional[Counters] = None
+    ) -> DBResponse:
+        todo_list = compact(number_todos(todo_list))
+        try:
+            stamp = write_binary(self._db_path, todo_list)
+            store_counts(self._db_path, stamp, counters if counters is not None else count_todos(
+                todo for todo in todo_list if TOMBSTONE not in todo
+            ))
+            return DBResponse(todo_list, SUCCESS)
+        except OSError:
+            return DBResponse(todo_list, DB_WRITE_ERROR)
+
+    def iter_todos(
+        self,
+        reverse: bool = False,
+        offset: int = 0,
+        after: Optional[Tuple[int, int]] = None,
+        stream: bool = False,
+    ) -> Iterator[TodoRow]:                                                         # records are found by bisecting their IDs and only the rows consumed are decoded, so stream changes nothing. Resume positions are to-do IDs.
+        try:
+            with self._db_path.open("rb") as db, _map(db) as (view, count):
+                if reverse:
+                    slot, stop, step = (_first_slot_after(view, count, after[0] - 1) if after else count) - 1, -1, -1
+                else:
+                    slot, stop, step = _first_slot_after(view, count, after[0]) if after else 0, count, 1
+                while offset and slot != stop:                                      # skipped to-dos are never decoded, only their deleted flag is read
+                    if not view[_record_at(slot) + DELETED_AT]:
+                        offset -= 1
+                    slot += step
+                rows = DECODE_MIN_ROWS
+                while slot != stop:
+                    if reverse:
+                        end = max(slot - rows, stop)
+                        todos = _todos_between(view, count, end + 1, slot + 1)[::-1]
+                    else:
+                        end = min(slot + rows, stop)
+                        todos = _todos_between(view, count, slot, end)
+                    for todo in todos:
+                        if TOMBSTONE not in todo:
+                            yield TodoRow(todo["ID"], todo, todo["ID"])
+                    slot = end
+                    rows = min(rows * 2, DECODE_MAX_ROWS)
+        except (OSError, ValueError):
+            return
+
+    def stamp(self) -> Optional[Tuple[int, ...]]:                                   # in-place writes keep the inode and size, and mtime may not tick between two of them, so the generation they bump joins the stamp
+        try:
+            with self._db_path.open("rb") as db:
+                header = db.read(HEADER.size)
+                stamp = _fd_stamp(db.fileno())
+        except OSError:
+            return None
+        if len(header) < HEADER.size or header[:len(BINARY_MAGIC)] != BINARY_MAGIC:
+            return stamp
+        return stamp + (HEADER.unpack(header)[1],)
+
+    def get_todos(self, todo_ids: List[int]) -> DBResponse:                         # each ID is found by bisection, so a lookup decodes only the to-dos it returns
+        try:
+            with self._db_path.open("rb") as db, _map(db) as (view, count):
+                found = []
+                for todo_id in todo_ids:
+                    slot = _slot_of(view, count, todo_id)
+                    if slot is not None:
+                        found.extend(_todos_between(view, count, slot, slot + 1))
+        except (OSError, ValueError):
+            return DBResponse([], DB_READ_ERROR)
+        return DBResponse(found, SUCCESS)
+
+    def commit(self, ops: List[Dict[str, Any]]) -> List[DBResponse]:                # groups that only flip fields in place skip the read-modify-write of the whole list
+        if not all(_in_place(op) for op in ops) or _shares_ids(ops):
+            return super().commit(ops)
+        try:
+            redo(self._db_path)                                                     # commits run under the lock, so a log found now was left by a crash
+            counters = self.read_counts()
+            with self._db_path.open("r+b") as db, _map(db) as (view, count):
+                with trace.span("db.write") as span:
+                    planned = [_plan_in_place(view, count, op, counters) for op in ops]
+                    responses = [response for response, _ in planned]
+                    writes = [write for _, op_writes in planned for write in op_writes]
+                    if not writes:                                                  # every mutation was rejected, so nothing is written
+                        return responses
+                    _write_group(self._db_path, db.fileno(), HEADER.unpack_from(view)[1], writes)
+                    span.add(rows=sum(len(response.todo_list) for response in responses))
+        except (OSError, ValueError):
+            return [DBResponse([], DB_WRITE_ERROR) for _ in ops]
+        if counters is not None:
+            store_counts(self._db_path, self.stamp(), counters)
+        return responses
+
+    def import_todos(self, chunks: Iterable[List[Dict[str, Any]]]) -> CountResponse:  # the old records and heap are copied as they are and the new to-dos follow them, a chunk at a time
+        tmp_path = self._db_path.with_name(f"{self._db_path.name}.{os.getpid()}.tmp")
+        count = 0
+        try:
+            redo(self._db_path)                                                     # the old records are copied as they are, so an interrupted group is finished first
+            counters = self.read_counts()
+            with self._db_path.open("rb") as db, _map(db) as (view, old_count):
+                heap_start = HEADER.size + old_count * RECORD.size
+                highest = RECORD.unpack_from(view, _record_at(old_count - 1))[0] if old_count else 0
+                with tmp_path.open("wb") as out, tempfile.TemporaryFile(dir=self._db_path.parent) as heap:
+                    out.write(view[:heap_start])                                    # the header is written again once the records are counted
+                    for pos in range(heap_start, len(view), COPY_BLOCK):
+                        heap.write(view[pos:pos + COPY_BLOCK])
+                    heap_size = len(view) - heap_start
+                    for chunk in chunks:
+                        todos = [with_id(todo, todo_id) for todo_id, todo in enumerate(chunk, highest + 1)]
+                        if not todos:
+                            continue
+                        highest += len(todos)
+                        count += len(todos)
+                        records, entries, heap_size = _pack(todos, heap_size)
+                        out.write(records)
+                        heap.write(entries)
+                        if counters is not None:
+                            count_in(counters, todos)
+                    heap.seek(0)
+                    for block in iter(lambda: heap.read(COPY_BLOCK), b""):
+                        out.write(block)
+                    out.seek(0)
+                    out.write(HEADER.pack(BINARY_MAGIC, 0, old_count + count))
+                    out.flush()
+                    os.fsync(out.fileno())
+                    stamp = _fd_stamp(out.fileno()) + (0,)
+                    trace.add(bytes_written=stamp[1])
+            if count:
+                os.replace(tmp_path, self._db_path)
+        except (OSError, ValueError):
+            return CountResponse(0, DB_WRITE_ERROR)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        if count and counters is not None:
+            store_counts(self._db_path, stamp, counters)
+        return CountResponse(count, SUCCESS)
+
+    def persist(
+        self, ops: List[Dict[str, Any]], todo_list: List[Dict[str, Any]], counters: Optional[Counters] = None
+    ) -> int:                                                                       # the todo serve daemon writes flags in place too, and rewrites the file for anything else
+        if not all(_in_place(op) for op in ops):
+            return self.write_todos(todo_list, counters).error
+        errors = [response.error for response in self.commit(ops) if response.error]
+        return errors[0] if errors else SUCCESS
+
+@trace.traced("db.write")
+def write_binary(db_path: Path, todo_list: List[Dict[str, Any]]) -> Tuple[int, ...]:  # raises OSError
+    """Replace a binary database atomically with the given to-do list and return its stamp"""
+    records, heap, _ = _pack(todo_list, 0)
+    tmp_path = db_path.with_name(f"{db_path.name}.{os.getpid()}.tmp")
+    try:
+        with tmp_path.open("wb") as db:
+            db.write(HEADER.pack(BINARY_MAGIC, 0, len(todo_list)))
+            db.write(records)
+            db.write(heap)
+            db.flush()
+            os.fsync(db.fileno())
+            stamp = _fd_stamp(db.fileno()) + (0,)                                   # a new file starts again from generation 0, and its inode tells it apart from the old one
+            trace.add(rows=len(todo_list), bytes_written=stamp[1])
+        os.replace(tmp_path, db_path)
+    except Exception:                                                               # including a to-do whose fields don't fit in a record, which leaves the database untouched
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return stamp
+
+def redo_path(db_path: Path) -> Path:
+    """Return the path of the log that a group of in-place writes leaves next to a database while it is written"""
+    return db_path.with_name(db_path.name + ".redo")
+
+def redo(db_path: Path) -> None:                                                    # runs under the lock. Raises OSError.
+    """Finish the group of in-place writes that a crash interrupted, if any"""
+    log_path = redo_path(db_path)
+    try:
+        with log_path.open("r") as log:
+            group = json.load(log)
+    except FileNotFoundError:
+        return
+    except ValueError:                                                              # the log itself was cut short, so no record was written yet
+        group = None
+    if group is not None:
+        with db_path.open("r+b") as db:
+            header = db.read(HEADER.size)
+            stat = os.fstat(db.fileno())
+            if (
+                [stat.st_ino, stat.st_size] == group["file"]
+                and len(header) == HEADER.size
+                and HEADER.unpack(header)[1] in (group["generation"], group["generation"] + 1)
+            ):                                                                      # anything else means the file was rewritten or changed since, and the log no longer applies
+                for offset, data in group["writes"]:
+                    os.pwrite(db.fileno(), bytes.fromhex(data), offset)
+                os.fsync(db.fileno())
+    log_path.unlink(missing_ok=True)
+
+def _write_group(db_path: Path, fd: int, generation: int, writes: List[Write]) -> None:  # raises OSError
+    """Write a group of in-place changes so that a crash leaves either all of them or none"""
+    bump = (GENERATION_AT, struct.pack("<Q", generation + 1))                       # the generation joins the stamp, so caches checked against it see the change
+    if len(writes) == 1:                                                            # one flag or priority can't be half written, so it only has to reach the disk after the generation does
+        for offset, data in (bump, writes[0]):
+            os.pwrite(fd, data, offset)
+            os.fsync(fd)
+        return
+    log_path = redo_path(db_path)
+    stat = os.fstat(fd)
+    with log_path.open("w") as log:                                                 # written before any record, so redo() can finish the group after a crash
+        json.dump({
+            "file": [stat.st_ino, stat.st_size],
+            "generation": generation,
+            "writes": [[offset, data.hex()] for offset, data in [bump, *writes]],
+        }, log)
+        log.flush()
+        os.fsync(log.fileno())
+    dir_fd = os.open(db_path.parent, os.O_RDONLY)                                   # the name of the log must reach the disk too
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+    for offset, data in [bump, *writes]:
+        os.pwrite(fd, data, offset)
+    os.fsync(fd)
+    log_path.unlink()
+
+def _pack(todos: List[Dict[str, Any]], heap_size: int) -> Tuple[bytes, bytes, int]:  # returns the records, the heap entries they point to and the heap size after them
+    records = []
+    entries = []
+    for todo in todos:
+        if TOMBSTONE in todo:
+            records.append(RECORD.pack(todo["ID"], heap_size, 0, 0, 0, 0, 1))
+            continue
+        description = todo["Description"].encode()
+        extra = {key: value for key, value in todo.items() if key not in FIELDS}
+        extra_bytes = json.dumps(extra).encode() if extra else b""
+        records.append(RECORD.pack(
+            todo["ID"], heap_size, len(description), len(extra_bytes), todo["Priority"], bool(todo["Done"]), 0,
+        ))
+        entries.append(description)
+        entries.append(extra_bytes)
+        heap_size += len(description) + len(extra_bytes)
+    return b"".join(records), b"".join(entries), heap_size
+
+class _map:                                                                         # maps an open database file and yields a memoryview of it with its number of records. Raises ValueError for any other file.
+    def __init__(self, db: Any) -> None:
+        self._db = db
+
+    def __enter__(self) -> Tuple[memoryview, int]:
+        self._buffer = mmap.mmap(self._db.fileno(), 0, access=mmap.ACCESS_READ)     # an empty file can't be mapped either
+        self._view = memoryview(self._buffer)
+        magic, _, count = HEADER.unpack_from(self._view) if len(self._view) >= HEADER.size else (b"", 0, 0)
+        if magic != BINARY_MAGIC or len(self._view) < HEADER.size + count * RECORD.size:
+            self.__exit__()
+            raise ValueError("not a database of fixed-width records")
+        return self._view, count
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._view.release()                                                        # the mapping can only be closed once no view of it is left
+        self._buffer.close()
+
+def _record_at(slot: int) -> int:
+    return HEADER.size + slot * RECORD.size
+
+def _todos_between(view: memoryview, count: int, start: int, stop: int) -> List[Dict[str, Any]]:  # the records of slots start to stop, removed ones as tombstones, decoded with one iter_unpack() call and one copy of their heap entries
+    if start >= stop:
+        return []
+    first = RECORD.unpack_from(view, _record_at(start))
+    last = RECORD.unpack_from(view, _record_at(stop - 1))
+    base = first[1]                                                                 # heap entries are laid out in the order of their records
+    heap_start = HEADER.size + count * RECORD.size
+    entries = bytes(view[heap_start + base:heap_start + last[1] + last[2] + last[3]])
+    text = entries.decode("ascii") if entries.isascii() else None                   # then byte offsets are character offsets, and descriptions are sliced out of one decoded string
+    todos = []
+    for todo_id, offset, size, extra_size, priority, done, deleted in RECORD.iter_unpack(view[_record_at(start):_record_at(stop)]):
+        if deleted:
+            todos.append({"ID": todo_id, TOMBSTONE: True})
+            continue
+        pos = offset - base
+        todo = {
+            "ID": todo_id,
+            "Description": text[pos:pos + size] if text is not None else entries[pos:pos + size].decode(),
+            "Priority": priority,
+            "Done": done == 1,
+        }
+        if extra_size:
+            todo.update(json.loads(entries[pos + size:pos + size + extra_size]))
+        todos.append(todo)
+    return todos
+
+def _first_slot_after(view: memoryview, count: int, todo_id: int) -> int:           # IDs grow along the records, so the slot is found by bisection, even when todo_id itself was removed
+    low, high = 0, count
+    while low < high:
+        middle = (low + high) // 2
+        if RECORD.unpack_from(view, _record_at(middle))[0] <= todo_id:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+def _slot_of(view: memoryview, count: int, todo_id: int) -> Optional[int]:          # None when no live to-do has the ID
+    slot = _first_slot_after(view, count, todo_id - 1)
+    if slot < count and RECORD.unpack_from(view, _record_at(slot))[0] == todo_id and not view[_record_at(slot) + DELETED_AT]:
+        return slot
+    return None
+
+def _in_place(op: Dict[str, Any]) -> bool:
+    if op["op"] == "remove":
+        return True
+    changes = op["set"] if op["op"] == "update" else {}
+    return (
+        op["op"] == "update"
+        and set(changes) <= IN_PLACE_KEYS
+        and type(changes.get("Done", False)) is bool
+        and type(changes.get("Priority", 0)) is int
+        and -2**31 <= changes.get("Priority", 0) < 2**31                            # anything else takes the rewrite, which rejects what a record can't hold
+    )
+
+def _shares_ids(ops: List[Dict[str, Any]]) -> bool:                                 # every mutation is planned against the file as it was before the group, so one that follows another on the same to-do takes the rewrite
+    seen: Set[int] = set()
+    for op in ops:
+        todo_ids = set(op["ids"])
+        if seen & todo_ids:
+            return True
+        seen |= todo_ids
+    return False
+
+def _plan_in_place(
+    view: memoryview, count: int, op: Dict[str, Any], counters: Optional[Counters]
+) -> Tuple[DBResponse, List[Write]]:                                                # a mutation holding an invalid ID is rejected as a whole, with no writes
+    todo_ids = list(dict.fromkeys(op["ids"])) if op["op"] == "remove" else op["ids"]
+    slots = [_slot_of(view, count, todo_id) for todo_id in todo_ids]
+    if None in slots:
+        return DBResponse([], ID_ERROR), []
+    before = [_todos_between(view, count, slot, slot + 1)[0] for slot in slots]
+    if op["op"] == "remove":
+        if counters is not None:
+            count_out(counters, before)
+        return DBResponse(before, SUCCESS), [(_record_at(slot) + DELETED_AT, b"\x01") for slot in slots]
+    changes = op["set"]
+    writes = []
+    for slot in dict.fromkeys(slots):
+        if "Priority" in changes:
+            writes.append((_record_at(slot) + PRIORITY_AT, struct.pack("<i", changes["Priority"])))
+        if "Done" in changes:
+            writes.append((_record_at(slot) + DONE_AT, b"\x01" if changes["Done"] else b"\x00"))  # marking a to-do done is this one byte
+    after = [dict(todo, **changes) for todo in before]
+    if counters is not None:
+        unique = list({todo["ID"]: todo for todo in before}.values())
+        count_out(counters, unique)
+        count_in(counters, (dict(todo, **changes) for todo in unique))
+    return DBResponse(after, SUCCESS), writes
@@ -0,0 +1,189 @@
+"""This module provides the bitmap indexes the search command evaluates queries over"""
+# todo/bitmaps.py
+
+import marshal
+import os
+import zlib
+from array import array
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from todo.table import TodoTable
+
+INDEX_FORMAT = 1                                                                    # bumped whenever the layout of the bitmap file changes
+
+def index_path(db_path: Path) -> Path:
+    """Return the path of the bitmap index kept next to a database"""
+    return db_path.with_name(db_path.name + ".bitmaps")
+
+def bitmap_from_ids(todo_ids: Iterable[int]) -> int:
+    """Return the bitmap with the bits of the given IDs set"""
+    todo_ids = list(todo_ids)
+    if not todo_ids:
+        return 0
+    bits = bytearray(max(todo_ids) // 8 + 1)
+    for todo_id in todo_ids:
+        bits[todo_id >> 3] |= 1 << (todo_id & 7)
+    return int.from_bytes(bits, "little")
+
+def ids_of(bitmap: int) -> List[int]:                                               # bin() and str.rfind() walk the bitmap in C, so the Python loop runs once per match
+    """Return the IDs whose bits are set, in ascending order"""
+    bits = bin(bitmap)
+    top = len(bits) - 1
+    todo_ids = []
+    index = bits.rfind("1")
+    while index > 1:                                                                # bits[:2] is the "0b" prefix
+        todo_ids.append(top - index)
+        index = bits.rfind("1", 0, index)
+    return todo_ids
+
+class Bitmaps:                                                                      # one arbitrary-precision int per set of to-dos, bit n standing for the to-do with ID n, so & | ~ combine whole sets a machine word at a time
+    __slots__ = ("live", "done", "priorities", "tags", "packed")
+
+    def __init__(
+        self,
+        live: int = 0,
+        done: int = 0,
+        priorities: Optional[Dict[int, int]] = None,
+        tags: Optional[Dict[str, int]] = None,
+        packed: Optional[Dict[str, bytes]] = None,
+    ) -> None:
+        self.live = live                                                            # every to-do that exists
+        self.done = done
+        self.priorities = priorities if priorities is not None else {}              # one bitmap per priority value
+        self.tags = tags if tags is not None else {}                                # one bitmap per tag, for the tags in use since loading. Bits of removed to-dos may stay set, so they are only read through tag().
+        self.packed = packed if packed is not None else {}                          # the zlib-compressed bitmap of every tag that hasn't changed since loading, as stored in the index file
+
+    def tag(self, name: str) -> int:                                                # a query decompresses only the tags it names
+        """Return the bitmap of the to-dos carrying a tag"""
+        bitmap = self.tags.get(name)
+        if bitmap is None:
+            packed = self.packed.get(name)
+            if packed is None:
+                return 0
+            bitmap = self.tags[name] = int.from_bytes(zlib.decompress(packed), "little")
+        return bitmap & self.live
+
+    def pack(self) -> Dict[str, bytes]:                                             # tags that didn't change keep the bytes they were loaded with, so storing the index compresses only the changed ones
+        """Return the compressed bitmap of every tag"""
+        for name, bitmap in self.tags.items():
+            if name not in self.packed:
+                self.packed[name] = zlib.compress(bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little"), 1)  # a tag held by few to-dos is mostly zero bytes, which compress to almost nothing
+        return self.packed
+
+    @classmethod
+    def from_table(cls, table: TodoTable) -> "Bitmaps":
+        """Build the bitmaps of every to-do of a table"""
+        priorities = table.priorities.tobytes()
+        return cls(
+            _column_bitmap(b"\x01" * len(table), 1, table.ids),
+            _column_bitmap(bytes(table.done), 1, table.ids),
+            {priority: _column_bitmap(priorities, priority & 0xFF, table.ids) for priority in set(table.priorities)},
+            {tag: bitmap_from_ids(todo_ids) for tag, todo_ids in table.tags.items()},
+        )
+
+    def add(self, todos: Sequence[Dict[str, Any]]) -> None:                         # takes the to-dos as returned by the database, carrying their new IDs
+        self.live |= bitmap_from_ids(todo["ID"] for todo in todos)
+        self.done |= bitmap_from_ids(todo["ID"] for todo in todos if todo["Done"])
+        for priority in {todo["Priority"] for todo in todos}:
+            added = bitmap_from_ids(todo["ID"] for todo in todos if todo["Priority"] == priority)
+            self.priorities[priority] = self.priorities.get(priority, 0) | added
+        for tag in {tag for todo in todos for tag in todo.get("Tags", ())}:
+            added = bitmap_from_ids(todo["ID"] for todo in todos if tag in todo.get("Tags", ()))
+            self.tags[tag] = self.tag(tag) | added
+            self.packed.pop(tag, None)
+
+    def update(self, todo_ids: List[int], changes: Dict[str, Any]) -> None:
+        changed = bitmap_from_ids(todo_ids)
+        if "Done" in changes:
+            self.done = self.done | changed if changes["Done"] else self.done & ~changed
+        if "Priority" in changes:
+            self._discard(changed)
+            self.priorities[changes["Priority"]] = self.priorities.get(changes["Priority"], 0) | changed
+
+    def remove(self, todo_ids: List[int]) -> None:                                  # IDs aren't given out again, so the tag bitmaps may keep the bits of removed to-dos: tag() masks them with live
+        removed = bitmap_from_ids(todo_ids)
+        self.live &= ~removed
+        self.done &= ~removed
+        self._discard(removed)
+
+    def _discard(self, todo_bits: int) -> None:
+        for priority, bitmap in self.priorities.items():
+            self.priorities[priority] = bitmap & ~todo_bits
+
+def _column_bitmap(column: bytes, value: int, todo_ids: "array[int]") -> int:       # sets the bit of the ID of every row whose byte in column equals value
+    if not todo_ids:
+        return 0
+    try:
+        import numpy                                                                # imported only when bitmaps are built, so mutations that update them don't pay for it
+    except ImportError:                                                             # the columns are then turned into bitmaps with bytes.translate(), which is slower but still runs in C
+        numpy = None
+    if numpy is not None:
+        flags = numpy.zeros(todo_ids[-1] + 1, numpy.uint8)
+        flags[numpy.frombuffer(todo_ids, numpy.int64)] = numpy.frombuffer(column, numpy.uint8) == value
+        return int.from_bytes(numpy.packbits(flags, bitorder="little").tobytes(), "little")
+    digits = column.translate(bytes(0x31 if byte == value else 0x30 for byte in range(256)))  # b"1" for every matching row and b"0" for the others
+    if todo_ids[-1] == len(todo_ids):                                               # no to-do was removed, so row n holds ID n + 1
+        return int(digits[::-1], 2) << 1
+    by_id = bytearray(b"0") * (todo_ids[-1] + 1)
+    for todo_id, digit in zip(todo_ids, digits):
+        by_id[todo_id] = digit
+    return int(by_id[::-1], 2)
+
+class BitmapIndex:                                                                  # the bitmaps of a database in a marshal file next to it, small enough to be loaded and rewritten whole by every mutation
+    def __init__(self, db_path: Path) -> None:
+        self._index_path = index_path(db_path)
+
+    def exists(self) -> bool:
+        return self._index_path.exists()
+
+    def is_current(self, stamp: Optional[Tuple[int, ...]]) -> bool:
+        return self.load(stamp) is not None
+
+    def drop(self) -> None:                                                         # the next query rebuilds the bitmaps from the database
+        self._index_path.unlink(missing_ok=True)
+
+    def load(self, stamp: Optional[Tuple[int, ...]]) -> Optional[Bitmaps]:          # None unless the bitmaps were last updated against the database state identified by stamp
+        if stamp is None:
+            return None
+        try:
+            with self._index_path.open("rb") as index:
+                version, stored_stamp, *bitmaps = marshal.loads(index.read())
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        if version != (INDEX_FORMAT, marshal.version) or tuple(stored_stamp) != tuple(stamp):
+            return None
+        live, done, priorities, packed = bitmaps
+        return Bitmaps(live, done, priorities, packed=packed)
+
+    def store(self, bitmaps: Bitmaps, stamp: Optional[Tuple[int, ...]]) -> None:    # raises OSError
+        tmp_path = self._index_path.with_name(f"{self._index_path.name}.{os.getpid()}.tmp")
+        try:
+            tmp_path.write_bytes(marshal.dumps(
+                ((INDEX_FORMAT, marshal.version), stamp, bitmaps.live, bitmaps.done, bitmaps.priorities, bitmaps.pack())
+            ))
+            os.replace(tmp_path, self._index_path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    def add(self, todos: List[Dict[str, Any]], stamp: Optional[Tuple[int, ...]]) -> None:
+        self._change(lambda bitmaps: bitmaps.add(todos), stamp)
+
+    def update(self, todo_ids: List[int], changes: Dict[str, Any], stamp: Optional[Tuple[int, ...]]) -> None:
+        self._change(lambda bitmaps: bitmaps.update(todo_ids, changes), stamp)
+
+    def remove(self, todo_ids: List[int], stamp: Optional[Tuple[int, ...]]) -> None:
+        self._change(lambda bitmaps: bitmaps.remove(todo_ids), stamp)
+
+    def clear(self, stamp: Optional[Tuple[int, ...]]) -> None:
+        self.store(Bitmaps(), stamp)
+
+    def _change(self, change: Callable[[Bitmaps], None], stamp: Optional[Tuple[int, ...]]) -> None:  # called by todo.Todoer only while the stored bitmaps match the database as it was before the mutation
+        try:
+            with self._index_path.open("rb") as index:
+                _, _, live, done, priorities, packed = marshal.loads(index.read())
+        except (OSError, EOFError, ValueError, TypeError) as error:
+            raise OSError(f"unreadable bitmap index: {error}") from error
+        bitmaps = Bitmaps(live, done, priorities, packed=packed)
+        change(bitmaps)
+        self.store(bitmaps, stamp)
@@ -1,33 +1,66 @@
 """This module provides the Command-Line Interface for the To-Do Application"""
 # todo/cli.py
 
+import itertools
+import shlex
 from pathlib import Path
-from typing import Optional, List
+from typing import TYPE_CHECKING, Any, Dict, Iterator, Optional, List, Tuple
 
+import click
 import typer
 
-from todo import ERRORS, __app_name__, __version__, config, database, todo
+from todo import ERRORS, __app_name__, __version__, config, database, render, todo, trace
 
-app = typer.Typer()
+if TYPE_CHECKING:
+    from todo import query                                                      # imported lazily by the commands that filter
+
+class _CommandGroup(click.Group):                                               # reports a daemon that goes away in the middle of a command instead of printing a traceback
+    def invoke(self, ctx: click.Context) -> Any:
+        try:
+            return super().invoke(ctx)
+        except Exception as error:
+            from todo.client import DaemonError                                 # imported only here: the module is loaded anyway whenever a daemon could have been reached
+            if not isinstance(error, DaemonError):
+                raise
+            typer.secho(
+                f'The "todo serve" daemon stopped answering ({error}). Run the command again to use the database directly',
+                fg=typer.colors.RED,
+            )
+            raise typer.Exit(1)
+
+app = typer.Typer(cls=_CommandGroup)
+list_name = config.DEFAULT_LIST                                                 # the list chosen with "todo --list NAME", set by main() before any command runs
 
 @app.command()                                                                  # define init() as a Typer command using the @app.command() decorator
 def init(
     db_path: str = typer.Option(                                                # define a Typer Option instance and assign it as a default value to db_path.
-        str(database.DEFAULT_DB_FILE_PATH), 
+        lambda: str(database.default_database_path(None if list_name == config.DEFAULT_LIST else list_name)),  # a callable default is only evaluated when "todo init" runs, after main() has read --list
         "--db-path",                                                            # command-line name of option to be follwed by database path
         "-db",                                                                  # command-line name of option to be follwed by database path
         prompt="Enter To-Do List database location"                             # the prompt argument displays a prompt asking for a database location. It also allows the user to accept the default path by pressing Enter
     ),
+    backend: str = typer.Option(                                                # defines backend as a Typer option with a default value of "json". The option names are --backend and -b.
+        database.DEFAULT_BACKEND,
+        "--backend",
+        "-b",
+        help="Storage backend: json (one file rewritten on every change), journal (changes appended to a log and compacted), sqlite (one table row per to-do) or binary (fixed-width records, done flags flipped in place)",
+    ),
 ) -> None:
     """Initialize the to-do database"""
-    app_init_error = config.init_app(db_path)                                   # calls init_app() to create the application’s configuration file and to-do database.
+    if backend not in database.BACKENDS:                                        # checks the backend against the storage backends database.get_handler() knows about
+        typer.secho(
+            f'Unknown backend "{backend}", choose one of: {", ".join(database.BACKENDS)}',
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+    app_init_error = config.init_app(db_path, backend, list_name)               # calls init_app() to create the application’s configuration file and to-do database. Named lists get a section of their own.
     if (app_init_error):                                                        # check if the call to init_app() returns an error
         typer.secho(                                                            # prints the error message
             f'Creating config file failed with "{ERRORS[app_init_error]}"',
             fg=typer.colors.RED,                                                # sets the error message color to red
         )
         raise typer.Exit(1)                                                     # exits the app with a typer.Exit exception and an exit code of 1 to signal that the application terminated with an error.
-    db_init_error = database.init_database(Path(db_path))                       # calls init_database() to initialize the database with an empty to-do list.
+    db_init_error = database.init_database(Path(db_path), backend)              # calls init_database() to initialize the database with an empty to-do list.
     if(db_init_error):                                                          # check if the call to init_database() returns an error
         typer.secho(                                                            # prints the error message
             f'Creating database failed with "{ERRORS[db_init_error]}"',
@@ -40,38 +73,237 @@ def init(
             fg=typer.colors.GREEN                                               # sets the success message color to green
         )
 
-def get_todoer() -> todo.Todoer:
-    if config.CONFIG_FILE_PATH.exists():                                        # checks if applications configuration file exists. Path.exists() method used
-        db_path = database.get_database_path(config.CONFIG_FILE_PATH)           # if exists the path to the database is retrieved
+def format_option() -> Any:                                                     # the --format option shared by the list, search, sort and due commands
+    return typer.Option(
+        "table",
+        "--format",
+        help=f"Output format: {', '.join(render.FORMATS)}",
+    )
+
+def check_format(output_format: str) -> None:
+    if output_format not in render.FORMATS:
+        typer.secho(
+            f'Unknown format "{output_format}", choose one of: {", ".join(render.FORMATS)}',
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+
+def get_database() -> Tuple[Path, str]:
+    """Return the configured database path and storage backend"""
+    init_command = "todo init" if list_name == config.DEFAULT_LIST else f"todo --list {list_name} init"
+    if config.config_file_path().exists():                                      # checks if applications configuration file exists. Path.exists() method used
+        try:
+            with trace.span("config.settings"):
+                db_path, backend = config.get_settings(list_name)               # if exists the path to the database is retrieved along with the storage backend chosen by "todo init"
+        except KeyError:
+            typer.secho(
+                f'List "{list_name}" not found. Please run "{init_command}"',
+                fg=typer.colors.RED,
+            )
+            raise typer.Exit(1)
     else:
         typer.secho(
-            'Config file not found. Please run "todo init"',
+            f'Config file not found. Please run "{init_command}"',
             fg=typer.colors.RED,
         )
         raise typer.Exit(1)
     if db_path.exists():                                                        # check if the path to database exists
-        return todo.Todoer(db_path)                                             # if exists an instance of Todoer is created with argument as the retrieved path
+        return db_path, backend
     else:
         typer.secho(
-            'Database not found. Please run "todo init"',
+            f'Database not found. Please run "{init_command}"',
             fg=typer.colors.RED,
         )
         raise typer.Exit(1)
 
+def get_todoer() -> todo.Todoer:                                               # or a client.RemoteTodoer, which offers the same methods
+    db_path, backend = get_database()
+    from todo import client
+    return client.open_todoer(db_path, backend)                                 # answered from the memory of "todo serve" when it runs for the database
+
+def get_lists() -> Dict[str, Tuple[Path, str]]:
+    """Return the database path and storage backend of every list"""
+    if not config.config_file_path().exists():
+        typer.secho(
+            'Config file not found. Please run "todo init"',
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+    return config.get_lists()
+
+@app.command()                                                                  # define migrate() as a Typer command
+def migrate(
+    backend: str = typer.Option(                                                # defines backend as a required Typer option. The option names are --to and -t.
+        ...,
+        "--to",
+        "-t",
+        help="Storage backend to convert the database to: json, journal, sqlite or binary",
+    ),
+    db_path: Optional[str] = typer.Option(                                      # defines db_path as an optional Typer option holding the location of the converted database
+        None,
+        "--db-path",
+        "-db",
+        help="Location of the converted database. Default: the current location with a .json, .sqlite3 or .todo extension",
+    ),
+) -> None:
+    """Convert the to-do database to another storage backend"""
+    if backend not in database.BACKENDS:
+        typer.secho(
+            f'Unknown backend "{backend}", choose one of: {", ".join(database.BACKENDS)}',
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+    src_path, src_backend = get_database()                                      # gets the current database from the config file
+    if db_path is None:
+        dst_path = src_path.with_suffix({"sqlite": ".sqlite3", "binary": ".todo"}.get(backend, ".json"))
+    else:
+        dst_path = Path(db_path)
+    migrated = database.migrate_database(src_path, src_backend, dst_path, backend)  # reads the whole to-do list once and writes it to the new database in one go
+    if migrated.error:
+        typer.secho(
+            f'Converting database failed with "{ERRORS[migrated.error]}"',
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+    app_init_error = config.init_app(str(dst_path), backend, list_name)         # points the config file at the converted database. The old database is left in place.
+    if app_init_error:
+        typer.secho(
+            f'Updating config file failed with "{ERRORS[app_init_error]}"',
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+    typer.secho(
+        f"Converted {len(migrated.todo_list)} to-dos to {backend}, the to-do database is {dst_path}",
+        fg=typer.colors.GREEN,
+    )
+
+@app.command()                                                                  # define serve() as a Typer command
+def serve(
+    flush: str = typer.Option(                                                  # defines flush as a Typer option with a default value of "always". The option names are --flush and -f.
+        "always",
+        "--flush",
+        "-f",
+        help="When changes are written to the database: always (before answering) or interval (every --interval seconds and on exit)",
+    ),
+    interval: float = typer.Option(1.0, "--interval", "-i", min=0.01, help="Seconds between writes with --flush interval"),
+) -> None:
+    """Keep the to-do list in memory and answer the other commands over a socket"""
+    from todo import client, server
+    if flush not in server.FLUSH_POLICIES:
+        typer.secho(
+            f'Unknown flush policy "{flush}", choose one of: {", ".join(server.FLUSH_POLICIES)}',
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+    db_path, backend = get_database()
+    running = client.connect(db_path)
+    if running is not None:
+        running.close()
+        typer.secho(f"{db_path} is already served", fg=typer.colors.RED)
+        raise typer.Exit(1)
+    client.socket_path(db_path).unlink(missing_ok=True)                         # a socket file left behind by a daemon that was killed
+    typer.secho(
+        f"Serving {db_path} on {client.socket_path(db_path)} (flush: {flush}), stop with Ctrl+C",
+        fg=typer.colors.GREEN,
+    )
+    serve_error = server.serve(db_path, backend, flush, interval)               # returns once SIGINT or SIGTERM arrives and the pending changes are written
+    if serve_error:
+        typer.secho(
+            f'Serving failed with "{ERRORS[serve_error]}"',
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+
+@app.command(name="lists")                                                      # define show_lists() as a typer command
+def show_lists() -> None:
+    """Show every named to-do list and the file it is stored in"""
+    from todo import client
+    lists = get_lists()
+    if not lists:
+        typer.secho('There are no lists yet. Please run "todo init"', fg=typer.colors.RED)
+        raise typer.Exit(1)
+    for name, (db_path, backend) in lists.items():                              # every list is a shard of its own, so this reads one set of counters per list and no to-do
+        if db_path.exists():
+            todoer = client.open_todoer(db_path, backend)
+            total = f"{todoer.stats().stats.total} to-dos"
+        else:
+            total = "missing"
+        current = "*" if name == list_name else " "                             # marks the list the other commands work on
+        typer.echo(f"{current} {name:<12} {backend:<8} {total:<14} {db_path}")
+
+def _tags_callback(values: Optional[List[str]]) -> List[str]:                   # normalizes --tag the same way for "todo add" and the scripts of "todo batch"
+    try:
+        return [todo.parse_tag(value) for value in values or ()]
+    except ValueError as error:
+        raise typer.BadParameter(str(error))
+
+def _due_callback(value: Optional[str]) -> Optional[str]:                       # normalizes --due, so "todo batch" gets the same checks and form by parsing its lines with this command
+    if value is None:
+        return None
+    try:
+        return todo.parse_due(value)
+    except ValueError as error:
+        raise typer.BadParameter(str(error))
+
 @app.command()
 def add(                                                                        # defines .add() as a Typer command using the @app.comand() decorator
-    description: List[str] = typer.Argument(...),                               # defines description as an argument to add(). This argument holds a list of strings representing a to-do description. To build the argument, typer.Argument is used. When an ellipsis (...) is passed as the first argument to the constructor of Argument, it tells Typer that description is required. The fact that this argument is required means that the user must provide a to-do description at the command line
+    description: List[str] = typer.Argument(None),                              # defines description as an argument to add(). This argument holds a list of strings representing a to-do description. It may only be left out when --from-file is given.
     priority: int = typer.Option(                                               # defines priority as a Typer option with a default value of 2. The option names are --priority and -p. Priority only accepts three possible values: 1, 2, or 3. To guarantee this condition, min is set to 1 and max is set to 3. This way, Typer automatically validates the user’s input and only accepts numbers within the specified interval.
         2,
         "--priority",
         "-p",
-        min=1,
-        max=3,
-    )
+        min=todo.MIN_PRIORITY,
+        max=todo.MAX_PRIORITY,
+    ),
+    from_file: Optional[Path] = typer.Option(                                   # defines from_file as an optional Typer option. Every non-empty line of the file becomes a to-do.
+        None,
+        "--from-file",
+        "-f",
+        exists=True,
+        dir_okay=False,
+        readable=True,
+        help="Add one to-do for every non-empty line of this file",
+    ),
+    due: Optional[str] = typer.Option(                                          # defines due as an optional Typer option holding a date and time such as 2026-11-01T09:00
+        None,
+        "--due",
+        "-d",
+        callback=_due_callback,
+        help="Date and time the to-do is due, e.g. 2026-11-01T09:00",
+    ),
+    tags: List[str] = typer.Option(                                             # defines tags as a Typer option that may be given several times. The option names are --tag and -t.
+        None,
+        "--tag",
+        "-t",
+        callback=_tags_callback,
+        help="Tag the to-do, e.g. --tag ops --tag db",
+    ),
 ) -> None:
     """Add a new to-do with a description"""
+    if from_file is None and not description:
+        typer.secho('Missing argument "DESCRIPTION..."', fg=typer.colors.RED)
+        raise typer.Exit(1)
     todoer = get_todoer()                                                       # gets a Todoer instance to be used
-    todo, error = todoer.add(description, priority)                             # calls .add() on todoer and unpacks the result into todo and error.
+    if from_file is not None:
+        with from_file.open("r") as lines:
+            descriptions = [[line.strip()] for line in lines if line.strip()]
+        if description:
+            descriptions.insert(0, description)                                 # a description given on the command line is added first
+        todos, error = todoer.add_many(descriptions, priority, due, tags)       # adds the whole file with one read and one write of the database
+        if error:
+            typer.secho(
+                f'Adding to-dos failed with "{ERRORS[error]}"',
+                fg=typer.colors.RED,
+            )
+            raise typer.Exit(1)
+        typer.secho(
+            f"{len(todos)} to-dos were added with priority: {priority}"
+            + (f", due: {due}" if due else "")
+            + (f", tags: {', '.join(sorted(set(tags)))}" if tags else ""),
+            fg=typer.colors.GREEN,
+        )
+        return
+    todo, error = todoer.add(description, priority, due, tags)                  # calls .add() on todoer and unpacks the result into todo and error.
     if error:                                                                   # error handling
         typer.secho(
             f'Adding to-do failed with "{ERRORS[error]}"',
@@ -81,7 +313,9 @@ def add(
     else:
         typer.secho(
             f"""to-do: "{todo['Description']}" was added """
-            f"""with priority: {priority}""",
+            f"""with priority: {priority}"""
+            + (f", due: {due}" if due else "")
+            + (f", tags: {', '.join(todo['Tags'])}" if tags else ""),
             fg=typer.colors.GREEN,
         )
         
@@ -92,44 +326,114 @@ def list_all(
         "--order",
         "-o",
         help="The order of listing i.e. oldest to newest or newest to oldest",
-    )
+    ),
+    limit: Optional[int] = typer.Option(                                        # defines limit as an optional Typer option. The option names are --limit and -l.
+        None,
+        "--limit",
+        "-l",
+        min=1,
+        help="Show at most this many to-dos",
+    ),
+    offset: int = typer.Option(                                                 # defines offset as a Typer option with a default value of 0
+        0,
+        "--offset",
+        min=0,
+        help="Skip this many to-dos before listing",
+    ),
+    cursor: Optional[str] = typer.Option(                                       # defines cursor as an optional Typer option holding the cursor printed after a previous page
+        None,
+        "--cursor",
+        "-c",
+        help="Continue listing after the page that printed this cursor",
+    ),
+    tags: List[str] = typer.Option(                                             # defines tags as a Typer option that may be given several times. The option names are --tag and -t.
+        None,
+        "--tag",
+        "-t",
+        help="Only to-dos with this tag; !TAG for those without it, TAG1,TAG2 for either. Repeat to require several",
+    ),
+    include_archived: bool = typer.Option(                                      # the archive is only read when asked for
+        False,
+        "--include-archived",
+        help='Also list the to-dos moved to the archive by "todo archive"',
+    ),
+    output_format: str = format_option(),
 ) -> None:
     """List all To-Dos"""
+    check_format(output_format)
     todoer = get_todoer()                                                       # gets the Todoer instance
-    todo_list = todoer.get_todo_list()                                          # gets the to-do list from the database by calling .get_too_list() on todoer
-    if order == "new_to_old":                                                   # checks if the option has value "new_to_old". If True then it reverses the todo_list to display the list in the newest todo to the oldest todo fashion.
-        todo_list.reverse()                                                     # .reverse() is used to reverse the todo_list in place.            
-    
-    if len(todo_list) == 0:                                                     # define a conditional statement to check if there’s at least one to-do in the list. If not, then the if code block prints an error message to the screen and exits the application
+    reverse = order == "new_to_old"                                             # checks if the option has value "new_to_old". If True then the to-dos are read from the end of the database towards its start.
+    try:
+        if include_archived:
+            todo_rows = _archived_rows(todoer, tags, reverse, offset, cursor)
+        elif tags:
+            todo_rows = _tagged_rows(todoer, tags, reverse, offset, cursor, limit)
+        else:
+            todo_rows = todoer.iter_todos(reverse, offset, cursor)              # gets an iterator over the to-dos. They are read from the database one at a time, so only the rows being shown are loaded.
+    except ValueError:
+        typer.secho("Invalid cursor", fg=typer.colors.RED)
+        raise typer.Exit(1)
+    first_row = next(todo_rows, None)
+
+    if first_row is None and output_format == "table":                          # define a conditional statement to check if there’s at least one to-do in the list. If not, then the if code block prints an error message to the screen and exits the application
         typer.secho(
-            "There are no tasks in the to-do list yet",
+            "There are no more to-dos in the to-do list"
+            if offset or cursor else "There are no to-dos with these tags"
+            if tags else "There are no tasks in the to-do list yet",
             fg=typer.colors.RED,
         )
         raise typer.Exit()
-    typer.secho(
-        "\nTo-Do List:\n",                                                      # prints the header to present the to-do list
-        fg=typer.colors.BLUE,
-        bold=True,                                                              # makes text BOLD
-    )
-    columns = (                                                                 # print the required columns to display the to-do list in a tabular format
-        "ID. ",
-        "| Priority ",
-        "| Done ",
-        "| Description ",
-    )
-    headers = "".join(columns)
-    typer.secho(headers, fg=typer.colors.BLUE, bold=True)
-    typer.secho("-" * len(headers), fg=typer.colors.BLUE)
-    for id, todo in enumerate(todo_list, 1):                                    # run a for loop to print every single to-do on its own row with appropriate padding and separators
-        desc, priority, done = todo.values()
+    page = itertools.chain([first_row] if first_row else [], todo_rows)
+    if limit is not None:
+        page = list(itertools.islice(page, limit))                              # stops reading the database once the page is full
+    render.render_todos(page, output_format)                                    # without a limit the rows stream straight from the database iterator to the renderer
+    if limit is not None and next(todo_rows, None) is not None:                 # reads one more to-do to tell whether there is a next page
         typer.secho(
-            f"{id}{(len(columns[0]) - len(str(id))) * ' '}"
-            f"| ({priority}){(len(columns[1]) - len(str(priority)) - 4) * ' '}"
-            f"| {done}{(len(columns[2]) - len(str(done)) - 2) * ' '}"
-            f"| {desc}",
+            f"Next page: todo list --order {order} --limit {limit} "
+            + "".join(f"--tag {shlex.quote(tag)} " for tag in tags)             # the next page keeps the same filter
+            + ("--include-archived " if include_archived else "")
+            + f"--cursor {todo.make_cursor(page[-1], reverse)}",
             fg=typer.colors.BLUE,
+            err=output_format != "table",                                       # keeps machine-readable output parseable
         )
-    typer.secho("-" * len(headers) + "\n", fg=typer.colors.BLUE)                # prints a line of dashes with a final line feed character (\n) to visually separate the to-do list from the next command-line prompt
+
+def _tagged_rows(
+    todoer: todo.Todoer, tags: List[str], reverse: bool, offset: int, cursor: Optional[str], limit: Optional[int]
+) -> Iterator[database.TodoRow]:                                                # raises ValueError for an invalid cursor
+    from todo import query
+    plan = query.compile_query(_tag_filter(tags))                               # the filters are combined as bitmaps, one per tag, so only the matching to-dos are read from the database
+    rows = todoer.query(plan, reverse, offset, None if limit is None else limit + 1, _cursor_id(cursor, reverse))  # one more row than shown tells whether there is a next page
+    return iter([database.TodoRow(todo_id, found, 0) for todo_id, found in rows])  # a cursor of a tag listing only needs the last ID
+
+def _archived_rows(
+    todoer: todo.Todoer, tags: List[str], reverse: bool, offset: int, cursor: Optional[str]
+) -> Iterator[database.TodoRow]:                                                # raises ValueError for an invalid cursor
+    from todo import archive, query
+    db_path, _ = get_database()
+    after = _cursor_id(cursor, reverse)                                         # archived rows have no resume position in the database, so the listing resumes by ID
+    if not tags:
+        return archive.with_archived(todoer.iter_todos(reverse), db_path, reverse, offset, after)
+    node = _tag_filter(tags)
+    rows = todoer.query(query.compile_query(node), reverse, after=after)
+    return archive.with_archived(
+        (database.TodoRow(todo_id, found, 0) for todo_id, found in rows), db_path, reverse, offset, after, query.compile_filter(node)
+    )                                                                           # the same filter picks the archived to-dos, one at a time as the segments are read
+
+def _tag_filter(tags: List[str]) -> "query.Node":
+    from todo import query
+    try:
+        return query.tag_filter(tags)
+    except query.QueryError as error:
+        typer.secho(f"Invalid tag filter: {error}", fg=typer.colors.RED)
+        raise typer.Exit(1)
+
+def _cursor_id(cursor: Optional[str], reverse: bool) -> Optional[int]:          # the last to-do ID shown by the previous page
+    if cursor is None:
+        return None
+    cursor_reverse, (after, _) = todo.parse_cursor(cursor)
+    if cursor_reverse != reverse:
+        raise ValueError("the cursor was created for the other listing order")
+    return after
 
 @app.command(name="search")                                                     # define search() as a typer command. The name argument sets a custom name for the command which is "search" here. 
 def search(
@@ -152,92 +456,75 @@ def search(
         "--index",
         "-i",
         help="Search based on to-do index value",
-    )
+    ),
+    whole_words: bool = typer.Option(                                           # defines whole_words as a Typer flag. The option names are --words and -w.
+        False,
+        "--words",
+        "-w",
+        help="Match the whole words of --text instead of any part of the description",
+    ),
+    done: Optional[bool] = typer.Option(                                        # defines done as an optional Typer flag pair: --done, --not-done or neither
+        None,
+        "--done/--not-done",
+        help="Only to-dos that are, or are not, done",
+    ),
+    expression: Optional[str] = typer.Option(                                   # defines expression as an optional Typer option. The option names are --query and -q.
+        None,
+        "--query",
+        "-q",
+        help='A query such as \'priority<=2 and not done and text~"deploy"\'. Fields: priority, id, done, tag="...", text~"...", words~"..."; operators: < <= = != > >=, and, or, not, parentheses',
+    ),
+    all_lists: bool = typer.Option(                                             # defines all_lists as a Typer flag. Every list is searched in a process of its own.
+        False,
+        "--all-lists",
+        "-a",
+        help="Search every named list instead of the one chosen with --list",
+    ),
+    include_archived: bool = typer.Option(                                      # the archive has no indexes, so it is only read when asked for
+        False,
+        "--include-archived",
+        help='Also search the to-dos moved to the archive by "todo archive"',
+    ),
+    output_format: str = format_option(),
 ) -> None:
     """Search Value in To-Do List"""
-    todoer = get_todoer()                                                       # gets the Todoer instance
-    todo_list = todoer.get_todo_list()                                          # gets the to-do list from the database by calling .get_too_list() on todoer
-
-    if len(todo_list) == 0:                                                     # define a conditional statement to check if there’s at least one to-do in the list. If not, then the if code block prints an error message to the screen and exits the application
+    check_format(output_format)
+    from todo import query
+    conditions: List[query.Node] = []                                           # every option given narrows the search further
+    if description:
+        conditions.append(query.Text(description, whole_words))
+    if p:
+        conditions.append(query.Compare("priority", "=", p))
+    if index:
+        conditions.append(query.Compare("id", "=", index))
+    if done is not None:
+        conditions.append(query.Compare("done", "=", done))
+    if expression is not None:
+        try:
+            conditions.append(query.parse(expression))
+        except query.QueryError as error:
+            typer.secho(f"Invalid query: {error}", fg=typer.colors.RED)
+            raise typer.Exit(1)
+    if not conditions:
         typer.secho(
-            "There are no tasks in the to-do list yet",
+            "There was no input option for search",
             fg=typer.colors.RED,
         )
-        raise typer.Exit()
-    typer.secho(
-        "\nTo-Do List:\n",                                                      # prints the header to present the to-do list
-        fg=typer.colors.BLUE,
-        bold=True,                                                              # makes text BOLD
-    )
-    columns = (                                                                 # print the required columns to display the to-do list in a tabular format
-        "ID. ",
-        "| Priority ",
-        "| Done ",
-        "| Description ",
-    )
-    flag = False
-    headers = "".join(columns)
-    typer.secho(headers, fg=typer.colors.BLUE, bold=True)
-    typer.secho("-" * len(headers), fg=typer.colors.BLUE)
-    if (description and p and index):                                           # checks for the condition where all three options --description, --priority, --index are used together using the logical 'and' operator
-        for id, todo in enumerate(todo_list, 1):                                # run a for loop to print every single to-do that satisfiest the following condition on its own row with appropriate padding and separators
-            desc, priority, done = todo.values()
-            if (desc == description and p == priority and index == id):         # searches in the todo_list using todo.values() the values of the description, priority and index entered by the user are typer arguments and checks if all three conditions are met if yes then prints the todo
-                flag = True
-                typer.secho(
-                    f"{id}{(len(columns[0]) - len(str(id))) * ' '}"
-                    f"| ({priority}){(len(columns[1]) - len(str(priority)) - 4) * ' '}"
-                    f"| {done}{(len(columns[2]) - len(str(done)) - 2) * ' '}"
-                    f"| {desc}",
-                    fg=typer.colors.BLUE,
-                )
-        typer.secho("-" * len(headers) + "\n", fg=typer.colors.BLUE)            # prints a line of dashes with a final line feed character (\n) to visually separate the to-do list from the next command-line prompt    
-        if flag == False:
-            typer.secho(
-            "Entered To-Do Doesn't Exist",
-            fg=typer.colors.RED,
-            )
-    elif ((description and p) or (p and index) or (description and index)):     # checks for all the combinations of conditions where pairs of two of the three options --description, --priority, --index are used together using the logical 'or' & 'and' operator
-        for id, todo in enumerate(todo_list, 1):                                # run a for loop to print every single to-do on its own row with appropriate padding and separators
-            desc, priority, done = todo.values()                                # the next line searches in the todo_list using todo.values() the values of the description, priority and index entered by the user are typer arguments and checks if one of the three 'or' conditions are met if yes then prints the todo
-            if ((desc == description and p == priority) or ( p == priority and index == id) or (desc == description and index == id)):
-                flag = True
-                typer.secho(
-                    f"{id}{(len(columns[0]) - len(str(id))) * ' '}"
-                    f"| ({priority}){(len(columns[1]) - len(str(priority)) - 4) * ' '}"
-                    f"| {done}{(len(columns[2]) - len(str(done)) - 2) * ' '}"
-                    f"| {desc}",
-                    fg=typer.colors.BLUE,
-                )
-        typer.secho("-" * len(headers) + "\n", fg=typer.colors.BLUE)            # prints a line of dashes with a final line feed character (\n) to visually separate the to-do list from the next command-line prompt    
-        if flag == False:
-            typer.secho(
-            "Entered To-Do Doesn't Exist",
-            fg=typer.colors.RED,
-            )
-    elif description or p or index:                                             # checks for the condition where on of the three options --description, --priority, --index are used using the logical 'or' operator
-        for id, todo in enumerate(todo_list, 1):                                # run a for loop to print every single to-do on its own row with appropriate padding and separators
-            desc, priority, done = todo.values()
-            if (desc == description or p == priority or index == id):           # searches in the todo_list using todo.values() the values of the description, priority and index entered by the user are typer arguments and checks if one of the three 'or' conditions are met if yes then prints the todo
-                flag = True
-                typer.secho(
-                    f"{id}{(len(columns[0]) - len(str(id))) * ' '}"
-                    f"| ({priority}){(len(columns[1]) - len(str(priority)) - 4) * ' '}"
-                    f"| {done}{(len(columns[2]) - len(str(done)) - 2) * ' '}"
-                    f"| {desc}",
-                    fg=typer.colors.BLUE,
-                )
-        typer.secho("-" * len(headers) + "\n", fg=typer.colors.BLUE)            # prints a line of dashes with a final line feed character (\n) to visually separate the to-do list from the next command-line prompt    
-        if flag == False:
-            typer.secho(
-            "Entered To-Do Doesn't Exist",
-            fg=typer.colors.RED,
-            )    
+        return
+    from todo import lists
+    node = conditions[0] if len(conditions) == 1 else query.And(conditions)
+    if all_lists:
+        count = render.render_todos(
+            lists.search_lists(get_lists(), node, include_archived=include_archived), output_format, lists=True
+        )                                                                       # the rows are printed list by list as the shards finish
     else:
+        archive_of = get_database()[0] if include_archived else None
+        count = render.render_todos(iter(lists.search(get_todoer(), node, archive_of)), output_format)
+    if count == 0 and output_format == "table":
         typer.secho(
-            "There was no input option for search",
+            "Entered To-Do Doesn't Exist",
             fg=typer.colors.RED,
-        )       
+        )
 
 @app.command(name="sort")                                                       # define sort_list() as a typer command. The name argument sets a custom name for the command which is "sort" here. 
 def sort_list(
@@ -246,85 +533,361 @@ def sort_list(
         "--order",
         "-o",
         help="The order of sorting i.e. ascending or descending",
-    )
+    ),
+    by: str = typer.Option(                                                     # defines by as a Typer option holding comma-separated sort keys, the most significant first
+        "priority",
+        "--by",
+        "-b",
+        help="Comma-separated sort keys: priority, done, description or id (insertion order). A leading - sorts that key in descending order, e.g. --by=priority,-done",
+    ),
+    limit: Optional[int] = typer.Option(                                        # defines limit as an optional Typer option. The option names are --limit and -l.
+        None,
+        "--limit",
+        "-l",
+        min=1,
+        help="Show only the first this many to-dos",
+    ),
+    output_format: str = format_option(),
 ) -> None:
     """List sorted To-Do List"""
+    check_format(output_format)
+    from todo.table import parse_sort_keys
+    try:
+        keys = parse_sort_keys(by, reverse=order == "des")                      # --order des reverses every key. Ascending order of priority value actually means highest priority to lowest priority.
+    except ValueError as error:
+        typer.secho(f"Invalid sort keys: {error}", fg=typer.colors.RED)
+        raise typer.Exit(1)
+    if order not in ("asc", "des"):                                             # any other order lists the to-dos unsorted, in insertion order
+        keys = [("id", False)]
     todoer = get_todoer()                                                       # gets the Todoer instance
-    todo_list = todoer.get_todo_list()                                          # gets the to-do list from the database by calling .get_too_list() on todoer
-    
-    if order == "asc":                                                          # checks the order value for "asc". If True then it sorts the list in ascending priority value order. Note.: Ascending order of priority value actually means highest priority to lowest priority.
-        todo_list = sorted(todo_list, key=lambda td:td["Priority"], reverse=False)
-    elif order == "des":                                                        # checks the order value for "des". If True then it sorts the list in descending priority value order. Note.: Descending order of priority value actually means lowest priority to highest priority.
-        todo_list = sorted(todo_list, key=lambda td:td["Priority"], reverse=True) 
+    todo_rows = iter(todoer.sort_todos(keys, limit))                            # big lists are answered from a sort index kept next to the database; a limit reads only that many rows of it
+    first_row = next(todo_rows, None)
                                                   
-    if len(todo_list) == 0:                                                     # define a conditional statement to check if there’s at least one to-do in the list. If not, then the if code block prints an error message to the screen and exits the application
+    if first_row is None and output_format == "table":                          # define a conditional statement to check if there’s at least one to-do in the list. If not, then the if code block prints an error message to the screen and exits the application
         typer.secho(
             "There are no tasks in the to-do list yet",
             fg=typer.colors.RED,
         )
         raise typer.Exit()
-    typer.secho(
-        "\nTo-Do List:\n",                                                      # prints the header to present the to-do list
-        fg=typer.colors.BLUE,
-        bold=True,                                                              # makes text BOLD
-    )
-    columns = (                                                                 # print the required columns to display the to-do list in a tabular format
-        "ID. ",
-        "| Priority ",
-        "| Done ",
-        "| Description ",
-    )
-    headers = "".join(columns)
-    typer.secho(headers, fg=typer.colors.BLUE, bold=True)
-    typer.secho("-" * len(headers), fg=typer.colors.BLUE)
-    for id, todo in enumerate(todo_list, 1):                                    # run a for loop to print every single to-do on its own row with appropriate padding and separators
-        desc, priority, done = todo.values()
+    render.render_todos(itertools.chain([first_row] if first_row else [], todo_rows), output_format)  # every row keeps the ID the other commands expect; dictionaries are only built as rows are printed
+
+@app.command(name="due")                                                        # define show_due() as a typer command
+def show_due(
+    count: int = typer.Option(                                                  # defines count as a Typer option with a default value of 10. The option names are --next and -n.
+        10,
+        "--next",
+        "-n",
+        min=1,
+        help="Show the next this many to-dos that are due",
+    ),
+    overdue: bool = typer.Option(                                               # defines overdue as a Typer flag. The open to-dos whose due date has passed are shown instead, the longest overdue first.
+        False,
+        "--overdue",
+        help="Show the open to-dos whose due date has passed",
+    ),
+    output_format: str = format_option(),
+) -> None:
+    """List the open To-Dos by due date"""
+    check_format(output_format)
+    todoer = get_todoer()                                                       # gets the Todoer instance
+    todo_rows = todoer.due_todos(count, overdue)                                # answered from a due-date index kept next to the database, which reads only the rows shown
+    if not todo_rows and output_format == "table":
         typer.secho(
-            f"{id}{(len(columns[0]) - len(str(id))) * ' '}"
-            f"| ({priority}){(len(columns[1]) - len(str(priority)) - 4) * ' '}"
-            f"| {done}{(len(columns[2]) - len(str(done)) - 2) * ' '}"
-            f"| {desc}",
-            fg=typer.colors.BLUE,
+            "There are no overdue to-dos" if overdue else "There are no to-dos due",
+            fg=typer.colors.RED,
         )
-    typer.secho("-" * len(headers) + "\n", fg=typer.colors.BLUE)                # prints a line of dashes with a final line feed character (\n) to visually separate the to-do list from the next command-line prompt
+        raise typer.Exit()
+    render.render_todos(todo_rows, output_format, due=True)
+
+@app.command(name="import")                                                     # define import_todos() as a typer command. "import" is a Python keyword, so the function has another name.
+def import_todos(
+    path: str = typer.Argument(..., help="JSON lines, CSV or TSV file to import, or - for standard input"),
+    input_format: Optional[str] = typer.Option(                                 # defines input_format as an optional Typer option. Without it the format follows the file extension.
+        None,
+        "--format",
+        help="Input format: jsonl, csv or tsv. Default: from the file extension",
+    ),
+    chunk_size: int = typer.Option(
+        todo.IMPORT_CHUNK_ROWS,
+        "--chunk-size",
+        min=1,
+        help="To-dos written to the database at a time",
+    ),
+) -> None:
+    """Add the to-dos of a JSON lines or CSV file"""
+    from todo import transfer
+    if input_format is None:
+        input_format = "jsonl" if path == "-" else transfer.guess_format(Path(path))
+    if input_format not in transfer.IMPORT_FORMATS:
+        typer.secho(
+            f'Unknown format "{input_format}", choose one of: {", ".join(transfer.IMPORT_FORMATS)}',
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+    db_path, backend = get_database()
+    todoer = todo.Todoer(db_path, backend)                                      # bulk imports bypass "todo serve", which picks the change up like any other direct write
+    errors: List[transfer.RowError] = []
+    try:
+        with (typer.get_text_stream("stdin") if path == "-" else open(path, newline="")) as lines:  # csv wants newline="" so that quoted line breaks survive
+            count, error = todoer.import_todos(transfer.read_todos(lines, input_format, errors), chunk_size)
+    except (OSError, UnicodeDecodeError) as exc:
+        typer.secho(f"Reading {path} failed: {exc}", fg=typer.colors.RED)
+        raise typer.Exit(1)
+    if error:
+        typer.secho(
+            f'Importing to-dos failed with "{ERRORS[error]}"',
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+    typer.secho(f"{count} to-dos were imported", fg=typer.colors.GREEN)
+    for row_error in errors[:10]:
+        typer.secho(f"Skipped line {row_error.line}: {row_error.message}", fg=typer.colors.RED, err=True)
+    if len(errors) > 10:
+        typer.secho(f"... and {len(errors) - 10} more invalid rows", fg=typer.colors.RED, err=True)
+    if errors:
+        raise typer.Exit(1)
+
+@app.command(name="export")                                                     # define export() as a typer command
+def export(
+    output: Optional[Path] = typer.Option(                                      # defines output as an optional Typer option. Without it the to-dos go to standard output.
+        None,
+        "--output",
+        "-o",
+        dir_okay=False,
+        help="File to write the to-dos to. Default: standard output",
+    ),
+    output_format: str = typer.Option(
+        "jsonl",
+        "--format",
+        help="Output format: jsonl, json, csv or tsv",
+    ),
+) -> None:
+    """Write every to-do as JSON lines, JSON or CSV"""
+    if output_format == "table" or output_format not in render.FORMATS:
+        typer.secho(
+            f'Unknown format "{output_format}", choose one of: jsonl, json, csv, tsv',
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+    todoer = get_todoer()                                                       # gets the Todoer instance
+    rows = todoer.iter_todos(stream=True)                                       # read one at a time and written as they come, so the whole list is never built
+    if output is None:
+        render.render_todos(rows, output_format, color=False)
+        return
+    try:
+        with output.open("w", newline="") as out:
+            count = render.render_todos(rows, output_format, file=out)
+    except OSError as exc:
+        typer.secho(f"Writing {output} failed: {exc}", fg=typer.colors.RED)
+        raise typer.Exit(1)
+    typer.secho(f"{count} to-dos were exported to {output}", fg=typer.colors.GREEN, err=True)
+
+@app.command(name="stats")                                                      # define stats() as a typer command
+def stats(
+    verify: bool = typer.Option(                                                # defines verify as a Typer flag. The option name is --verify.
+        False,
+        "--verify",
+        help="Recount the totals with a full scan and repair the stored counters if they disagree",
+    ),
+    output_format: str = typer.Option(
+        "table",
+        "--format",
+        help="Output format: table or json",
+    ),
+) -> None:
+    """Show the totals of the To-Do List"""
+    if output_format not in ("table", "json"):
+        typer.secho(
+            f'Unknown format "{output_format}", choose one of: table, json',
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+    todoer = get_todoer()                                                       # gets the Todoer instance
+    totals, consistent, error = todoer.stats(verify)                            # read from counters every change keeps up to date, so the answer doesn't depend on the length of the list
+    if error:
+        typer.secho(
+            f'Reading the totals failed with "{ERRORS[error]}"',
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+    if output_format == "json":
+        import json
+        typer.echo(json.dumps({
+            "total": totals.total,
+            "open": totals.open,
+            "done": totals.done,
+            "ratio": totals.ratio,
+            "priorities": {
+                str(priority): {"total": todos, "done": done} for priority, (todos, done) in totals.priorities.items()
+            },
+        }))
+    else:
+        typer.echo(f"To-dos: {totals.total}")
+        typer.echo(f"Open:   {totals.open}")
+        typer.echo(f"Done:   {totals.done} ({totals.ratio:.1%})")
+        for priority, (todos, done) in totals.priorities.items():
+            typer.echo(f"Priority {priority}: {todos} to-dos, {done} done")
+    if verify and not consistent:
+        typer.secho("The stored counters were out of date and have been rebuilt", fg=typer.colors.YELLOW, err=True)
+    elif verify:
+        typer.secho("The stored counters match a full scan", fg=typer.colors.GREEN, err=True)
+
+def parse_ids(values: List[str]) -> List[int]:                                  # turns command-line IDs such as ["1", "5", "10-200"] into a list of to-do IDs
+    """Return the to-do IDs named by single IDs and inclusive ranges"""
+    try:
+        return todo.parse_ids(values)
+    except ValueError as exc:
+        typer.secho(str(exc), fg=typer.colors.RED)
+        raise typer.Exit(1)
+
+@app.command(name="batch")                                                      # define run_batch() as a typer command
+def run_batch(
+    path: str = typer.Argument("-", help="Script of add, mark_done, mark_undone, remove and clear commands, one per line, or - for standard input"),
+    dry_run: bool = typer.Option(                                               # checks every command against the list without writing anything
+        False,
+        "--dry-run",
+        "-n",
+        help="Show what the script would do without changing the database",
+    ),
+) -> None:
+    """Run a script of commands with one read and one write of the database"""
+    from todo import batch, transfer
+    errors: List[transfer.RowError] = []
+    try:
+        with (typer.get_text_stream("stdin") if path == "-" else open(path)) as lines:
+            steps = batch.read_script(lines, typer.main.get_command(app).commands, errors)
+    except (OSError, UnicodeDecodeError) as exc:
+        typer.secho(f"Reading {path} failed: {exc}", fg=typer.colors.RED)
+        raise typer.Exit(1)
+    for row_error in errors[:10]:                                               # a script with any invalid line isn't run at all
+        typer.secho(f"Line {row_error.line}: {row_error.message}", fg=typer.colors.RED)
+    if len(errors) > 10:
+        typer.secho(f"... and {len(errors) - 10} more invalid lines", fg=typer.colors.RED)
+    if errors:
+        raise typer.Exit(1)
+    db_path, backend = get_database()
+    todoer = todo.Todoer(db_path, backend)                                      # batches bypass "todo serve" like imports, which picks the change up like any other direct write
+    responses = todoer.run_batch([step.op for step in steps], dry_run)
+    failed = [(step, response.error) for step, response in zip(steps, responses) if response.error]
+    for step, error in failed:
+        typer.secho(f'Line {step.line}: "{step.command}" failed with "{ERRORS[error]}"', fg=typer.colors.RED)
+    if failed:
+        typer.secho("No change was written", fg=typer.colors.RED)
+        raise typer.Exit(1)
+    for step, response in zip(steps, responses):
+        for line in _batch_messages(step.op, response.todo_list):
+            typer.secho(line, fg=typer.colors.GREEN)
+    if dry_run:
+        typer.echo(f"Dry run: {len(steps)} commands checked, no change was written")
+    else:
+        typer.echo(f"{len(steps)} commands were committed")
+
+def _batch_messages(op: Dict[str, Any], todos: List[Dict[str, Any]]) -> List[str]:  # what each command of a batch did, in the words the command prints on its own
+    kind = op["op"]
+    if kind == "clear":
+        return ["All to-dos were removed"]
+    if kind == "add":
+        return [f"""to-do # {todo['ID']}: "{todo['Description']}" was added with priority: {todo['Priority']}""" for todo in todos]
+    if kind == "remove":
+        return [f"""To-Do # {todo['ID']}: '{todo["Description"]}' was removed""" for todo in todos]
+    state = "completed" if op["set"]["Done"] else "incompleted"
+    return [f"""todo # {todo['ID']}"{todo['Description']}" {state}!""" for todo in todos]
+
+@app.command(name="archive")                                                    # define archive_done() as a typer command
+def archive_done(
+    compression: str = typer.Option(                                            # defines compression as a Typer option with a default value of "gz". The option names are --compression and -c.
+        "gz",
+        "--compression",
+        "-c",
+        help="Compression of the new archive segment: gz (faster) or xz (smaller)",
+    ),
+    done_over: Optional[float] = typer.Option(                                  # defines done_over as an optional Typer option holding a percentage
+        None,
+        "--if-done-over",
+        min=0,
+        max=100,
+        help="Only archive when more than this percentage of the to-dos are done",
+    ),
+    auto: Optional[float] = typer.Option(                                       # defines auto as an optional Typer option holding a percentage. The policy is stored next to the database.
+        None,
+        "--auto",
+        min=0,
+        max=100,
+        help="From now on archive whenever more than this percentage of the to-dos are done; 0 turns it off",
+    ),
+) -> None:
+    """Move the done to-dos into a compressed archive next to the database"""
+    from todo import archive
+    if compression not in archive.COMPRESSIONS:
+        typer.secho(
+            f'Unknown compression "{compression}", choose one of: {", ".join(archive.COMPRESSIONS)}',
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+    db_path, backend = get_database()
+    if auto is not None:
+        try:
+            archive.write_policy(db_path, auto or None)
+        except OSError as exc:
+            typer.secho(f"Storing the archiving policy failed: {exc}", fg=typer.colors.RED)
+            raise typer.Exit(1)
+        if not auto:
+            typer.secho("Automatic archiving is off", fg=typer.colors.GREEN)
+            return
+        typer.secho(f"Done to-dos will be archived whenever they are more than {auto:g}% of the list", fg=typer.colors.GREEN)
+        if done_over is None:                                                   # the policy is applied right away too
+            done_over = auto
+    todoer = todo.Todoer(db_path, backend)                                      # archiving bypasses "todo serve" like imports, which picks the change up like any other direct write
+    count, error = todoer.archive(compression, done_over)
+    if error:
+        typer.secho(
+            f'Archiving to-dos failed with "{ERRORS[error]}"',
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+    typer.secho(f"{count} done to-dos were archived", fg=typer.colors.GREEN)
 
 @app.command(name="mark_done")                                              # define set_done() as a Typer command with name = "complete"
-def set_done(todo_id: int =typer.Argument(...)) -> None:                        # set_done() function takes an argument called todo_id, which defaults to an instance of typer.Argument. This instance will work as a required command-line argument
+def set_done(todo_ids: List[str] = typer.Argument(..., help="To-do IDs and ranges such as 1 5 10-200")) -> None:  # set_done() function takes an argument called todo_ids, which defaults to an instance of typer.Argument. This instance will work as a required command-line argument
     """Complete a to-do by setting it as done using corresponding todo_id"""
     todoer = get_todoer()                                                       # gets the todoer instance
-    todo, error = todoer.set_done(todo_id)                                      # sets the to-do with the specific todo_id as done by calling .set_done() on todoer
+    ids = parse_ids(todo_ids)
+    todos, error = todoer.set_done_many(ids)                                    # sets every to-do named on the command line as done with one read and one write of the database
     if error:                                                                   # checks for any error occurs during the process
         typer.secho(
-            f'Completing to-do # "{todo_id}" failed with "{ERRORS[error]}"',
+            f'Completing to-do # "{" ".join(todo_ids)}" failed with "{ERRORS[error]}"',
             fg=typer.colors.RED,
         )
         raise typer.Exit(1)
     else:
-        typer.secho(
-            f"""todo # {todo_id}"{todo['Description']}" completed!""",
-            fg=typer.colors.GREEN,
-        )
+        for todo_id, todo in zip(ids, todos):
+            typer.secho(
+                f"""todo # {todo_id}"{todo['Description']}" completed!""",
+                fg=typer.colors.GREEN,
+            )
 
 @app.command(name="mark_undone")                                                 # define set_undone() as a Typer command with name = "complete"
-def set_undone(todo_id: int =typer.Argument(...)) -> None:                      # set_undone() function takes an argument called todo_id, which defaults to an instance of typer.Argument. This instance will work as a required command-line argument
+def set_undone(todo_ids: List[str] = typer.Argument(..., help="To-do IDs and ranges such as 1 5 10-200")) -> None:  # set_undone() function takes an argument called todo_ids, which defaults to an instance of typer.Argument. This instance will work as a required command-line argument
     """Complete a to-do by setting it as done using corresponding todo_id"""
     todoer = get_todoer()                                                       # gets the todoer instance
-    todo, error = todoer.set_undone(todo_id)                                    # sets the to-do with the specific todo_id as done by calling .set_done() on todoer
+    ids = parse_ids(todo_ids)
+    todos, error = todoer.set_undone_many(ids)                                  # sets every to-do named on the command line as not done with one read and one write of the database
     if error:                                                                   # checks for any error occurs during the process
         typer.secho(
-            f'Completing to-do # "{todo_id}" failed with "{ERRORS[error]}"',
+            f'Completing to-do # "{" ".join(todo_ids)}" failed with "{ERRORS[error]}"',
             fg=typer.colors.RED,
         )
         raise typer.Exit(1)
     else:
-        typer.secho(
-            f"""todo # {todo_id}"{todo['Description']}" incompleted!""",
-            fg=typer.colors.GREEN,
-        )
+        for todo_id, todo in zip(ids, todos):
+            typer.secho(
+                f"""todo # {todo_id}"{todo['Description']}" incompleted!""",
+                fg=typer.colors.GREEN,
+            )
 
 @app.command()                                                                  # define remove() as a Typer CLI command
 def remove(
-    todo_id: int = typer.Argument(...),                                         # defines todo_id as an argument of type int. In this case, todo_id is a required instance of typer.Argument stated by the (...).
+    todo_ids: List[str] = typer.Argument(..., help="To-do IDs and ranges such as 3 4 9-12"),  # defines todo_ids as a required argument holding one or more IDs or ranges of IDs
     force: bool = typer.Option(                                                 # defines force as an option for the remove command. It’s a Boolean option that allows the user to delete a to-do without confirmation
         False,                                                                  # defaults to False
         "--force",                                                              # flags are --force and -f
@@ -334,32 +897,38 @@ def remove(
 ) -> None:
     """Remove a to-do using its TODO_ID"""
     todoer = get_todoer()
+    ids = parse_ids(todo_ids)
 
     def _remove():                                                              # inner function _remove(), is a helper function that allows the reuse of the remove functionality
-        todo, error = todoer.remove(todo_id)                                    # removes a to-do using its id, to do that it calls .remove() on todoer
+        todos, error = todoer.remove_many(ids)                                  # removes the to-dos using their ids, all of them with one read and one write of the database. The other to-dos keep their IDs.
         if error:
             typer.secho(
-                f'Removing to-do # {todo_id} failed with"{ERRORS[error]}"',
+                f'Removing to-do # {" ".join(todo_ids)} failed with"{ERRORS[error]}"',
                 fg=typer.colors.RED,
             )
             raise typer.Exit(1)
         else:
-            typer.secho(
-                f"""To-Do # {todo_id}: '{todo["Description"]}' was removed""",
-                fg=typer.colors.GREEN,
-            )
+            for todo_id, todo in zip(ids, todos):
+                typer.secho(
+                    f"""To-Do # {todo_id}: '{todo["Description"]}' was removed""",
+                    fg=typer.colors.GREEN,
+                )
         
     if force:                                                                   # checks the value of the force option
         _remove()                                                               # True value will remove to-do without confirmation
+    elif len(ids) > 1:                                                          # several to-dos are confirmed with a single prompt
+        delete = typer.confirm(f"Delete {len(ids)} to-dos # {' '.join(todo_ids)}?")
+        if delete:
+            _remove()
+        else:
+            typer.echo("Operation Cancelled")
     else:                                                                       # Else clause to proceed if force is False
-        todo_list = todoer.get_todo_list()                                      # gets the entire list database
-        try:                                                                    # try...except block that retrieves the desired to-do from the list.
-            todo = todo_list[todo_id - 1]
-        except IndexError:                                                      # checks for index errors input by the user
+        todo = next(iter(todoer.get_todos(ids)), None)                          # looks the to-do up by its ID, without reading the entire list
+        if todo is None:                                                        # checks for IDs input by the user that name no to-do
             typer.secho("Invalid TODO_ID", fg=typer.colors.RED)
             raise typer.Exit(1)                                                 # exits the application
         delete = typer.confirm(                                                 # typer's confirm() function provides an alternative way to ask for confrimation. It allows you to use a dynamically created confirmation promt
-            f"Delete to-do # {todo_id}: {todo['Description']}?"
+            f"Delete to-do # {ids[0]}: {todo['Description']}?"
         )
         if delete:                                                              # if delete is True _remove is called
             _remove()
@@ -397,6 +966,7 @@ def _version_callback(value: bool) -> None:
 
 @app.callback()  
 def main(                                                                       # Typer callback
+    ctx: typer.Context,
     version: Optional[bool] = typer.Option(                                     # version option of type Optional[bool] i.e. bool or none
         None,                                                                   # first arg provides options default value which is set to None here
         "--version",                                                            # command-line name of option
@@ -404,6 +974,26 @@ def main(
         help="Show the application's version and exit.",                        # help message for version option
         callback=_version_callback,                                             # attaches callback function to version option => running option calls function directly
         is_eager=True,                                                          # tells typer that version option has precedence over other options in this application
-    )
+    ),
+    list_option: str = typer.Option(                                            # the list every command works on. Each list is stored in a database file of its own, registered in config.ini.
+        config.DEFAULT_LIST,
+        "--list",
+        "-l",
+        help="Named to-do list to work on",
+    ),
+    profile: bool = typer.Option(                                               # prints the time, bytes and memory of every phase of the command to standard error as JSON lines. TODO_TRACE=path appends them to a file instead.
+        False,
+        "--profile",
+        help="Print the wall time, bytes read and written and peak memory of each phase as JSON lines on stderr",
+    ),
 ) -> None:
-    return
\ No newline at end of file
+    global list_name
+    trace.start(ctx.invoked_subcommand or "", profile)                          # does nothing unless --profile or TODO_TRACE asks for a trace
+    ctx.call_on_close(trace.finish)
+    if not config.is_list_name(list_option):
+        typer.secho(
+            f'Invalid list name "{list_option}", use letters, digits, "-" and "_"',
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+    list_name = list_option
\ No newline at end of file
@@ -0,0 +1,197 @@
+"""This module provides the client side of the todo serve daemon"""
+# todo/client.py
+
+import json
+import socket
+from bisect import bisect_left
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from todo import DB_WRITE_ERROR, SUCCESS
+from todo.database import DBResponse, TodoRow
+from todo.table import SortKeys, TodoTable
+from todo.stats import stats_of
+from todo.todo import (
+    CurrentStats, CurrentTodo, CurrentTodos, Todoer, due_now, new_todo, parse_cursor, scan_due, select_page,
+)
+
+if TYPE_CHECKING:
+    from todo.query import Plan
+
+FIRST_PAGE_ROWS = 100                                                               # rows fetched by the first request of a listing, so short pages come back quickly
+MAX_PAGE_ROWS = 10000                                                               # later requests double the page size up to this many rows
+
+def socket_path(db_path: Path) -> Path:
+    """Return the path of the Unix socket the daemon of a database listens on"""
+    return db_path.with_name(db_path.name + ".sock")
+
+class DaemonError(Exception):                                                       # the daemon went away or answered with an error
+    pass
+
+def connect(db_path: Path) -> Optional["RemoteTodoer"]:
+    """Return a client of the daemon serving db_path, or None when no daemon is running"""
+    path = socket_path(db_path)
+    if not hasattr(socket, "AF_UNIX") or not path.exists():                         # the common case without a daemon costs one stat() call
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(path))
+    except OSError:                                                                 # a socket file left behind by a daemon that was killed
+        sock.close()
+        return None
+    return RemoteTodoer(sock)
+
+def open_todoer(db_path: Path, backend: str) -> Union[Todoer, "RemoteTodoer"]:
+    """Return a client of the daemon serving db_path, or a Todoer reading it directly"""
+    remote = connect(db_path)                                                       # when "todo serve" is running for the database, the commands are answered from its memory
+    if remote is not None:
+        return remote
+    return Todoer(db_path, backend)
+
+class RemoteTodoer:                                                                 # offers the methods of todo.Todoer that the commands use, answered by the daemon
+    def __init__(self, sock: socket.socket) -> None:
+        self._sock = sock
+        self._file = sock.makefile("rwb")
+
+    def close(self) -> None:
+        self._file.close()
+        self._sock.close()
+
+    def ping(self) -> str:
+        """Return the version of the daemon"""
+        return self._call("ping")
+
+    def flush(self) -> int:
+        """Ask the daemon to write its pending mutations and return the error code"""
+        return self._call("flush")
+
+    def get_todo_list(self) -> List[Dict[str, Any]]:
+        return self._call("todos")
+
+    def get_todos(self, todo_ids: List[int]) -> List[Dict[str, Any]]:
+        return self._call("get", ids=todo_ids)
+
+    def load_table(self) -> TodoTable:
+        return TodoTable.from_todos(self.get_todo_list())
+
+    def iter_todos(
+        self, reverse: bool = False, offset: int = 0, cursor: Optional[str] = None, stream: bool = False
+    ) -> Iterator[TodoRow]:                                                         # the rows are fetched a page at a time in any case
+        after = None
+        if cursor is not None:
+            cursor_reverse, after = parse_cursor(cursor)                            # raises ValueError for a malformed cursor, like Todoer.iter_todos()
+            if cursor_reverse != reverse:
+                raise ValueError("the cursor was created for the other listing order")
+        return self._iter_rows(reverse, offset, after)
+
+    def sort_todos(self, keys: SortKeys, limit: Optional[int] = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        table = self.load_table()                                                   # sorted in memory: the daemon's changes don't keep the sort index up to date
+        return table.rows(table.sorted_ids(keys, limit))
+
+    def due_todos(
+        self, limit: Optional[int] = None, overdue: bool = False, now: Optional[str] = None
+    ) -> List[Tuple[int, Dict[str, Any]]]:
+        return scan_due(self.get_todo_list(), now or due_now(), overdue, limit)  # scanned in memory: the daemon's changes don't keep the due index up to date
+
+    def search_text(self, text: str, whole_words: bool = False) -> List[Tuple[int, Dict[str, Any]]]:
+        return [(todo_id, todo) for todo_id, todo in self._call("search", text=text, whole_words=whole_words)]
+
+    def query(
+        self,
+        plan: "Plan",
+        reverse: bool = False,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> List[Tuple[int, Dict[str, Any]]]:
+        from todo.bitmaps import Bitmaps, ids_of
+        todos = self.get_todo_list()
+        table = TodoTable.from_todos(todos)                                         # the bitmaps are built from the daemon's list, as its changes don't keep the bitmap index up to date
+        text_ids = lambda text, whole_words: [todo_id for todo_id, _ in self.search_text(text, whole_words)]
+        matches = select_page(ids_of(plan(Bitmaps.from_table(table), text_ids)), reverse, offset, limit, after)
+        return [(todo_id, todos[bisect_left(table.ids, todo_id)]) for todo_id in matches]  # the table holds the to-dos in the order of the list, so a row's position is that of its dictionary
+
+    def stats(self, verify: bool = False) -> CurrentStats:
+        result = self._call("stats", verify=verify)
+        counters = {priority: [todos, done] for priority, todos, done in result["counts"]}
+        return CurrentStats(stats_of(counters), result["consistent"], SUCCESS)
+
+    def add(
+        self, description: List[str], priority: int = 2, due: Optional[str] = None, tags: Optional[List[str]] = None
+    ) -> CurrentTodo:
+        todo = new_todo(description, priority, due, tags)
+        write = self._commit({"op": "add", "todos": [todo]})
+        return CurrentTodo(write.todo_list[0] if write.todo_list else todo, write.error)
+
+    def set_done(self, todo_id: int) -> CurrentTodo:
+        write = self._commit({"op": "update", "ids": [todo_id], "set": {"Done": True}})
+        return CurrentTodo(write.todo_list[0] if write.todo_list else {}, write.error)
+
+    def set_undone(self, todo_id: int) -> CurrentTodo:
+        write = self._commit({"op": "update", "ids": [todo_id], "set": {"Done": False}})
+        return CurrentTodo(write.todo_list[0] if write.todo_list else {}, write.error)
+
+    def remove(self, todo_id: int) -> CurrentTodo:
+        write = self._commit({"op": "remove", "ids": [todo_id]})
+        return CurrentTodo(write.todo_list[0] if write.todo_list else {}, write.error)
+
+    def remove_all(self) -> CurrentTodo:
+        write = self._commit({"op": "clear"})
+        return CurrentTodo({}, write.error)
+
+    def add_many(
+        self,
+        descriptions: List[List[str]],
+        priority: int = 2,
+        due: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+    ) -> CurrentTodos:
+        todos = [new_todo(description, priority, due, tags) for description in descriptions]
+        write = self._commit({"op": "add", "todos": todos})
+        return CurrentTodos(write.todo_list or todos, write.error)
+
+    def set_done_many(self, todo_ids: List[int]) -> CurrentTodos:
+        write = self._commit({"op": "update", "ids": todo_ids, "set": {"Done": True}})
+        return CurrentTodos(write.todo_list, write.error)
+
+    def set_undone_many(self, todo_ids: List[int]) -> CurrentTodos:
+        write = self._commit({"op": "update", "ids": todo_ids, "set": {"Done": False}})
+        return CurrentTodos(write.todo_list, write.error)
+
+    def remove_many(self, todo_ids: List[int]) -> CurrentTodos:
+        write = self._commit({"op": "remove", "ids": todo_ids})
+        return CurrentTodos(write.todo_list, write.error)
+
+    def _iter_rows(
+        self, reverse: bool, offset: int, after: Optional[Tuple[int, int]]
+    ) -> Iterator[TodoRow]:                                                         # fetches the listing page by page as the rows are consumed
+        count = FIRST_PAGE_ROWS
+        while True:
+            rows = self._call("rows", reverse=reverse, offset=offset, after=after, count=count)
+            for todo_id, todo, resume in rows:
+                yield TodoRow(todo_id, todo, resume)
+            if len(rows) < count:
+                return
+            after, offset = (rows[-1][0], rows[-1][2]), 0
+            count = min(count * 2, MAX_PAGE_ROWS)
+
+    def _commit(self, op: Dict[str, Any]) -> DBResponse:
+        try:
+            result = self._call("commit", op=op)
+        except DaemonError:                                                         # the daemon may or may not have applied the mutation
+            return DBResponse([], DB_WRITE_ERROR)
+        return DBResponse(result["todo_list"], result["error"])
+
+    def _call(self, method: str, **params: Any) -> Any:
+        try:
+            self._file.write(json.dumps({"method": method, "params": params}).encode() + b"\n")
+            self._file.flush()
+            line = self._file.readline()
+        except OSError as error:
+            raise DaemonError(str(error)) from error
+        if not line:
+            raise DaemonError("the daemon closed the connection")
+        response = json.loads(line)
+        if "error" in response:
+            raise DaemonError(response["error"])
+        return response["result"]
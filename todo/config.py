@@ -1,45 +1,143 @@
 """Configuration file to store the file path of the database and other details"""
 # todo/config
 
-import configparser                                         # this class allows to handle config files with structures similar to INI files
+import re
 from pathlib import Path                                    # cross-platform way to handle system paths
-
-import typer            
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
 
 from todo import (
-    DB_WRITE_ERROR, DIR_ERROR, FILE_ERROR, SUCCESS, __app_name__
+    DB_WRITE_ERROR, DIR_ERROR, FILE_ERROR, SUCCESS, __app_name__, database, trace
 )
 
-CONFIG_DIR_PATH = Path(typer.get_app_dir(__app_name__))     # holds path of application
-CONFIG_FILE_PATH = CONFIG_DIR_PATH/"config.ini"             # holds path of config file
+if TYPE_CHECKING:
+    import configparser
+
+CONFIG_DIR_PATH: Optional[Path] = None                      # holds path of application, resolved by config_dir_path() on first use
+CONFIG_FILE_PATH: Optional[Path] = None                     # holds path of config file, resolved by config_file_path() on first use
+SETTINGS_CACHE_NAME = "settings.cache"                      # the resolved database settings, kept next to the config file
+DEFAULT_LIST = "default"                                    # the list stored in the [General] section, used without --list
+LIST_SECTION_PREFIX = "list."                               # every other named list has a [list.NAME] section of its own
+LIST_NAME_RE = re.compile(r"[A-Za-z0-9_-]+")                # list names become part of section names and file names
+
+Settings = Tuple[Path, str]                                 # the database path and storage backend of a list
+
+def config_dir_path() -> Path:
+    """Return the directory holding the application's config file"""
+    global CONFIG_DIR_PATH
+    if CONFIG_DIR_PATH is None:
+        import typer                                        # only needed to find the platform's config directory, once per process
+        CONFIG_DIR_PATH = Path(typer.get_app_dir(__app_name__))
+    return CONFIG_DIR_PATH
 
-def init_app(db_path: str) -> int:                          # initializes the application's configuration file and database
+def config_file_path() -> Path:
+    """Return the path of the application's config file"""
+    global CONFIG_FILE_PATH
+    if CONFIG_FILE_PATH is None:
+        CONFIG_FILE_PATH = config_dir_path()/"config.ini"
+    return CONFIG_FILE_PATH
+
+def init_app(db_path: str, backend: str = "json", list_name: str = DEFAULT_LIST) -> int:  # initializes the application's configuration file and database
     """Initialise the application"""
     config_code = _init_config_file()                       # calles the _init_config_file() helper function to create config directory using Path.mkdir(). Also used to create config file using Path.touch().
     if config_code != SUCCESS:
         return config_code
-    database_code = _create_database(db_path)               # calls the _create_database() helper function, which creates the to-do database.
+    database_code = _create_database(db_path, backend, list_name)  # calls the _create_database() helper function, which creates the to-do database.
     if database_code != SUCCESS:
         return database_code
     return SUCCESS
 
 def _init_config_file() -> int:
     try:
-        CONFIG_DIR_PATH.mkdir(exist_ok=True)
+        config_dir_path().mkdir(exist_ok=True)
     except OSError:
         return DIR_ERROR
     try:
-        CONFIG_FILE_PATH.touch(exist_ok=True)
+        config_file_path().touch(exist_ok=True)
     except OSError:
         return FILE_ERROR
     return SUCCESS
 
-def _create_database(db_path: str) -> int:
+def get_settings(list_name: str = DEFAULT_LIST) -> Settings:  # every command needs the database path and backend, so they are read from a small cache instead of parsing config.ini each time
+    """Return the database path and storage backend of a list, or raise KeyError"""
+    return get_lists()[list_name]
+
+def get_lists() -> Dict[str, Settings]:
+    """Return the settings of every list in config.ini, the default list first"""
+    stamp = database.stat_stamp(config_file_path())
+    cached = _read_settings_cache(stamp)
+    if cached is not None:
+        return cached
+    with trace.span("config.parse"):
+        lists = _read_lists(_read_config())
+    _write_settings_cache(stamp, lists)                     # config.ini was edited by hand or the cache is missing
+    return lists
+
+def is_list_name(name: str) -> bool:
+    return LIST_NAME_RE.fullmatch(name) is not None
+
+def _read_config() -> "configparser.ConfigParser":
+    import configparser                                     # this class allows to handle config files with structures similar to INI files
     config_parser = configparser.ConfigParser()
-    config_parser["General"] = {"database": db_path}
     try:
-        with CONFIG_FILE_PATH.open("w") as file:
+        config_parser.read(config_file_path())
+    except configparser.Error:                              # a config file damaged by hand is written again by the next "todo init"
+        return configparser.ConfigParser()
+    return config_parser
+
+def _read_lists(config_parser: "configparser.ConfigParser") -> Dict[str, Settings]:
+    lists = {}
+    for section in config_parser.sections():
+        if section == "General":
+            name = DEFAULT_LIST
+        elif section.startswith(LIST_SECTION_PREFIX):
+            name = section[len(LIST_SECTION_PREFIX):]
+        else:
+            continue
+        settings = config_parser[section]
+        lists[name] = (
+            Path(settings["database"]),
+            settings.get("backend", database.DEFAULT_BACKEND),  # config files written before backends existed have no "backend" key, so they keep using plain JSON
+        )
+    if DEFAULT_LIST in lists:
+        lists = {DEFAULT_LIST: lists.pop(DEFAULT_LIST), **lists}
+    return lists
+
+def _settings_cache_path() -> Path:
+    return config_file_path().with_name(SETTINGS_CACHE_NAME)
+
+def _read_settings_cache(stamp: Optional[Tuple[int, ...]]) -> Optional[Dict[str, Settings]]:  # one "name<TAB>backend<TAB>path" line per list after the stamp of config.ini
+    try:
+        cached_stamp, *lines = _settings_cache_path().read_text().split("\n")
+        lists = {}
+        for line in lines:
+            name, backend, db_path = line.split("\t")
+            lists[name] = (Path(db_path), backend)
+    except (OSError, ValueError):                           # a missing or damaged cache is rebuilt
+        return None
+    if stamp is None or cached_stamp != " ".join(map(str, stamp)):  # the cache only counts for the config.ini it was written from
+        return None
+    return lists
+
+def _write_settings_cache(stamp: Optional[Tuple[int, ...]], lists: Dict[str, Settings]) -> None:
+    if stamp is None:
+        return
+    lines = [" ".join(map(str, stamp))]
+    lines.extend(f"{name}\t{backend}\t{db_path}" for name, (db_path, backend) in lists.items())
+    try:
+        _settings_cache_path().write_text("\n".join(lines))
+    except OSError:                                         # the cache is only an optimization, config.ini stays authoritative
+        pass
+
+def _create_database(db_path: str, backend: str = "json", list_name: str = DEFAULT_LIST) -> int:
+    config_parser = _read_config()                          # the other lists stay registered
+    section = "General" if list_name == DEFAULT_LIST else LIST_SECTION_PREFIX + list_name
+    config_parser[section] = {"database": db_path, "backend": backend}  # the backend key selects the DatabaseHandler implementation, see database.get_handler()
+    try:
+        with config_file_path().open("w") as file:
             config_parser.write(file)
     except OSError:
         return DB_WRITE_ERROR
+    _write_settings_cache(                                  # the settings are resolved right away, so later commands never parse config.ini
+        database.stat_stamp(config_file_path()), _read_lists(config_parser)
+    )
     return SUCCESS
\ No newline at end of file
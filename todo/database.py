@@ -1,53 +1,649 @@
 """This Module provides Database functionality to the application"""
 # todo/database.py
 
-import configparser
+import itertools
 import json
+import marshal
+import mmap
+import os
 from pathlib import Path
-from typing import Any, Dict, List, NamedTuple
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
 
-from todo import DB_READ_ERROR, DB_WRITE_ERROR, JSON_ERROR, SUCCESS
+from todo import DB_READ_ERROR, DB_WRITE_ERROR, ID_ERROR, JSON_ERROR, SUCCESS, trace
+from todo.stats import Counters, count_in, count_out, count_todos, load_counts, store_counts
 
-DEFAULT_DB_FILE_PATH = Path.home().joinpath(                                        # define DEFAULT_DB_FILE_PATH to hold the default database file path. The application will use this path if the user doesn’t provide a custom one.
-    "." + Path.home().stem + "_todo.json"
-)
+def default_database_path(list_name: Optional[str] = None) -> Path:                 # the default database file path. The application will use this path if the user doesn’t provide a custom one. Resolved on demand, so only "todo init" pays for Path.home().
+    """Return the default location of the to-do database, or of the shard of a named list"""
+    home = Path.home()
+    return home.joinpath("." + home.stem + "_todo" + (f".{list_name}" if list_name else "") + ".json")
+
+DEFAULT_BACKEND = "json"                                                            # storage backend used when config.ini doesn't name one
+BACKENDS = ("json", "journal", "sqlite", "binary")                                  # every value accepted for the "backend" key of the [General] section
+BINARY_MAGIC = b"TODOBIN1"                                                          # the first bytes of a binary database, by which get_handler() recognizes one configured as json
+
+INDENTED_HEAD = b"[\n    {"                                                         # json.dump(indent=4) starts every to-do of the list on a line of its own,
+INDENTED_START = b"\n    {"                                                         # so these markers delimit the to-dos of a file written by write_todos().
+INDENTED_END = b"\n    }"                                                           # Descriptions can't contain them: newlines inside strings are escaped.
+ID_HEAD = INDENTED_HEAD + b'\n        "ID": '                                       # files written since to-dos have IDs start with the ID of the first one
+TOMBSTONE = "Deleted"                                                               # the key of the record a removed to-do leaves in its slot, {"ID": 7, "Deleted": true}
+DECODE_CHUNK_MIN = 16 * 1024
+DECODE_CHUNK_MAX = 1 << 20
+CACHE_FORMAT = 1                                                                    # bumped whenever the layout of the snapshot cache changes
+LOOKUP_MAX_ROWS = 1000                                                              # lookups of up to this many IDs bisect the file instead of loading the whole list
+DUMP_CHUNK_ROWS = 10000                                                             # to-dos encoded into one string before it is written
+COPY_BLOCK = 1 << 20                                                                # bytes of the old file copied at a time by an import
+CACHE_SWITCH_ROWS = 1000                                                            # listings longer than this continue from the snapshot cache rather than decoding the file
+
+_encode_flat = json.JSONEncoder(separators=(",\n        ", ": ")).encode            # without indent json uses its C encoder, and this item separator gives the line breaks and indentation of indent=4 inside a flat to-do
 
 def get_database_path(config_file: Path) -> Path:                                   # define get_database_path()
     """Return the current path to the to-do database"""
+    import configparser                                                             # only needed when the cached settings of config.get_settings() are out of date
     config_parser = configparser.ConfigParser()                                     # this function takes the path to the app’s config file as an argument and
     config_parser.read(config_file)                                                 # reads the input file using ConfigParser.read() and 
     return Path(config_parser["General"]["database"])                               # returns a Path object representing the path to the to-do database on your file system. The ConfigParser instance stores the data in a dictionary. The "General" key represents the file section that stores the required information. The "database" key retrieves the database path. 
 
-def init_database(db_path: Path) -> int:                                            # define init_database()
+def get_handler(db_path: Path, backend: str = DEFAULT_BACKEND, detect: bool = True) -> "DatabaseHandler":  # detect is left off by callers about to replace the file in the format they asked for
+    """Return the database handler implementing the given backend"""
+    if backend == "journal":
+        from todo.journal import JournalDatabaseHandler                             # imported here because todo.journal subclasses DatabaseHandler from this module
+        return JournalDatabaseHandler(db_path)
+    if backend == "sqlite":
+        from todo.sqlitedb import SQLiteDatabaseHandler
+        return SQLiteDatabaseHandler(db_path)
+    if backend == "binary" or (detect and _is_binary(db_path)):                     # a database converted with "todo migrate --to binary" keeps working under a config that still says json
+        from todo.binarydb import BinaryDatabaseHandler
+        return BinaryDatabaseHandler(db_path)
+    return DatabaseHandler(db_path)
+
+def _is_binary(db_path: Path) -> bool:
+    try:
+        with db_path.open("rb") as db:
+            return db.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+    except OSError:
+        return False
+
+def init_database(db_path: Path, backend: str = DEFAULT_BACKEND) -> int:            # define init_database()
     """Creating the database"""                                                     # this function takes a database path and writes a string representing an empty list.
+    return get_handler(db_path, backend, detect=False).write_todos([]).error        # every backend knows how to store an empty to-do list, which also discards any leftover journal
+
+def stat_stamp(path: Path) -> Optional[Tuple[int, ...]]:                            # returns None when the file does not exist
     try:
-        db_path.write_text("[]")                                                    # calls the write_text() on the database path, and the list initializes the JSON database with an empty to-do list
-        return SUCCESS
+        stat = path.stat()
     except OSError:
-        return DB_WRITE_ERROR
+        return None
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+def _fd_stamp(fd: int) -> Tuple[int, ...]:                                          # the stamp of an open file, which can't have been replaced since it was opened
+    stat = os.fstat(fd)
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+def cache_path(db_path: Path) -> Path:
+    """Return the path of the parsed-snapshot cache kept next to a database"""
+    return db_path.with_name(db_path.name + ".cache")
+
+@trace.traced("cache.load")
+def load_cache(db_path: Path, stamp: Tuple[int, ...]) -> Optional[List[Dict[str, Any]]]:
+    """Return the cached to-do list of a database, or None when the cache doesn't match stamp"""
+    try:
+        with cache_path(db_path).open("rb") as cache:
+            data = cache.read()
+            trace.add(bytes_read=len(data))
+            version, cached_stamp, todo_list = marshal.loads(data)                  # marshal.load() would fetch every object from the file separately, which is several times slower
+    except (OSError, EOFError, ValueError, TypeError):                              # no cache yet, or one cut short or written by another Python version
+        return None
+    if version != (CACHE_FORMAT, marshal.version) or tuple(cached_stamp) != stamp:
+        return None
+    return todo_list
+
+@trace.traced("cache.store")
+def store_cache(db_path: Path, stamp: Tuple[int, ...], todo_list: List[Dict[str, Any]]) -> None:
+    """Save a to-do list as the cache of the database version identified by stamp"""
+    path = cache_path(db_path)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with tmp_path.open("wb") as cache:
+            trace.add(bytes_written=cache.write(marshal.dumps(((CACHE_FORMAT, marshal.version), stamp, todo_list))))  # marshal loads plain lists and dicts faster than json or pickle
+        os.replace(tmp_path, path)
+    except (OSError, ValueError):                                                   # the cache is only an optimization, so failing to write it is not an error
+        tmp_path.unlink(missing_ok=True)
 
 class DBResponse(NamedTuple):                                                       # NamedTuple subclass.                               
     todo_list: List[Dict[str, Any]]                                                 # list of dictionaries representing individual to-dos
     error: int                                                                      # integer error return code
 
+class CountResponse(NamedTuple):                                                    # answers mutations too big to hand the to-dos back, such as DatabaseHandler.import_todos()
+    count: int
+    error: int
+
+class TodoRow(NamedTuple):                                                          # one to-do yielded by DatabaseHandler.iter_todos()
+    todo_id: int                                                                    # the ID the to-do keeps for its whole life, whatever is added or removed around it
+    todo: Dict[str, Any]
+    resume: int                                                                     # backend-specific position next to this row, from which a later iteration can continue
+
 class DatabaseHandler:                                                              # defines DatabaseHandler class that allows to read and write data to the to-do database using json module from the standard library
     def __init__(self, db_path: Path) -> None:                                      # class initializer, takes the path of the database on your file system
         self._db_path = db_path
 
     def read_todos(self) -> DBResponse:                                             # this method reads the to-do list from the database and deserializes it
         try:                                                                        # try...except block to catch errors while opening the database
-            with self._db_path.open("r") as db:                                     # opens the database in "r" - read format
+            with self._db_path.open("rb") as db:                                    # opens the database in "rb" - binary read format
+                stamp = _fd_stamp(db.fileno())
+                cached = load_cache(self._db_path, stamp)                           # a snapshot parsed by an earlier command, if the database hasn't changed since
+                if cached is not None:
+                    return DBResponse(cached, SUCCESS)
                 try:                                                                # try...except block to catch errors while loading and deserialising the JSON file content
-                    return DBResponse(json.load(db), SUCCESS)                       # returns a DBResponse type instance holding the result of calling json.load() with the to-do database object as an argument. This result consists of a list of dictionaries. Every dictionary represents a to-do. The error field of DBResponse holds SUCCESS to signal that the operation was successful.
-                except json.JSONDecodeError:                                        # catches loading errors of JSON file
+                    with trace.span("db.parse") as span:
+                        todo_list = json.load(db)                                   # the result of calling json.load() with the to-do database object as an argument consists of a list of dictionaries. Every dictionary represents a to-do.
+                        span.add(rows=len(todo_list), bytes_read=stamp[1])
+                except ValueError:                                                  # catches loading errors of JSON file, including bytes that aren't text
                     return DBResponse([], DB_READ_ERROR)
         except OSError:                                                             # catches I/O - loading problems with the JSON file
             return DBResponse([], DB_READ_ERROR)
+        todo_list = number_todos(todo_list)                                         # databases written before to-dos had IDs are numbered by position
+        store_cache(self._db_path, stamp, todo_list)
+        return DBResponse(todo_list, SUCCESS)                                       # returns a DBResponse type instance holding the to-do list. The error field of DBResponse holds SUCCESS to signal that the operation was successful.
 
-    def write_todos(self, todo_list: List[Dict[str, Any]]) -> DBResponse:           # takes a list of to-do dictionaries and writes them to the database
-        try:                                                                        # try...except block to catch errors while opening the database
-            with self._db_path.open("w") as db:                                     # opens the database in "w" - write format
-                json.dump(todo_list, db, indent=4)                                  # dumps the to-do list as JSON content into the database
+    def write_todos(
+        self, todo_list: List[Dict[str, Any]], counters: Optional[Counters] = None
+    ) -> DBResponse:                                                                # takes a list of to-do dictionaries and writes them to the database, along with its counters when the caller kept them up to date
+        todo_list = compact(number_todos(todo_list))                                # the tombstones of removed to-dos are dropped whenever the whole list is rewritten
+        try:                                                                        # try...except block to catch errors while writing the database
+            stamp = write_json(self._db_path, todo_list)                            # dumps the to-do list as JSON content into a temporary file that then replaces the database
+            store_cache(self._db_path, stamp, todo_list)                            # the next read skips parsing the JSON just written
+            store_counts(self._db_path, stamp, counters if counters is not None else count_todos(live_todos(todo_list)))
             return DBResponse(todo_list, SUCCESS)                                   # returns a DBResponse instance holding the to-do list and the SUCCESS code.
         except OSError:
             return DBResponse(todo_list, DB_WRITE_ERROR)
+
+    def iter_todos(
+        self,
+        reverse: bool = False,
+        offset: int = 0,
+        after: Optional[Tuple[int, int]] = None,
+        stream: bool = False,
+    ) -> Iterator[TodoRow]:                                                         # with stream set, the rows are decoded from the file to the end and the snapshot cache is neither loaded nor stored, so memory use stays flat
+        """Yield the to-dos one at a time, oldest first or newest first"""
+        try:
+            with self._db_path.open("rb") as db:
+                stamp = _fd_stamp(db.fileno())
+                try:
+                    buffer = mmap.mmap(db.fileno(), 0, access=mmap.ACCESS_READ)     # the file is mapped rather than read, so only the pages actually visited are loaded
+                except ValueError:                                                  # an empty file can't be mapped
+                    return
+                with buffer:
+                    if buffer[:len(ID_HEAD)] == ID_HEAD:
+                        yield from self._iter_snapshot(buffer, stamp, reverse, offset, after, stream)
+                        return
+        except OSError:
+            return
+        yield from iter_list(self.read_todos().todo_list, reverse, offset, after)  # files not written by write_todos(), or written before to-dos had IDs, are loaded whole
+
+    def _iter_snapshot(
+        self,
+        buffer: mmap.mmap,
+        stamp: Tuple[int, ...],
+        reverse: bool,
+        offset: int,
+        after: Optional[Tuple[int, int]],
+        stream: bool = False,
+    ) -> Iterator[TodoRow]:                                                         # short listings decode only the rows they print, long ones switch over to the parsed snapshot
+        whole = not reverse and not offset and after is None and not stream
+        todo_list = []
+        for count, row in enumerate(_iter_indented(buffer, reverse, offset, after), 1):
+            yield row
+            if count == CACHE_SWITCH_ROWS and not stream:
+                cached = load_cache(self._db_path, stamp)
+                if cached is not None:
+                    yield from iter_list(cached, reverse, 0, (row.todo_id, row.todo_id))
+                    return
+            if whole:
+                todo_list.append(row.todo)
+        if whole:
+            _, last = _last_record(buffer)
+            if last is not None and TOMBSTONE in last:                              # the tombstone keeping the highest ID is part of the snapshot too
+                todo_list.append(last)
+            store_cache(self._db_path, stamp, todo_list)                            # a listing read to the end leaves the snapshot for the next command
+
+    def stamp(self) -> Optional[Tuple[int, ...]]:                                   # identifies the current state of the database files. Sidecar indexes compare it to tell whether the database was changed behind their back.
+        """Return the inode, size and modification time of the database"""
+        return stat_stamp(self._db_path)
+
+    def read_counts(self) -> Optional[Counters]:                                    # JSON has no room for a header, so the counters live in a file next to the database, stamped like the snapshot cache
+        """Return the stored counters of the to-do list, or None when only a full scan can tell"""
+        return load_counts(self._db_path, self.stamp())
+
+    def write_counts(self, counters: Counters) -> int:                              # called under the database lock with the counters of a full scan
+        """Replace the stored counters of the to-do list and return the error code"""
+        stamp = self.stamp()
+        if stamp is None:
+            return DB_READ_ERROR
+        store_counts(self._db_path, stamp, counters)
+        return SUCCESS
+
+    def get_todos(self, todo_ids: List[int]) -> DBResponse:                         # IDs that name no to-do are skipped
+        """Return the to-dos with the given IDs"""
+        if len(todo_ids) <= LOOKUP_MAX_ROWS:
+            try:
+                with self._db_path.open("rb") as db:
+                    if db.read(len(ID_HEAD)) == ID_HEAD:
+                        with mmap.mmap(db.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                            return DBResponse(_find_indented(buffer, todo_ids), SUCCESS)
+            except (OSError, ValueError):
+                return DBResponse([], DB_READ_ERROR)
+        read = self.read_todos()
+        if read.error:
+            return read
+        return DBResponse(pick_todos(read.todo_list, todo_ids), SUCCESS)
+
+    def add_todo(self, todo: Dict[str, Any]) -> DBResponse:                         # a batch of one
+        """Append a to-do to the database"""
+        return self.add_todos([todo])
+
+    def add_todos(self, todos: List[Dict[str, Any]]) -> DBResponse:                 # the batch methods are groups of one mutation. Backends that can store changes one at a time override them.
+        """Append several to-dos to the database"""
+        return self.commit([{"op": "add", "todos": todos}])[0]
+
+    def update_todos(self, todo_ids: List[int], changes: Dict[str, Any]) -> DBResponse:
+        """Apply the same changes to several to-dos"""
+        return self.commit([{"op": "update", "ids": todo_ids, "set": changes}])[0]
+
+    def remove_todos(self, todo_ids: List[int]) -> DBResponse:
+        """Remove several to-dos"""
+        return self.commit([{"op": "remove", "ids": todo_ids}])[0]
+
+    def commit(self, ops: List[Dict[str, Any]]) -> List[DBResponse]:                # one read-modify-write for a whole group of mutations, see todo.locking.GroupCommit
+        """Apply several mutations with one read and one write, returning one response per mutation"""
+        read = self.read_todos()
+        if read.error and ops[0]["op"] != "clear":                                  # a group starting with a clear doesn't need the old list at all
+            return [DBResponse(op.get("todos", []), read.error) for op in ops]
+        todo_list = [] if read.error else read.todo_list
+        slots = slot_index(todo_list)                                               # built once for the whole group
+        counters = None if read.error else self.read_counts()                       # counters that matched the list before the group are updated by each mutation instead of recounted
+        responses = [apply_counted(todo_list, op, slots, counters) for op in ops]
+        if all(response.error for response in responses):                           # every mutation was rejected, so there is nothing to write
+            return responses
+        write = self.write_todos(todo_list, counters)
+        if write.error:
+            return [response if response.error else response._replace(error=write.error) for response in responses]
+        return responses
+
+    def clear_todos(self) -> DBResponse:
+        """Remove every to-do from the database"""
+        return self.commit([{"op": "clear"}])[0]                                    # the highest ID given out survives the clear
+
+    def import_todos(self, chunks: Iterable[List[Dict[str, Any]]]) -> CountResponse:  # the old file is copied and the new to-dos are written after it, a chunk at a time, so neither the list nor the import is ever held whole
+        """Append to-dos chunk by chunk with a single rewrite of the database and return how many were added"""
+        highest = snapshot_last_id(self._db_path)
+        if highest is None:                                                         # a file not written by write_todos() is rewritten once, so the new to-dos can follow its last one
+            read = self.read_todos()
+            write = self.write_todos(read.todo_list) if not read.error else read
+            if write.error:
+                return CountResponse(0, write.error)
+            highest = last_id(write.todo_list)
+        counters = self.read_counts()
+        tmp_path = self._db_path.with_name(f"{self._db_path.name}.{os.getpid()}.tmp")
+        count = 0
+        try:
+            with self._db_path.open("rb") as db, tmp_path.open("wb") as out:
+                with mmap.mmap(db.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                    start, last = _last_record(buffer)
+                    if last is None:                                                # "[]"
+                        keep = buffer.find(b"[") + 1
+                    elif TOMBSTONE in last:                                         # the tombstone keeping the highest ID is dropped, as the new to-dos carry higher ones
+                        keep = start
+                    else:
+                        keep = buffer.rfind(INDENTED_END) + len(INDENTED_END)
+                    for pos in range(0, keep, COPY_BLOCK):
+                        out.write(buffer[pos:min(pos + COPY_BLOCK, keep)])
+                    separator = b"," if buffer[keep - 1:keep] == b"}" else b""
+                for chunk in chunks:
+                    todos = [with_id(todo, todo_id) for todo_id, todo in enumerate(chunk, highest + 1)]
+                    if not todos:
+                        continue
+                    highest += len(todos)
+                    count += len(todos)
+                    out.write(separator + dump_records(todos).encode())
+                    separator = b","
+                    if counters is not None:
+                        count_in(counters, todos)
+                out.write(b"\n]")
+                out.flush()
+                os.fsync(out.fileno())
+                stamp = _fd_stamp(out.fileno())
+                trace.add(bytes_written=stamp[1])
+            if count:
+                os.replace(tmp_path, self._db_path)
+        except OSError:
+            return CountResponse(0, DB_WRITE_ERROR)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        if count and counters is not None:
+            store_counts(self._db_path, stamp, counters)
+        return CountResponse(count, SUCCESS)
+
+    def persist(
+        self, ops: List[Dict[str, Any]], todo_list: List[Dict[str, Any]], counters: Optional[Counters] = None
+    ) -> int:                                                                       # used by the todo serve daemon, which validates and applies mutations in memory and keeps the counters of its list
+        """Store mutations already applied to todo_list, the whole resulting list, and return the error code"""
+        return self.write_todos(todo_list, counters).error
+
+def migrate_database(
+    src_path: Path, src_backend: str, dst_path: Path, dst_backend: str
+) -> DBResponse:
+    """Copy every to-do from one database into another"""
+    read = get_handler(src_path, src_backend).read_todos()                          # one pass over the source ...
+    if read.error:
+        return read
+    return get_handler(dst_path, dst_backend, detect=False).write_todos(read.todo_list)  # ... and one write_todos() call on the destination, which the SQLite backend runs as a single transaction
+
+@trace.traced("db.write")
+def write_json(db_path: Path, todo_list: List[Dict[str, Any]]) -> Tuple[int, ...]:  # raises OSError
+    """Replace a JSON database atomically with the given to-do list and return its stamp"""
+    tmp_path = db_path.with_name(f"{db_path.name}.{os.getpid()}.tmp")               # named after the process, so concurrent writers never share a temporary file
+    try:
+        with tmp_path.open("w") as db:
+            if not todo_list:
+                db.write("[]")
+            else:
+                db.write("[")
+                for start in range(0, len(todo_list), DUMP_CHUNK_ROWS):
+                    db.write(("," if start else "") + dump_records(todo_list[start:start + DUMP_CHUNK_ROWS]))
+                db.write("\n]")
+            db.flush()
+            os.fsync(db.fileno())                                                   # the new contents reach the disk before the rename makes them visible
+            stamp = _fd_stamp(db.fileno())                                          # renaming keeps the inode, size and mtime, so this is the stamp of the database once replaced
+            trace.add(rows=len(todo_list), bytes_written=stamp[1])
+        os.replace(tmp_path, db_path)                                               # readers and a crash see either the old file or the new one, never a truncated one
+    except Exception:                                                               # including a to-do json can't serialize, which leaves the database untouched
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return stamp
+
+def dump_records(todos: List[Dict[str, Any]]) -> str:                               # json.dump(indent=4) runs its pure-Python encoder, several times slower than the C one
+    """Return the to-dos laid out as json.dump(indent=4) writes them inside a list, without the brackets"""
+    if any(_holds_objects(value) for todo in todos for value in todo.values()):
+        return json.dumps(todos, indent=4)[1:-2]                                    # nested objects would look like the boundary between two to-dos below, so they need the indenting encoder
+    text = _encode_flat(todos)                                                      # '[{"ID": 1,\n        "Description": ...},\n        {"ID": 2, ...}]'. A list of strings such as the Tags of a to-do stays inside its to-do's lines.
+    return "\n    {\n        " + text[2:-2].replace("},\n        {", "\n    },\n    {\n        ") + "\n    }"  # strings can't hold a raw line break, so the pattern only matches between to-dos
+
+def _holds_objects(value: Any) -> bool:
+    if type(value) is dict:
+        return True
+    return type(value) is list and any(type(item) is dict or type(item) is list for item in value)
+
+def apply_op(
+    todo_list: List[Dict[str, Any]], op: Dict[str, Any], slots: Optional[Dict[int, int]] = None
+) -> DBResponse:                                                                    # ops have the shape of journal records: {"op": "add", "todos": [...]}, {"op": "update", "ids": [...], "set": {...}}, {"op": "remove", "ids": [...]} or {"op": "clear"}
+    """Apply one mutation to an in-memory to-do list and return its response"""
+    if slots is None:                                                               # callers applying several mutations build the slot index once and pass it along
+        slots = slot_index(todo_list)
+    kind = op["op"]
+    if kind == "add":
+        todos = [with_id(todo, todo_id) for todo_id, todo in enumerate(op["todos"], last_id(todo_list) + 1)]  # the op itself carries no IDs, so replaying it gives out the same ones again
+        for todo in todos:
+            slots[todo["ID"]] = len(todo_list)
+            todo_list.append(todo)
+        return DBResponse(todos, SUCCESS)
+    if kind == "clear":
+        highest = last_id(todo_list)
+        todo_list.clear()
+        slots.clear()
+        if highest:
+            todo_list.append({"ID": highest, TOMBSTONE: True})
+        return DBResponse([], SUCCESS)
+    todo_ids = op["ids"]
+    if not all(todo_id in slots for todo_id in todo_ids):                           # a mutation holding an invalid ID is rejected as a whole
+        return DBResponse([], ID_ERROR)
+    if kind == "update":
+        for todo_id in todo_ids:
+            todo_list[slots[todo_id]].update(op["set"])
+        return DBResponse([dict(todo_list[slots[todo_id]]) for todo_id in todo_ids], SUCCESS)  # copies, so later mutations of the same group don't change this response
+    removed = []
+    for todo_id in dict.fromkeys(todo_ids):                                         # a tombstone takes the slot, so no later to-do moves and no ID changes
+        slot = slots.pop(todo_id)
+        removed.append(todo_list[slot])
+        todo_list[slot] = {"ID": todo_id, TOMBSTONE: True}
+    return DBResponse(removed, SUCCESS)
+
+def apply_counted(
+    todo_list: List[Dict[str, Any]],
+    op: Dict[str, Any],
+    slots: Dict[int, int],
+    counters: Optional[Counters],
+) -> DBResponse:                                                                    # counters is None when they aren't kept, and is then left alone
+    """Apply one mutation like apply_op() and update the counters of the list in place"""
+    if counters is None:
+        return apply_op(todo_list, op, slots)
+    kind = op["op"]
+    changed = list(dict.fromkeys(op["ids"])) if kind == "update" else []
+    before = [dict(todo_list[slots[todo_id]]) for todo_id in changed if todo_id in slots]  # the counters only learn how much changed from the old values
+    response = apply_op(todo_list, op, slots)
+    if response.error:
+        return response
+    if kind == "add":
+        count_in(counters, response.todo_list)
+    elif kind == "remove":
+        count_out(counters, response.todo_list)                                     # the removed to-dos as they were
+    elif kind == "update":
+        count_out(counters, before)
+        count_in(counters, (todo_list[slots[todo_id]] for todo_id in changed))
+    else:
+        counters.clear()
+    return response
+
+def slot_index(todo_list: List[Dict[str, Any]]) -> Dict[int, int]:
+    """Map the ID of every to-do in a list to its slot"""
+    return {todo["ID"]: slot for slot, todo in enumerate(todo_list) if TOMBSTONE not in todo}
+
+def last_id(todo_list: List[Dict[str, Any]]) -> int:                                # IDs grow along the list and the last slot is kept by compact(), so it holds the highest ID given out
+    """Return the highest ID given out in a to-do list"""
+    return todo_list[-1]["ID"] if todo_list else 0
+
+def number_todos(todos: List[Dict[str, Any]], after: int = 0) -> List[Dict[str, Any]]:
+    """Return the to-dos with the next free ID given to every one that has none"""
+    if not todos or "ID" in todos[-1]:                                              # lists written since to-dos have IDs are returned as they are
+        return todos
+    numbered = []
+    for todo in todos:
+        after = todo["ID"] if "ID" in todo else after + 1
+        numbered.append(todo if "ID" in todo else with_id(todo, after))
+    return numbered
+
+def with_id(todo: Dict[str, Any], todo_id: int) -> Dict[str, Any]:
+    """Return a copy of a to-do carrying the given ID as its first key"""
+    numbered = {"ID": todo_id}
+    numbered.update(todo)
+    numbered["ID"] = todo_id
+    return numbered
+
+def compact(todo_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Return a to-do list without the tombstones of removed to-dos, except one in the last slot"""
+    compacted = [todo for todo in todo_list if TOMBSTONE not in todo]
+    if todo_list and TOMBSTONE in todo_list[-1]:                                    # kept, so the next to-do added doesn't get the ID of a removed one
+        compacted.append(todo_list[-1])
+    return compacted
+
+def todo_from_columns(
+    todo_id: int, description: str, priority: int, done: Any, due: Optional[str] = None, tags: Optional[str] = None
+) -> Dict[str, Any]:                                                                # the columns of a row of the SQLite files: the sqlite backend and the indexes kept next to any database
+    """Return the to-do held by the columns of a table row"""
+    todo = {"ID": todo_id, "Description": description, "Priority": priority, "Done": bool(done)}
+    if due is not None:                                                             # as with the other backends, to-dos without a due date have no Due key
+        todo["Due"] = due
+    if tags is not None:
+        todo["Tags"] = tags.split(",")
+    return todo
+
+def joined_tags(todo: Dict[str, Any]) -> Optional[str]:                             # tags are stored in a single column, joined by commas, which tags can't contain
+    """Return the tags of a to-do as one column value, or None when it has none"""
+    tags = todo.get("Tags")
+    return ",".join(tags) if tags else None
+
+def live_todos(todo_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Return the to-dos of a list that haven't been removed"""
+    return [todo for todo in todo_list if TOMBSTONE not in todo]
+
+def iter_list(
+    todo_list: List[Dict[str, Any]],
+    reverse: bool = False,
+    offset: int = 0,
+    after: Optional[Tuple[int, int]] = None,
+) -> Iterator[TodoRow]:
+    """Yield the to-dos of an in-memory list the way iter_todos() does"""
+    if reverse:
+        slots = range((_first_slot_after(todo_list, after[0] - 1) if after else len(todo_list)) - 1, -1, -1)
+    else:
+        slots = range(_first_slot_after(todo_list, after[0]) if after else 0, len(todo_list))
+    rows = (
+        TodoRow(todo["ID"], todo, todo["ID"])                                       # for in-memory lists the resume position is the to-do ID itself
+        for todo in map(todo_list.__getitem__, slots) if TOMBSTONE not in todo
+    )
+    return itertools.islice(rows, offset, None)
+
+def pick_todos(todo_list: List[Dict[str, Any]], todo_ids: List[int]) -> List[Dict[str, Any]]:  # IDs that name no to-do are skipped
+    """Return the to-dos of a list with the given IDs"""
+    found = []
+    for todo_id in todo_ids:
+        slot = _first_slot_after(todo_list, todo_id - 1)                            # found by bisection, as the list is ordered by ID
+        if slot < len(todo_list) and todo_list[slot]["ID"] == todo_id and TOMBSTONE not in todo_list[slot]:
+            found.append(todo_list[slot])
+    return found
+
+def _first_slot_after(todo_list: List[Dict[str, Any]], todo_id: int) -> int:        # IDs grow along the list, so the slot is found by bisection, even when todo_id itself was removed
+    low, high = 0, len(todo_list)
+    while low < high:
+        middle = (low + high) // 2
+        if todo_list[middle]["ID"] <= todo_id:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+def _iter_indented(
+    buffer: mmap.mmap, reverse: bool, offset: int, after: Optional[Tuple[int, int]]
+) -> Iterator[TodoRow]:                                                             # walks a file written by write_todos() from either end. Resume positions are byte offsets.
+    if after and not _is_resume_position(buffer, after, reverse):                   # a cursor from another backend, from the todo serve daemon or from before the file was rewritten holds no usable byte offset
+        todo_id = after[0]
+        rows = _iter_indented(buffer, reverse, 0, None)
+        if reverse:                                                                 # the position is found again by comparing IDs, which grow along the file
+            rows = itertools.dropwhile(lambda row: row.todo_id >= todo_id, rows)
+        else:
+            rows = itertools.dropwhile(lambda row: row.todo_id <= todo_id, rows)
+        yield from itertools.islice(rows, offset, None)
+        return
+    if reverse:
+        if after:
+            pos = after[1]
+        else:
+            pos, last = _last_record(buffer)
+            if last is None or TOMBSTONE not in last:                               # only the last slot can hold a tombstone, kept by compact() for its ID
+                pos = len(buffer)
+        for _ in range(offset):                                                     # skipped to-dos are never decoded
+            pos = buffer.rfind(INDENTED_START, 0, pos)
+            if pos < 0:
+                return
+    else:
+        pos = after[1] if after else 0
+        for _ in range(offset):
+            pos = buffer.find(INDENTED_END, pos)
+            if pos < 0:
+                return
+            pos += len(INDENTED_END)
+    chunk_size = DECODE_CHUNK_MIN
+    while True:                                                                     # to-dos are decoded a chunk at a time with a single json.loads() call. Chunks start small, so the first page comes back quickly, and grow for long listings.
+        if reverse:
+            end = buffer.rfind(INDENTED_END, 0, pos)
+            start = buffer.rfind(INDENTED_START, 0, max(end - chunk_size, 0)) if end >= 0 else -1
+            if start < 0:
+                start = buffer.find(INDENTED_START, 0, end)
+        else:
+            start = buffer.find(INDENTED_START, pos)
+            end = buffer.find(INDENTED_END, min(start + chunk_size, len(buffer))) if start >= 0 else -1
+            if end < 0:
+                end = buffer.rfind(INDENTED_END, start)
+        if start < 0 or end < 0:
+            return
+        chunk = buffer[start + 1:end + len(INDENTED_END)]                           # consecutive to-dos separated by commas, which become a JSON array once wrapped in brackets
+        todos = json.loads(b"[" + chunk + b"]")
+        if reverse:
+            starts = [start] + _marker_offsets(chunk, INDENTED_START, start + 1)
+            for todo, todo_start in zip(reversed(todos), reversed(starts)):
+                if TOMBSTONE not in todo:
+                    yield TodoRow(todo["ID"], todo, todo_start)
+            pos = start
+        else:
+            ends = _marker_offsets(chunk, INDENTED_END, start + 1 + len(INDENTED_END))
+            for todo, todo_end in zip(todos, ends):
+                if TOMBSTONE not in todo:
+                    yield TodoRow(todo["ID"], todo, todo_end)
+            pos = end + len(INDENTED_END)
+        chunk_size = min(chunk_size * 2, DECODE_CHUNK_MAX)
+
+def _find_indented(buffer: mmap.mmap, todo_ids: List[int]) -> List[Dict[str, Any]]:  # each ID is found by bisecting the byte offsets of the file, as IDs grow along it, so a lookup decodes O(log n) to-dos
+    found = []
+    for todo_id in todo_ids:
+        low, high = 0, len(buffer)
+        while low < high:                                                           # finds the first offset from which the next to-do has an ID of at least todo_id
+            middle = (low + high) // 2
+            record = _record_from(buffer, middle)
+            if record is None or record["ID"] >= todo_id:
+                high = middle
+            else:
+                low = middle + 1
+        record = _record_from(buffer, low)
+        if record is not None and record["ID"] == todo_id and TOMBSTONE not in record:
+            found.append(record)
+    return found
+
+def _record_from(buffer: mmap.mmap, pos: int) -> Optional[Dict[str, Any]]:          # the first to-do starting at or after pos
+    start = buffer.find(INDENTED_START, pos)
+    if start < 0:
+        return None
+    end = buffer.find(INDENTED_END, start)
+    return json.loads(buffer[start + 1:end + len(INDENTED_END)])
+
+def _is_resume_position(buffer: mmap.mmap, after: Tuple[int, int], reverse: bool) -> bool:  # rows resume right after the end of a to-do going forward, and at the start of one going backward
+    todo_id, pos = after
+    if reverse:
+        if buffer[pos:pos + len(INDENTED_START)] != INDENTED_START:
+            return False
+        start, end = pos, buffer.find(INDENTED_END, pos)
+    else:
+        if pos < len(INDENTED_END) or buffer[pos - len(INDENTED_END):pos] != INDENTED_END:
+            return False
+        start, end = buffer.rfind(INDENTED_START, 0, pos), pos - len(INDENTED_END)
+    if start < 0 or end < start:
+        return False
+    try:
+        return json.loads(buffer[start + 1:end + len(INDENTED_END)]).get("ID") == todo_id  # the to-do next to the position must still be the one the cursor was printed after
+    except ValueError:
+        return False
+
+def _marker_offsets(chunk: bytes, marker: bytes, base: int) -> List[int]:          # returns base plus the index of every marker in a chunk: the file offsets the rows of the chunk resume from
+    offsets = []
+    index = chunk.find(marker)
+    while index >= 0:
+        offsets.append(base + index)
+        index = chunk.find(marker, index + 1)
+    return offsets
+
+def _last_record(buffer: mmap.mmap) -> Tuple[int, Optional[Dict[str, Any]]]:        # the start offset and contents of the last to-do of a file written by write_todos()
+    start = buffer.rfind(INDENTED_START)
+    end = buffer.rfind(INDENTED_END)
+    if start < 0 or end < start:
+        return len(buffer), None
+    return start, json.loads(buffer[start + 1:end + len(INDENTED_END)])
+
+def snapshot_last_id(db_path: Path) -> Optional[int]:                               # found from the end of the file, without reading the whole list
+    """Return the highest ID given out in a JSON database, or None when it can't be found that way"""
+    try:
+        with db_path.open("rb") as db:
+            if db.read(len(ID_HEAD)) != ID_HEAD:
+                db.seek(0)
+                return 0 if db.read(16).strip() == b"[]" else None                  # an empty list, which has given out no ID yet
+            with mmap.mmap(db.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                _, last = _last_record(buffer)
+    except (OSError, ValueError):
+        return None
+    return None if last is None else last["ID"]
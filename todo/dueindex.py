@@ -0,0 +1,86 @@
+"""This module provides the due-date index used by the due command"""
+# todo/dueindex.py
+
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from todo.database import TOMBSTONE, joined_tags, todo_from_columns
+from todo.sqliteindex import SQLiteIndex
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS dues (
+    id INTEGER PRIMARY KEY,
+    due TEXT NOT NULL,
+    description TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    done INTEGER NOT NULL,
+    tags TEXT
+);
+CREATE INDEX IF NOT EXISTS dues_open ON dues (done, due, id);
+"""                                                                                 # only to-dos with a due date get a row. Due dates are "YYYY-MM-DDTHH:MM" strings, so the B-tree keeps them in time order.
+
+INDEX_FORMAT = 1                                                                    # stored next to the stamp. Indexes of another format are rebuilt.
+
+def index_path(db_path: Path) -> Path:
+    """Return the path of the due-date index kept next to a database"""
+    return db_path.with_name(db_path.name + ".dueidx")
+
+class DueIndex(SQLiteIndex):                                                        # an SQLite file holding the to-dos that have a due date in a B-tree ordered by (done, due, ID), so the next N open ones are a seek and N steps
+    def __init__(self, db_path: Path) -> None:
+        super().__init__(index_path(db_path), SCHEMA, INDEX_FORMAT)
+
+    def rebuild(self, todos: Iterable[Dict[str, Any]], stamp: Optional[Tuple[int, ...]]) -> None:
+        self.drop()
+        with closing(self._connect()) as connection, connection:
+            self._insert(connection, (todo for todo in todos if TOMBSTONE not in todo))
+            self._set_stamp(connection, stamp)
+
+    def add(self, todos: List[Dict[str, Any]], stamp: Optional[Tuple[int, ...]]) -> None:  # takes the to-dos as returned by the database, carrying their new IDs
+        with closing(self._connect()) as connection, connection:
+            self._insert(connection, todos)
+            self._set_stamp(connection, stamp)
+
+    def update(self, todo_ids: List[int], changes: Dict[str, Any], stamp: Optional[Tuple[int, ...]]) -> None:  # IDs without a row have no due date and are skipped by the WHERE clause
+        with closing(self._connect()) as connection, connection:
+            for key, column in (("Done", "done"), ("Priority", "priority"), ("Due", "due")):
+                if key in changes:
+                    connection.executemany(
+                        f"UPDATE dues SET {column} = ? WHERE id = ?",
+                        ((changes[key], todo_id) for todo_id in todo_ids),
+                    )
+            self._set_stamp(connection, stamp)
+
+    def remove(self, todo_ids: List[int], stamp: Optional[Tuple[int, ...]]) -> None:
+        with closing(self._connect()) as connection, connection:
+            connection.executemany("DELETE FROM dues WHERE id = ?", ((todo_id,) for todo_id in set(todo_ids)))
+            self._set_stamp(connection, stamp)
+
+    def clear(self, stamp: Optional[Tuple[int, ...]]) -> None:
+        with closing(self._connect()) as connection, connection:
+            connection.execute("DELETE FROM dues")
+            self._set_stamp(connection, stamp)
+
+    def rows(self, now: str, overdue: bool = False, limit: Optional[int] = None) -> List[Tuple[int, Dict[str, Any]]]:
+        """Return the (ID, to-do) pairs of the open to-dos due from now on, or before now with overdue set, earliest first"""
+        with closing(self._connect()) as connection:
+            rows = connection.execute(                                              # a range scan of the dues_open B-tree, which already holds the rows in the order asked for
+                "SELECT id, due, description, priority, tags FROM dues "
+                f"WHERE done = 0 AND due {'<' if overdue else '>='} ? ORDER BY done, due, id LIMIT ?",
+                (now, -1 if limit is None else limit),
+            ).fetchall()
+        return [
+            (todo_id, todo_from_columns(todo_id, description, priority, False, due, tags))
+            for todo_id, due, description, priority, tags in rows
+        ]
+
+    def _insert(self, connection: sqlite3.Connection, todos: Iterable[Dict[str, Any]]) -> None:
+        connection.executemany(
+            "INSERT INTO dues (id, due, description, priority, done, tags) VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                (todo["ID"], todo["Due"], todo["Description"], todo["Priority"], todo["Done"], joined_tags(todo))
+                for todo in todos if todo.get("Due") is not None
+            ),
+        )
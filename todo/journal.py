@@ -0,0 +1,289 @@
+"""This module provides the append-only journal storage backend"""
+# todo/journal.py
+
+import json
+import os
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from todo import DB_READ_ERROR, DB_WRITE_ERROR, SUCCESS, trace
+from todo.database import (
+    CountResponse, DatabaseHandler, DBResponse, TodoRow, apply_counted, apply_op, compact, iter_list, last_id, live_todos, number_todos,
+    pick_todos, slot_index, snapshot_last_id, stat_stamp, store_cache, with_id, write_json,
+)
+from todo.stats import Counters, count_in, count_todos, store_counts
+
+COMPACT_MIN_BYTES = 64 * 1024                                                       # the journal is never compacted while it is smaller than this
+COMPACT_RATIO = 0.5                                                                 # ... or while it is smaller than this fraction of the JSON snapshot
+
+def journal_path(db_path: Path) -> Path:
+    """Return the path of the journal kept next to a JSON snapshot"""
+    return db_path.with_name(db_path.name + ".journal")
+
+class JournalDatabaseHandler(DatabaseHandler):                                      # stores the to-do list as the usual JSON snapshot plus a journal of JSON lines, one line per mutation
+    def __init__(
+        self,
+        db_path: Path,
+        compact_min_bytes: int = COMPACT_MIN_BYTES,
+        compact_ratio: float = COMPACT_RATIO,
+    ) -> None:
+        super().__init__(db_path)
+        self._journal_path = journal_path(db_path)
+        self._compact_min_bytes = compact_min_bytes
+        self._compact_ratio = compact_ratio
+
+    def read_todos(self) -> DBResponse:                                             # loads the snapshot and replays every journal record on top of it
+        read = super().read_todos()
+        if read.error:
+            return read
+        with trace.span("journal.replay") as span:
+            try:
+                records = self._read_journal()
+            except OSError:
+                return DBResponse([], DB_READ_ERROR)
+            span.add(records=len(records))
+            todo_list = read.todo_list
+            slots = slot_index(todo_list)
+            for record in records:
+                apply_op(todo_list, record, slots)
+            return DBResponse(todo_list, SUCCESS)
+
+    def iter_todos(
+        self,
+        reverse: bool = False,
+        offset: int = 0,
+        after: Optional[Tuple[int, int]] = None,
+        stream: bool = False,
+    ) -> Iterator[TodoRow]:
+        try:
+            pending = self._read_journal()
+        except OSError:
+            return
+        if not pending:                                                             # right after a compaction the snapshot can be streamed like a plain JSON database
+            yield from super().iter_todos(reverse, offset, after, stream)
+            return
+        yield from iter_list(self.read_todos().todo_list, reverse, offset, after)
+
+    def get_todos(self, todo_ids: List[int]) -> DBResponse:
+        try:
+            pending = self._read_journal()
+        except OSError:
+            return DBResponse([], DB_READ_ERROR)
+        if not pending:                                                             # the snapshot alone holds every to-do, so it can be bisected like a plain JSON database
+            return super().get_todos(todo_ids)
+        read = self.read_todos()
+        if read.error:
+            return read
+        return DBResponse(pick_todos(read.todo_list, todo_ids), SUCCESS)
+
+    def write_todos(
+        self, todo_list: List[Dict[str, Any]], counters: Optional[Counters] = None
+    ) -> DBResponse:                                                                # writing the whole list is a compaction: a fresh snapshot replaces the old one and the journal is dropped
+        todo_list = compact(number_todos(todo_list))
+        try:
+            stamp = write_json(self._db_path, todo_list)                            # the snapshot is swapped in atomically, so a crash leaves either the old or the new one
+            self._journal_path.unlink(missing_ok=True)
+        except OSError:
+            return DBResponse(todo_list, DB_WRITE_ERROR)
+        store_cache(self._db_path, stamp, todo_list)                                # the cache holds the snapshot, on top of which later journal records are replayed
+        store_counts(self._db_path, stamp, counters if counters is not None else count_todos(live_todos(todo_list)))
+        return DBResponse(todo_list, SUCCESS)
+
+    def read_counts(self) -> Optional[Counters]:                                    # the final record of every append carries the counters, so they are read from the end of the journal
+        return self._tail()[1]
+
+    def write_counts(self, counters: Counters) -> int:
+        try:
+            pending = self._read_journal()
+        except OSError:
+            return DB_READ_ERROR
+        if pending:                                                                 # a record can't be rewritten in place, so the journal is folded into a snapshot, which is counted anew
+            return self.compact().error
+        return super().write_counts(counters)
+
+    def stamp(self) -> Optional[Tuple[int, ...]]:                                   # appending to the journal leaves the snapshot untouched, so both files make up the stamp
+        snapshot = stat_stamp(self._db_path)
+        if snapshot is None:
+            return None
+        return snapshot + (stat_stamp(self._journal_path) or ())
+
+    def commit(self, ops: List[Dict[str, Any]]) -> List[DBResponse]:                # the records of a whole group of mutations are appended to the journal with one write
+        highest, counters = self._tail() if all(op["op"] == "add" for op in ops) else (None, None)
+        if highest is not None and counters is not None:                            # adding needs no read at all: the new to-dos take the IDs after the highest one and are appended to the journal
+            added = []
+            for op in ops:
+                added.append([with_id(todo, todo_id) for todo_id, todo in enumerate(op["todos"], highest + 1)])
+                highest += len(op["todos"])
+                count_in(counters, added[-1])
+            error = self._append(ops, counters, last=highest)
+            return [DBResponse(todos, error) for todos in added]
+        read = self.read_todos()                                                    # the current list is still needed to validate the IDs and to report the changed to-dos
+        if read.error:
+            return [DBResponse(op.get("todos", []), read.error) for op in ops]
+        todo_list = read.todo_list
+        slots = slot_index(todo_list)
+        counters = self.read_counts()
+        if counters is None:                                                        # the stored counters are gone or out of date, and the list is at hand anyway
+            counters = count_todos(live_todos(todo_list))
+        responses = [apply_counted(todo_list, op, slots, counters) for op in ops]
+        applied = [op for op, response in zip(ops, responses) if not response.error]
+        if not applied:
+            return responses
+        if any(op["op"] == "clear" for op in applied):                              # clearing starts a fresh snapshot instead of journaling every later change
+            error = self.write_todos(todo_list, counters).error
+        else:
+            error = self._append(applied, counters, todo_list)
+        return [response if response.error else response._replace(error=error) for response in responses]
+
+    def persist(
+        self, ops: List[Dict[str, Any]], todo_list: List[Dict[str, Any]], counters: Optional[Counters] = None
+    ) -> int:                                                                       # mutations the daemon already validated are appended without reading the database back
+        if counters is None:
+            counters = count_todos(live_todos(todo_list))
+        if any(op["op"] == "clear" for op in ops):
+            return self.write_todos(todo_list, counters).error
+        return self._append(ops, counters, todo_list)
+
+    def import_todos(self, chunks: Iterable[List[Dict[str, Any]]]) -> CountResponse:  # the journal is folded into the snapshot, which the new to-dos are then streamed after
+        try:
+            pending = self._read_journal()
+        except OSError:
+            return CountResponse(0, DB_READ_ERROR)
+        if pending:
+            error = self.compact().error
+            if error:
+                return CountResponse(0, error)
+        imported = super().import_todos(chunks)
+        if imported.count:
+            self._journal_path.unlink(missing_ok=True)                              # a header naming the replaced snapshot
+        return imported
+
+    def compact(self) -> DBResponse:
+        """Fold the journal into a new JSON snapshot"""
+        read = self.read_todos()
+        if read.error:
+            return read
+        return self.write_todos(read.todo_list)
+
+    def _read_journal(self) -> List[Dict[str, Any]]:                                # the records that apply to the current snapshot
+        try:
+            with self._journal_path.open("r") as journal:
+                lines = journal.read().split("\n")
+        except FileNotFoundError:
+            return []
+        if not lines or not lines[0]:
+            return []
+        try:
+            base = json.loads(lines[0])
+        except json.JSONDecodeError:                                                # a crash while the header itself was being written
+            return []
+        if not self._is_current(base):                                              # the journal belongs to an older snapshot: a compaction replaced the snapshot but crashed before deleting the journal
+            return []
+        records = []
+        for line in lines[1:]:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:                                            # a torn final line left by a crash in the middle of an append, or the empty string after the last newline
+                break
+        return records
+
+    def _snapshot_id(self) -> Dict[str, Any]:                                       # identifies the snapshot a journal applies to
+        stat = self._db_path.stat()
+        return {"op": "base", "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def _is_current(self, base: Any) -> bool:
+        return isinstance(base, dict) and base == self._snapshot_id()
+
+    def _tail(self) -> Tuple[Optional[int], Optional[Counters]]:                    # the highest ID given out and the counters, read from the end of the journal, or from the snapshot when the journal holds no record. None when only a full replay can tell.
+        try:
+            with self._journal_path.open("rb") as journal:
+                header = journal.readline()
+                try:
+                    base = json.loads(header)
+                except json.JSONDecodeError:
+                    base = None
+                if not self._is_current(base):                                      # a stale journal is ignored, and truncated before the next append
+                    return self._snapshot_tail()
+                line = _last_line(journal, journal.tell())
+        except FileNotFoundError:
+            return self._snapshot_tail()
+        except OSError:
+            return None, None
+        if line is None:
+            return self._snapshot_tail()
+        try:
+            record = json.loads(line)                                               # the final record of every append carries the highest ID given out so far and the counters after it
+        except json.JSONDecodeError:
+            return None, None
+        return record["last"], {int(priority): counter for priority, counter in record["counts"].items()}
+
+    def _snapshot_tail(self) -> Tuple[Optional[int], Optional[Counters]]:
+        return snapshot_last_id(self._db_path), super().read_counts()
+
+    def _append(
+        self,
+        records: List[Dict[str, Any]],
+        counters: Counters,
+        todo_list: Optional[List[Dict[str, Any]]] = None,
+        last: Optional[int] = None,
+    ) -> int:                                                                       # takes either the whole resulting list or the highest ID given out, and the counters after the records
+        final = dict(records[-1], last=last_id(todo_list) if last is None else last, counts=counters)
+        records = records[:-1] + [final]
+        try:
+            self._prepare_journal()
+            with self._journal_path.open("a") as journal:
+                lines = "".join(json.dumps(record) + "\n" for record in records)
+                if journal.tell() == 0:                                             # a new journal starts with a header naming its snapshot
+                    lines = json.dumps(self._snapshot_id()) + "\n" + lines
+                with trace.span("journal.append") as span:
+                    span.add(records=len(records), bytes_written=journal.write(lines))
+                journal_size = journal.tell()
+        except OSError:
+            return DB_WRITE_ERROR
+        if self._needs_compaction(journal_size):
+            if todo_list is None:
+                return self.compact().error
+            return self.write_todos(todo_list, counters).error                      # the caller already holds the up-to-date list, so it is reused instead of replaying the journal again
+        return SUCCESS
+
+    def _prepare_journal(self) -> None:                                             # makes sure the next record lands on a fresh line of a journal that matches the snapshot
+        try:
+            with self._journal_path.open("rb+") as journal:
+                header = journal.readline()
+                try:
+                    base = json.loads(header)
+                except json.JSONDecodeError:
+                    base = None
+                if not self._is_current(base):                                      # records appended after the header of an old snapshot would be ignored on replay
+                    journal.truncate(0)
+                    return
+                size = journal.seek(0, os.SEEK_END)
+                journal.seek(max(size - 4096, 0))
+                tail = journal.read()
+                if not tail.endswith(b"\n"):                                        # drops a torn record so that it can't swallow the next one
+                    journal.truncate(size - len(tail) + tail.rfind(b"\n") + 1)
+        except FileNotFoundError:
+            pass
+
+    def _needs_compaction(self, journal_size: int) -> bool:
+        if journal_size < self._compact_min_bytes:
+            return False
+        try:
+            snapshot_size = self._db_path.stat().st_size
+        except OSError:
+            return True
+        return journal_size >= snapshot_size * self._compact_ratio
+
+def _last_line(journal: BinaryIO, start: int) -> Optional[bytes]:                   # the last complete line after start, read backwards in growing blocks
+    end = journal.seek(0, os.SEEK_END)
+    block = 4096
+    while True:
+        journal.seek(max(end - block, start))
+        tail = journal.read()
+        last_newline = tail.rfind(b"\n")
+        if last_newline < 0 and end - block <= start:                               # nothing but a torn record follows the header
+            return None
+        previous = tail.rfind(b"\n", 0, last_newline) if last_newline >= 0 else -1
+        if previous >= 0 or end - block <= start:
+            return tail[previous + 1:last_newline]
+        block *= 2
@@ -0,0 +1,62 @@
+"""This module runs one search over the shards of every named to-do list"""
+# todo/lists.py
+
+import heapq
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from todo.query import Node, Text, compile_filter, compile_query
+
+if TYPE_CHECKING:
+    from todo.client import RemoteTodoer
+    from todo.todo import Todoer
+
+PARALLEL_MIN_WORKERS = 2                                                            # with fewer lists or CPUs than this, the lists are searched in this process, without starting a pool
+
+ListRow = Tuple[int, Dict[str, Any], str]                                           # (ID, to-do, name of the list holding it)
+
+def search(
+    todoer: Union["Todoer", "RemoteTodoer"], node: Node, archive_of: Optional[Path] = None
+) -> List[Tuple[int, Dict[str, Any]]]:                                              # archive_of is the database whose archived to-dos are searched too
+    """Return the (ID, to-do) pairs of one list matched by a query"""
+    if isinstance(node, Text):                                                      # a text-only search is answered by the text index, which returns the to-dos themselves
+        rows = todoer.search_text(node.text, node.whole_words)
+    else:
+        rows = todoer.query(compile_query(node))                                    # the query is compiled once into a plan over the bitmap indexes of Priority, Done and the tags
+    if archive_of is None:
+        return rows
+    from todo.archive import Archive
+    matches = compile_filter(node)                                                  # the archive has no indexes, so its to-dos are streamed through the query one at a time
+    archived = ((todo["ID"], todo) for todo in Archive(archive_of).iter_todos() if matches(todo))
+    return list(heapq.merge(rows, archived, key=lambda row: row[0]))
+
+def search_lists(
+    lists: Dict[str, Tuple[Path, str]], node: Node, workers: Optional[int] = None, include_archived: bool = False
+) -> Iterator[ListRow]:
+    """Yield the rows of every list matched by a query, one list after the other"""
+    jobs = [(db_path, backend, node, include_archived) for db_path, backend in lists.values()]
+    workers = min(len(jobs), workers or os.cpu_count() or 1)
+    if workers < PARALLEL_MIN_WORKERS:
+        yield from _rows(lists, map(_search_shard, jobs))
+        return
+    from concurrent.futures import ProcessPoolExecutor                              # only --all-lists needs it
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from _rows(lists, pool.map(_search_shard, jobs))                      # every shard is searched with its own indexes at the same time; results still come back in list order
+
+def _rows(lists: Dict[str, Tuple[Path, str]], results: Iterable[List[Tuple[int, Dict[str, Any]]]]) -> Iterator[ListRow]:
+    for name, rows in zip(lists, results):
+        for todo_id, todo in rows:
+            yield todo_id, todo, name
+
+def _search_shard(job: Tuple[Path, str, Node, bool]) -> List[Tuple[int, Dict[str, Any]]]:  # runs in a worker process, so it takes and returns only picklable values
+    db_path, backend, node, include_archived = job
+    if not db_path.exists():                                                        # a list whose file was deleted matches nothing
+        return []
+    from todo.client import RemoteTodoer, open_todoer
+    todoer = open_todoer(db_path, backend)
+    try:
+        return [(todo_id, todo) for todo_id, todo in search(todoer, node, db_path if include_archived else None)]
+    finally:
+        if isinstance(todoer, RemoteTodoer):
+            todoer.close()
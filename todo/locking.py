@@ -0,0 +1,156 @@
+"""This module serializes writers of a database and commits queued mutations together"""
+# todo/locking.py
+
+import json
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from todo import DB_WRITE_ERROR, trace
+from todo.database import DBResponse
+
+try:
+    import fcntl
+except ImportError:                                                                 # no advisory locks on Windows: every writer commits on its own, as before
+    fcntl = None
+
+Commit = Callable[[List[Dict[str, Any]]], List[DBResponse]]                         # applies a group of mutations to the database, one response per mutation
+
+def lock_path(db_path: Path) -> Path:
+    """Return the path of the lock file kept next to a database"""
+    return db_path.with_name(db_path.name + ".lock")
+
+def queue_path(db_path: Path) -> Path:
+    """Return the directory where waiting writers leave their mutations"""
+    return db_path.with_name(db_path.name + ".queue")
+
+@contextmanager
+def exclusive_lock(db_path: Path) -> Iterator[None]:                                # for writers that commit their own groups, such as the todo serve daemon
+    """Hold the lock that GroupCommit writers of the same database take"""
+    if fcntl is None:
+        yield
+        return
+    with lock_path(db_path).open("a") as lock_file:
+        with trace.span("lock.wait"):
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
+
+@contextmanager
+def try_exclusive_lock(db_path: Path) -> Iterator[bool]:                            # for work that can be left to the next writer, such as finishing an interrupted group of in-place writes
+    """Hold the lock of exclusive_lock() if no other writer does, yielding whether it was taken"""
+    if fcntl is None:
+        yield True
+        return
+    try:
+        lock_file = lock_path(db_path).open("a")
+    except OSError:
+        yield False
+        return
+    with lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        except OSError:                                                             # file systems without flock() support get no locking
+            pass
+        yield True
+
+class GroupCommit:                                                                  # one writer at a time holds an flock() on the lock file. Writers that find it taken leave their mutation in the queue directory and wait,
+    def __init__(self, db_path: Path) -> None:                                      # and whoever gets the lock next commits every queued mutation in one read-modify-write and hands each writer its response.
+        self._lock_path = lock_path(db_path)
+        self._queue_path = queue_path(db_path)
+
+    def submit(self, op: Dict[str, Any], commit: Commit) -> DBResponse:
+        """Commit a mutation, together with any mutations queued by other writers"""
+        if fcntl is None:
+            return commit([op])[0]
+        try:
+            lock_file = self._lock_path.open("a")
+        except OSError:
+            return DBResponse([], DB_WRITE_ERROR)
+        with lock_file:                                                             # closing the file releases the lock
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                pass
+            except OSError:                                                         # file systems without flock() support get no locking
+                return commit([op])[0]
+            else:
+                return self._lead(commit, op)                                       # nobody else is writing, so the mutation needs no queue file
+            request = self._enqueue(op)
+            with trace.span("lock.wait"):
+                fcntl.flock(lock_file, fcntl.LOCK_EX)                               # waits for the writer holding the lock, which may commit this mutation too
+            if request is None:                                                     # the queue wasn't writable, so this writer commits on its own
+                return self._lead(commit, op)
+            result = _read_result(request)
+            if result is not None:
+                return result
+            if request.exists():                                                    # nobody picked the mutation up, so this writer commits it along with whatever else is queued
+                return self._lead(commit, None, request)
+            request.with_suffix(".claimed").unlink(missing_ok=True)
+            return DBResponse([], DB_WRITE_ERROR)                                   # the writer that picked it up crashed, so whether it was committed is unknown
+
+    def _enqueue(self, op: Dict[str, Any]) -> Optional[Path]:                       # queue files are named by arrival time, so a group commits its mutations in the order they were submitted
+        request = self._queue_path/f"{time.time_ns():020d}-{os.getpid()}.op"
+        tmp_path = request.with_suffix(".tmp")
+        try:
+            self._queue_path.mkdir(exist_ok=True)
+            tmp_path.write_text(json.dumps(op))
+            os.replace(tmp_path, request)                                           # the leader never sees a half-written mutation
+        except OSError:
+            tmp_path.unlink(missing_ok=True)
+            return None
+        return request
+
+    def _lead(
+        self, commit: Commit, op: Optional[Dict[str, Any]], request: Optional[Path] = None
+    ) -> DBResponse:                                                                # commits the queued mutations followed by op, which is None when this writer's own mutation is among the queued ones
+        queued = self._claim()
+        ops = [queued_op for _, queued_op in queued]
+        if op is not None:
+            ops.append(op)
+        responses = commit(ops)
+        own = responses[-1] if op is not None else DBResponse([], DB_WRITE_ERROR)
+        for (claimed, _), response in zip(queued, responses):
+            if request is not None and claimed.stem == request.stem:
+                own = response
+            else:
+                _write_result(claimed.with_suffix(".result"), response)
+            claimed.unlink(missing_ok=True)
+        return own
+
+    def _claim(self) -> List[Tuple[Path, Dict[str, Any]]]:                          # renames every queued mutation, so a crash of this writer can't have them committed twice
+        try:
+            names = sorted(entry.name for entry in os.scandir(self._queue_path) if entry.name.endswith(".op"))
+        except FileNotFoundError:
+            return []
+        claimed = []
+        for name in names:
+            request = self._queue_path/name
+            target = request.with_suffix(".claimed")
+            try:
+                os.replace(request, target)
+                claimed.append((target, json.loads(target.read_text())))
+            except (OSError, ValueError):
+                target.unlink(missing_ok=True)
+        return claimed
+
+def _write_result(path: Path, response: DBResponse) -> None:
+    tmp_path = path.with_suffix(".tmp")
+    try:
+        tmp_path.write_text(json.dumps({"todo_list": response.todo_list, "error": response.error}))
+        os.replace(tmp_path, path)
+    except OSError:                                                                 # the waiting writer then reports an unknown outcome
+        tmp_path.unlink(missing_ok=True)
+
+def _read_result(request: Path) -> Optional[DBResponse]:
+    path = request.with_suffix(".result")
+    try:
+        result = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+    path.unlink(missing_ok=True)
+    return DBResponse(result["todo_list"], result["error"])
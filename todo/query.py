@@ -0,0 +1,251 @@
+"""This module compiles the query language of the search command"""
+# todo/query.py
+
+import operator
+import re
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+from todo.bitmaps import Bitmaps, bitmap_from_ids
+from todo.todo import TAG_RE, parse_tag
+
+class QueryError(ValueError):                                                       # a query that doesn't parse, with a message saying where
+    pass
+
+class Compare(NamedTuple):                                                          # priority, id or done compared with a number or a truth value
+    field: str
+    op: str
+    value: Any
+
+class Text(NamedTuple):                                                             # text~"..." matches any part of the description, words~"..." whole words
+    text: str
+    whole_words: bool = False
+
+class Tag(NamedTuple):                                                              # tag="ops" matches the to-dos carrying that tag
+    name: str
+
+class Not(NamedTuple):
+    node: "Node"
+
+class And(NamedTuple):
+    nodes: List["Node"]
+
+class Or(NamedTuple):
+    nodes: List["Node"]
+
+Node = Union[Compare, Text, Tag, Not, And, Or]
+Token = Tuple[str, str]                                                             # the kind of a token and its text
+TextSearch = Callable[[str, bool], Iterable[int]]                                   # returns the IDs of the to-dos whose description matches, see todo.Todoer.search_text()
+Plan = Callable[[Bitmaps, TextSearch], int]                                         # a compiled query: returns the bitmap of the matching to-dos
+Predicate = Callable[[Dict[str, Any]], bool]                                        # a query compiled for one to-do at a time
+
+OPERATORS = {"<": operator.lt, "<=": operator.le, "=": operator.eq, "!=": operator.ne, ">": operator.gt, ">=": operator.ge}
+TOKEN_RE = re.compile(r"""
+    \s*(?:
+        (?P<number>-?\d+)
+      | (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+      | (?P<op><=|>=|!=|==|=|<|>|~)
+      | (?P<paren>[()])
+      | (?P<word>[A-Za-z_]+)
+    )""", re.VERBOSE)
+TAG_VALUE_RE = re.compile(rf"\s*(?P<tag>{TAG_RE.pattern})")                         # an unquoted tag after tag= or tag!=, such as sprint-42 or team/db, which the word token would cut short
+
+def parse(query: str) -> Node:
+    """Return the syntax tree of a query such as 'priority<=2 and not done and text~"deploy"'"""
+    return _Parser(_tokenize(query)).parse()
+
+def tag_filter(values: List[str]) -> Node:                                          # the --tag options of the list command: every value must match, "a,b" matches either tag and "!a" those without it
+    """Return the syntax tree of the tag filters of the list command, such as ["ops", "!blocked"]"""
+    nodes: List[Node] = []
+    for value in values:
+        alternatives: List[Node] = []
+        for name in value.split(","):
+            name = name.strip()
+            negated = name.startswith("!")
+            try:
+                tag = Tag(parse_tag(name[1:] if negated else name))
+            except ValueError as error:
+                raise QueryError(str(error)) from None
+            alternatives.append(Not(tag) if negated else tag)
+        nodes.append(alternatives[0] if len(alternatives) == 1 else Or(alternatives))
+    if not nodes:
+        raise QueryError("no tag was given")
+    return nodes[0] if len(nodes) == 1 else And(nodes)
+
+def compile_query(node: Node) -> Plan:                                              # the tree is turned into nested closures once, so running the plan does no parsing or dispatch on node types
+    """Return the plan evaluating a query over bitmaps"""
+    if isinstance(node, Text):
+        return lambda bitmaps, search: bitmaps.live & bitmap_from_ids(search(node.text, node.whole_words))
+    if isinstance(node, Tag):
+        return lambda bitmaps, search: bitmaps.tag(node.name)
+    if isinstance(node, Not):
+        inner = compile_query(node.node)
+        return lambda bitmaps, search: bitmaps.live & ~inner(bitmaps, search)
+    if isinstance(node, Or):
+        parts = [compile_query(part) for part in node.nodes]
+        return lambda bitmaps, search: _union(part(bitmaps, search) for part in parts)
+    if isinstance(node, And):
+        parts = [compile_query(part) for part in sorted(node.nodes, key=lambda part: isinstance(part, Text))]  # text searches go last, so they are skipped once the bitmaps leave nothing to match
+        def intersection(bitmaps: Bitmaps, search: TextSearch) -> int:
+            result = bitmaps.live
+            for part in parts:
+                if not result:
+                    break
+                result &= part(bitmaps, search)
+            return result
+        return intersection
+    compare = OPERATORS[node.op]
+    value = node.value
+    if node.field == "done":
+        return lambda bitmaps, search: bitmaps.done if value else bitmaps.live & ~bitmaps.done
+    if node.field == "priority":
+        return lambda bitmaps, search: _union(
+            bitmap for priority, bitmap in bitmaps.priorities.items() if compare(priority, value)
+        )
+    return lambda bitmaps, search: bitmaps.live & _id_range(node.op, min(value, bitmaps.live.bit_length()))  # no ID reaches bit_length(), so a larger bound selects the same to-dos with a mask no longer than the bitmap
+
+def compile_filter(node: Node) -> Predicate:                                        # for to-dos outside the bitmaps, such as those streamed from the archive
+    """Return a function telling whether a single to-do matches a query"""
+    if isinstance(node, Text):
+        if node.whole_words:                                                        # the same matches as the text index gives
+            from todo.textindex import words
+            wanted = words(node.text)
+            return lambda todo: wanted <= words(todo["Description"])
+        text = node.text.lower()
+        return lambda todo: text in todo["Description"].lower()
+    if isinstance(node, Tag):
+        return lambda todo: node.name in todo.get("Tags", ())
+    if isinstance(node, Not):
+        inner = compile_filter(node.node)
+        return lambda todo: not inner(todo)
+    if isinstance(node, Or):
+        parts = [compile_filter(part) for part in node.nodes]
+        return lambda todo: any(part(todo) for part in parts)
+    if isinstance(node, And):
+        parts = [compile_filter(part) for part in node.nodes]
+        return lambda todo: all(part(todo) for part in parts)
+    compare = OPERATORS[node.op]
+    value = node.value
+    key = {"priority": "Priority", "id": "ID", "done": "Done"}[node.field]
+    return lambda todo: compare(todo[key], value)
+
+def _union(bitmaps: Iterable[int]) -> int:
+    result = 0
+    for bitmap in bitmaps:
+        result |= bitmap
+    return result
+
+def _id_range(op: str, value: int) -> int:                                          # a mask over the IDs, to be intersected with the bitmap of existing to-dos. Negative ints have every higher bit set.
+    if op == "=":
+        return 1 << value if value >= 0 else 0
+    if op == "!=":
+        return ~(1 << value) if value >= 0 else -1
+    if op == "<":
+        return (1 << max(value, 0)) - 1
+    if op == "<=":
+        return (1 << max(value + 1, 0)) - 1
+    if op == ">":
+        return -1 << max(value + 1, 0)
+    return -1 << max(value, 0)
+
+def _tokenize(query: str) -> List[Token]:
+    tokens = []
+    position = 0
+    query = query.rstrip()
+    while position < len(query):
+        match = None
+        if tokens[-2:] in ([("word", "tag"), ("op", "=")], [("word", "tag"), ("op", "!=")]):
+            match = TAG_VALUE_RE.match(query, position)
+        match = match or TOKEN_RE.match(query, position)
+        if match is None:
+            raise QueryError(f"unexpected {query[position:].strip()[:10]!r} at position {position}")
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == "string":
+            text = re.sub(r"\\(.)", r"\1", text[1:-1])
+        elif kind == "word":
+            text = text.lower()                                                     # keywords and field names ignore case
+        elif kind == "op" and text == "==":
+            text = "="
+        tokens.append((kind, text))
+        position = match.end()
+    return tokens
+
+class _Parser:                                                                      # a recursive-descent parser: "or" binds looser than "and", which binds looser than "not"
+    def __init__(self, tokens: List[Token]) -> None:
+        self._tokens = tokens
+        self._position = 0
+
+    def parse(self) -> Node:
+        if not self._tokens:
+            raise QueryError("the query is empty")
+        node = self._or()
+        if self._position < len(self._tokens):
+            raise QueryError(f"unexpected {self._tokens[self._position][1]!r}")
+        return node
+
+    def _peek(self) -> Token:
+        return self._tokens[self._position] if self._position < len(self._tokens) else ("end", "")
+
+    def _take(self, kind: str, text: Optional[str] = None) -> str:
+        token_kind, token_text = self._peek()
+        if token_kind != kind or (text is not None and token_text != text):
+            wanted = text or kind
+            found = token_text or "the end of the query"
+            raise QueryError(f"expected {wanted} but found {found!r}")
+        self._position += 1
+        return token_text
+
+    def _or(self) -> Node:
+        nodes = [self._and()]
+        while self._peek() == ("word", "or"):
+            self._position += 1
+            nodes.append(self._and())
+        return nodes[0] if len(nodes) == 1 else Or(nodes)
+
+    def _and(self) -> Node:
+        nodes = [self._not()]
+        while self._peek() == ("word", "and"):
+            self._position += 1
+            nodes.append(self._not())
+        return nodes[0] if len(nodes) == 1 else And(nodes)
+
+    def _not(self) -> Node:
+        if self._peek() == ("word", "not"):
+            self._position += 1
+            return Not(self._not())
+        return self._atom()
+
+    def _atom(self) -> Node:
+        if self._peek() == ("paren", "("):
+            self._position += 1
+            node = self._or()
+            self._take("paren", ")")
+            return node
+        field = self._take("word")
+        if field == "done":
+            if self._peek() != ("op", "="):                                         # a bare "done"
+                return Compare("done", "=", True)
+            self._position += 1
+            value = self._take("word")
+            if value not in ("true", "false"):
+                raise QueryError(f"done compares with true or false, not {value!r}")
+            return Compare("done", "=", value == "true")
+        if field == "tag":                                                          # tag="ops" or tag!="blocked"
+            op = self._take("op")
+            if op not in ("=", "!="):
+                raise QueryError(f"tag compares with = or !=, not {op!r}")
+            kind, _ = self._peek()
+            try:
+                tag = Tag(parse_tag(self._take("string" if kind == "string" else "tag")))
+            except ValueError as error:
+                raise QueryError(str(error)) from None
+            return Not(tag) if op == "!=" else tag
+        if field in ("text", "words"):
+            self._take("op", "~")
+            return Text(self._take("string"), whole_words=field == "words")
+        if field in ("priority", "id"):
+            op = self._take("op")
+            if op not in OPERATORS:
+                raise QueryError(f"{field} compares with one of {' '.join(OPERATORS)}, not {op!r}")
+            return Compare(field, op, int(self._take("number")))
+        raise QueryError(f"unknown field {field!r}, expected priority, id, done, tag, text or words")
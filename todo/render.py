@@ -0,0 +1,164 @@
+"""This module renders to-dos for the list, search and sort commands"""
+# todo/render.py
+
+import io
+import json
+import sys
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, TextIO
+
+import typer
+
+from todo import trace
+
+FORMATS = ("table", "json", "jsonl", "csv", "tsv")                                  # every value accepted by the --format option
+BUFFER_SIZE = 64 * 1024                                                             # rendered text is written in blocks of about this many characters
+COLUMNS = (                                                                         # the columns of the table format
+    "ID. ",
+    "| Priority ",
+    "| Done ",
+    "| Description ",
+)
+LIST_COLUMN = "| List       "                                                       # the column added for rows of several lists
+DUE_COLUMN = "| Due               "                                                 # the column added by the due command, wide enough for "2026-11-01T09:00"
+FIELDS = ("ID", "Description", "Priority", "Done", "Due", "Tags")                   # the columns of the csv and tsv formats, the same as the keys "todo import" reads back
+JSON_BATCH_ROWS = 1000                                                              # records given to the json encoder at once
+
+_encode_batch = json.JSONEncoder(separators=(",\n", ": ")).encode                   # the C encoder; a line break can't occur inside a JSON string, so it marks every separator
+
+class BufferedOutput:                                                               # collects rendered text and hands it to typer.echo() in large blocks instead of one call per row
+    def __init__(self, style: Optional[Callable[[str], str]] = None, file: Optional[TextIO] = None) -> None:
+        self._parts: List[str] = []
+        self._size = 0
+        self._style = style
+        self._file = file                                                           # None for standard output
+
+    def write(self, text: str) -> None:
+        self._parts.append(text)
+        self._size += len(text)
+        if self._size >= BUFFER_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._parts:
+            return
+        block = "".join(self._parts)
+        self._parts.clear()
+        self._size = 0
+        typer.echo(self._style(block) if self._style else block, nl=False, file=self._file)
+
+def use_color() -> bool:
+    """Tell whether standard output is a terminal that should get ANSI colors"""
+    return sys.stdout.isatty()
+
+def render_todos(
+    rows: Iterable[Sequence[Any]],
+    output_format: str = "table",
+    color: Optional[bool] = None,
+    file: Optional[TextIO] = None,
+    lists: bool = False,
+    due: bool = False,
+) -> int:
+    """Write (ID, to-do) rows to standard output, or to file, and return how many were written"""
+    if color is None:                                                               # with lists set, the rows are (ID, to-do, list name) and get a List column. With due set they get a Due column.
+        color = use_color() if file is None else False
+    with trace.span("render") as span:                                              # rows are often read lazily, so this includes reading them from the database
+        if output_format == "table":
+            count = _render_table(rows, color, file, lists, due)
+        elif output_format in ("csv", "tsv"):
+            count = _render_csv(rows, "," if output_format == "csv" else "\t", file, lists)
+        else:
+            count = _render_json(rows, output_format == "jsonl", file, lists)
+        span.add(rows=count)
+    return count
+
+def _record(row: Sequence[Any], lists: bool) -> Dict[str, Any]:
+    if lists:
+        return {"List": row[2], "ID": row[0], **row[1]}
+    return {"ID": row[0], **row[1]}
+
+def _render_table(
+    rows: Iterable[Sequence[Any]], color: bool, file: Optional[TextIO], lists: bool = False, due: bool = False
+) -> int:
+    blue = (lambda text: typer.style(text, fg=typer.colors.BLUE)) if color else None
+    headers = "".join(COLUMNS[:1] + ((LIST_COLUMN,) if lists else ()) + COLUMNS[1:3] + ((DUE_COLUMN,) if due else ()) + COLUMNS[3:])
+    title = "\nTo-Do List:\n\n" + headers + "\n"                                    # the header to present the to-do list, followed by the column names
+    typer.echo(typer.style(title, fg=typer.colors.BLUE, bold=True) if color else title, nl=False, file=file)
+    out = BufferedOutput(blue, file)                                                # each block of rows is colored as a whole rather than row by row
+    out.write("-" * len(headers) + "\n")
+    count = 0
+    for row in rows:                                                                # every single to-do gets its own row with appropriate padding and separators
+        todo_id, todo = row[0], row[1]
+        priority, done = todo["Priority"], todo["Done"]
+        list_cell = f"| {row[2]}{(len(LIST_COLUMN) - len(row[2]) - 2) * ' '}" if lists else ""
+        due_cell = f"| {todo.get('Due', '')}{(len(DUE_COLUMN) - len(todo.get('Due', '')) - 2) * ' '}" if due else ""
+        out.write(
+            f"{todo_id}{(len(COLUMNS[0]) - len(str(todo_id))) * ' '}"
+            f"{list_cell}"
+            f"| ({priority}){(len(COLUMNS[1]) - len(str(priority)) - 4) * ' '}"
+            f"| {done}{(len(COLUMNS[2]) - len(str(done)) - 2) * ' '}"
+            f"{due_cell}"
+            f"| {todo['Description']}{_tag_cell(todo)}\n"
+        )
+        count += 1
+    out.write("-" * len(headers) + "\n\n")                                          # a line of dashes with a final line feed visually separates the to-do list from the next command-line prompt
+    out.flush()
+    return count
+
+def _tag_cell(todo: Dict[str, Any]) -> str:                                         # the tags of a to-do follow its description, like #ops #db
+    tags = todo.get("Tags")
+    return "".join(f" #{tag}" for tag in tags) if tags else ""
+
+def _render_json(rows: Iterable[Sequence[Any]], lines: bool, file: Optional[TextIO], lists: bool = False) -> int:
+    out = BufferedOutput(file=file)
+    count = 0
+    if not lines:
+        out.write("[")
+    batch: List[Dict[str, Any]] = []
+    for row in rows:                                                                # the output is written a batch of records at a time, so it is never built in memory
+        batch.append(_record(row, lists))
+        if len(batch) == JSON_BATCH_ROWS:
+            out.write(_json_block(batch, lines, count))
+            count += len(batch)
+            batch = []
+    if batch:
+        out.write(_json_block(batch, lines, count))
+        count += len(batch)
+    if not lines:
+        out.write("\n]\n" if count else "]\n")
+    out.flush()
+    return count
+
+def _json_block(records: List[Dict[str, Any]], lines: bool, written: int) -> str:  # written is the number of records before this block
+    if lines:
+        return _dump_batch(records, "\n") + "\n"
+    return ("\n    " if not written else ",\n    ") + _dump_batch(records, ",\n    ")
+
+def _dump_batch(records: List[Dict[str, Any]], separator: str) -> str:
+    """Return the records as json.dumps() writes them, joined by separator"""
+    text = _encode_batch(records)[1:-1]
+    if text.count("},\n{") != len(records) - 1:                                     # a value holding objects of its own
+        return separator.join(json.dumps(record) for record in records)
+    return text.replace("},\n{", "}\0{").replace(",\n", ", ").replace("}\0{", "}" + separator + "{")  # a raw NUL is always escaped by the encoder too
+
+def _render_csv(rows: Iterable[Sequence[Any]], delimiter: str, file: Optional[TextIO], lists: bool = False) -> int:
+    import csv                                                                      # only the csv and tsv formats need it
+    out = BufferedOutput(file=file)
+    block = io.StringIO()
+    writer = csv.writer(block, delimiter=delimiter, lineterminator="\n")
+    writer.writerow((("List",) if lists else ()) + FIELDS)
+    count = 0
+    for row in rows:
+        todo = row[1]
+        writer.writerow(
+            ((row[2],) if lists else ())
+            + (row[0], todo["Description"], todo["Priority"], todo["Done"], todo.get("Due", ""))  # an empty cell for a to-do without a due date
+            + (" ".join(todo.get("Tags", ())),)                                     # separated by spaces, as "todo import" reads them back
+        )
+        count += 1
+        if block.tell() >= BUFFER_SIZE:
+            out.write(block.getvalue())
+            block.seek(0)
+            block.truncate()
+    out.write(block.getvalue())
+    out.flush()
+    return count
@@ -0,0 +1,200 @@
+"""This module provides the todo serve daemon, which keeps the to-do list in memory"""
+# todo/server.py
+
+import asyncio
+import itertools
+import json
+import signal
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from todo import SUCCESS, __version__
+from todo.client import socket_path
+from todo.database import TOMBSTONE, DBResponse, apply_counted, compact, get_handler, iter_list, live_todos, slot_index
+from todo.locking import exclusive_lock
+from todo.stats import Counters, count_todos
+
+FLUSH_POLICIES = ("always", "interval")                                             # "always" writes every mutation before answering, "interval" batches them every few seconds
+REQUEST_LIMIT = 64 * 1024 * 1024                                                    # the largest request line accepted, big enough for "todo add --from-file" with a long file
+COMPACT_RATIO = 0.25                                                                # the in-memory list is compacted once tombstones take up this share of its slots
+
+class TodoServer:                                                                   # answers the requests of todo.client.RemoteTodoer from an in-memory copy of the to-do list
+    def __init__(
+        self,
+        db_path: Path,
+        backend: str,
+        flush_policy: str = "always",
+        flush_interval: float = 1.0,
+    ) -> None:
+        self._db_path = db_path
+        self._db_handler = get_handler(db_path, backend)
+        self._socket_path = socket_path(db_path)
+        self._flush_policy = flush_policy
+        self._flush_interval = flush_interval
+        self._todo_list: List[Dict[str, Any]] = []
+        self._slots: Dict[int, int] = {}                                            # maps every to-do ID to its slot in _todo_list, kept up to date by apply_op()
+        self._tombstones = 0                                                        # slots of _todo_list holding removed to-dos
+        self._counters: Counters = {}                                               # the counters of _todo_list, kept up to date by apply_counted()
+        self._stamp: Optional[Tuple[int, ...]] = None                               # the database state the in-memory list matches
+        self._pending: List[Dict[str, Any]] = []                                    # mutations applied in memory but not written yet
+
+    def load(self) -> int:
+        """Read the database into memory and return the error code"""
+        stamp = self._db_handler.stamp()
+        read = self._db_handler.read_todos()
+        if read.error:
+            return read.error
+        self._todo_list, self._stamp = read.todo_list, stamp
+        self._slots = slot_index(self._todo_list)
+        self._tombstones = len(self._todo_list) - len(self._slots)
+        self._counters = count_todos(live_todos(self._todo_list))
+        return SUCCESS
+
+    def flush(self) -> int:
+        """Write the pending mutations to the database and return the error code"""
+        if not self._pending:
+            return SUCCESS
+        with exclusive_lock(self._db_path):                                         # the same lock direct writers take, so neither overwrites the other
+            if self._db_handler.stamp() != self._stamp:                             # the database was changed without the daemon: the pending mutations are applied on top of that version
+                pending, self._pending = self._pending, []
+                error = self.load()
+                if error:
+                    return error
+                self._pending = [op for op in pending if not self._apply(op).error]
+            error = self._db_handler.persist(self._pending, self._todo_list, self._counters)
+            if error:
+                return error
+            self._pending = []
+            self._stamp = self._db_handler.stamp()
+        if self._tombstones > len(self._todo_list) * COMPACT_RATIO:                 # runs with the flush, between requests, so the mutations never pay for it
+            self._todo_list = compact(self._todo_list)
+            self._slots = slot_index(self._todo_list)
+            self._tombstones = len(self._todo_list) - len(self._slots)
+        return SUCCESS
+
+    async def serve_until(self, stop: asyncio.Event) -> None:
+        """Answer requests on the socket until stop is set, then flush"""
+        server = await asyncio.start_unix_server(self._handle, path=str(self._socket_path), limit=REQUEST_LIMIT)
+        flusher = asyncio.ensure_future(self._flush_periodically()) if self._flush_policy == "interval" else None
+        try:
+            await stop.wait()
+        finally:
+            server.close()
+            await server.wait_closed()
+            if flusher is not None:
+                flusher.cancel()
+            self.flush()
+            self._socket_path.unlink(missing_ok=True)
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self._flush_interval)
+            if self.flush():                                                        # the mutations stay pending and are tried again at the next interval
+                print(f"Flushing {self._db_path} failed", file=sys.stderr)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:  # one connection per client, answering one JSON line with one JSON line
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    response = {"result": self._dispatch(request["method"], request.get("params", {}))}
+                except (KeyError, TypeError, ValueError) as error:
+                    response = {"error": f"{type(error).__name__}: {error}"}
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _dispatch(self, method: str, params: Dict[str, Any]) -> Any:
+        if method == "ping":
+            return __version__
+        self._refresh()
+        if method == "todos":
+            return live_todos(self._todo_list)
+        if method == "get":
+            return [self._todo_list[self._slots[todo_id]] for todo_id in params["ids"] if todo_id in self._slots]
+        if method == "rows":
+            after = tuple(params["after"]) if params.get("after") else None
+            rows = iter_list(self._todo_list, params.get("reverse", False), params.get("offset", 0), after)
+            return list(itertools.islice(rows, params["count"]))
+        if method == "search":
+            return self._search(params["text"], params.get("whole_words", False))
+        if method == "stats":
+            return self._stats(params.get("verify", False))
+        if method == "commit":
+            return self._commit(params["op"])._asdict()
+        if method == "flush":
+            return self.flush()
+        raise ValueError(f"unknown method {method!r}")
+
+    def _refresh(self) -> None:                                                     # picks up changes made by writers that didn't go through the daemon
+        if self._db_handler.stamp() == self._stamp:
+            return
+        if self._pending:
+            self.flush()
+        else:
+            self.load()
+
+    def _apply(self, op: Dict[str, Any]) -> DBResponse:                             # an O(1) lookup through the slot index for every ID of the mutation
+        response = apply_counted(self._todo_list, op, self._slots, self._counters)
+        if not response.error and op["op"] == "remove":
+            self._tombstones += len(response.todo_list)
+        elif op["op"] == "clear":
+            self._tombstones = len(self._todo_list)
+        return response
+
+    def _commit(self, op: Dict[str, Any]) -> DBResponse:
+        response = self._apply(op)
+        if response.error:
+            return response
+        self._pending.append(op)
+        if self._flush_policy == "always":
+            error = self.flush()
+            if error:                                                               # the in-memory list is put back in line with the database
+                self._pending = []
+                self.load()
+                return response._replace(error=error)
+        return response
+
+    def _stats(self, verify: bool) -> Dict[str, Any]:                               # the counters as [priority, to-dos, done] rows, since JSON object keys can't be ints
+        consistent = True
+        if verify:
+            counters = count_todos(live_todos(self._todo_list))
+            consistent = counters == self._counters
+            self._counters = counters
+        return {
+            "counts": [[priority, todos, done] for priority, (todos, done) in self._counters.items()],
+            "consistent": consistent,
+        }
+
+    def _search(self, text: str, whole_words: bool) -> List[Tuple[int, Dict[str, Any]]]:  # a scan of the in-memory list, which is as fast as the text index without its upkeep
+        todos = (todo for todo in self._todo_list if TOMBSTONE not in todo)
+        if whole_words:
+            from todo.textindex import words
+            needle = words(text)
+            return [(todo["ID"], todo) for todo in todos if needle <= words(todo["Description"])]
+        needle = text.lower()
+        return [(todo["ID"], todo) for todo in todos if needle in todo["Description"].lower()]
+
+def serve(
+    db_path: Path, backend: str, flush_policy: str = "always", flush_interval: float = 1.0
+) -> int:
+    """Run the daemon of a database until it receives SIGINT or SIGTERM"""
+    server = TodoServer(db_path, backend, flush_policy, flush_interval)
+    error = server.load()
+    if error:
+        return error
+    async def main() -> None:
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stop.set)
+        await server.serve_until(stop)
+    asyncio.run(main())
+    return SUCCESS
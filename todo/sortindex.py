@@ -0,0 +1,98 @@
+"""This module provides the sort index used by the sort command"""
+# todo/sortindex.py
+
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from todo.database import TOMBSTONE, joined_tags, todo_from_columns
+from todo.sqliteindex import SQLiteIndex
+from todo.table import SortKeys
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS todos (
+    id INTEGER PRIMARY KEY,
+    description TEXT NOT NULL,
+    folded TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    done INTEGER NOT NULL,
+    due TEXT,
+    tags TEXT
+);
+"""                                                                                 # folded holds the casefolded description, which SQLite compares code point by code point like Python does
+
+INDEX_FORMAT = 1                                                                    # stored next to the stamp. Indexes of another format are rebuilt.
+SORT_INDEX_MIN_ROWS = 10000                                                         # smaller lists are sorted in memory faster than an index is built and queried
+COLUMNS = {"priority": "priority", "done": "done", "description": "folded", "id": "id"}
+
+def index_path(db_path: Path) -> Path:
+    """Return the path of the sort index kept next to a database"""
+    return db_path.with_name(db_path.name + ".sortidx")
+
+def order_by(keys: SortKeys) -> str:
+    """Return the ORDER BY terms of the sort keys, ending with the ID that breaks ties"""
+    terms = [f"{COLUMNS[name]} {'DESC' if descending else 'ASC'}" for name, descending in keys]
+    if "id" not in (name for name, _ in keys):
+        terms.append("id ASC")
+    return ", ".join(terms)
+
+class SortIndex(SQLiteIndex):                                                       # an SQLite file holding one B-tree index per sort order used so far, each kept in order as to-dos are added, changed and removed
+    def __init__(self, db_path: Path) -> None:
+        super().__init__(index_path(db_path), SCHEMA, INDEX_FORMAT)
+
+    def rebuild(self, todos: Iterable[Dict[str, Any]], stamp: Optional[Tuple[int, ...]]) -> None:
+        self.drop()
+        with closing(self._connect()) as connection, connection:
+            self._insert(connection, (todo for todo in todos if TOMBSTONE not in todo))
+            self._set_stamp(connection, stamp)
+
+    def add(self, todos: List[Dict[str, Any]], stamp: Optional[Tuple[int, ...]]) -> None:  # takes the to-dos as returned by the database, carrying their new IDs
+        with closing(self._connect()) as connection, connection:
+            self._insert(connection, todos)                                         # SQLite inserts each one into every order's B-tree in O(log n)
+            self._set_stamp(connection, stamp)
+
+    def update(self, todo_ids: List[int], changes: Dict[str, Any], stamp: Optional[Tuple[int, ...]]) -> None:
+        with closing(self._connect()) as connection, connection:
+            for key, column in (("Done", "done"), ("Priority", "priority")):
+                if key in changes:
+                    connection.executemany(
+                        f"UPDATE todos SET {column} = ? WHERE id = ?",
+                        ((changes[key], todo_id) for todo_id in todo_ids),
+                    )
+            self._set_stamp(connection, stamp)
+
+    def remove(self, todo_ids: List[int], stamp: Optional[Tuple[int, ...]]) -> None:
+        with closing(self._connect()) as connection, connection:
+            connection.executemany("DELETE FROM todos WHERE id = ?", ((todo_id,) for todo_id in set(todo_ids)))
+            self._set_stamp(connection, stamp)
+
+    def clear(self, stamp: Optional[Tuple[int, ...]]) -> None:
+        self.rebuild([], stamp)
+
+    def rows(self, keys: SortKeys, limit: Optional[int] = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Return the (ID, to-do) pairs ordered by keys, or only the first limit of them"""
+        with closing(self._connect()) as connection:
+            self._ensure_order(connection, keys)
+            rows = connection.execute(                                              # walks the B-tree of the order, so a limit reads only that many rows
+                f"SELECT id, description, priority, done, due, tags FROM todos ORDER BY {order_by(keys)} LIMIT ?",
+                (-1 if limit is None else limit,),
+            ).fetchall()
+        return (
+            (row[0], todo_from_columns(*row)) for row in rows
+        )
+
+    def _ensure_order(self, connection: sqlite3.Connection, keys: SortKeys) -> None:  # the first sort in a new order builds its B-tree once; from then on SQLite keeps it up to date
+        name = "order_" + "_".join(f"{name}_{'desc' if descending else 'asc'}" for name, descending in keys)
+        with connection:
+            connection.execute(f"CREATE INDEX IF NOT EXISTS {name} ON todos ({order_by(keys)})")
+
+    def _insert(self, connection: sqlite3.Connection, todos: Iterable[Dict[str, Any]]) -> None:
+        connection.executemany(
+            "INSERT INTO todos (id, description, folded, priority, done, due, tags) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                (todo["ID"], todo["Description"], todo["Description"].casefold(), todo["Priority"], todo["Done"], todo.get("Due"), joined_tags(todo))
+                for todo in todos
+            ),
+        )
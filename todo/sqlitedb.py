@@ -0,0 +1,257 @@
+"""This module provides the SQLite storage backend"""
+# todo/sqlitedb.py
+
+import sqlite3
+from contextlib import closing
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from todo import DB_READ_ERROR, DB_WRITE_ERROR, ID_ERROR, SUCCESS, trace
+from todo.database import TOMBSTONE, CountResponse, DatabaseHandler, DBResponse, TodoRow, joined_tags, last_id, todo_from_columns
+from todo.stats import Counters
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS todos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    description TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    done INTEGER NOT NULL,
+    due TEXT,
+    tags TEXT
+);
+CREATE INDEX IF NOT EXISTS todos_priority ON todos (priority);
+CREATE INDEX IF NOT EXISTS todos_done ON todos (done);
+CREATE TABLE IF NOT EXISTS counts (
+    priority INTEGER PRIMARY KEY,
+    todos INTEGER NOT NULL,
+    done INTEGER NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS counts_insert AFTER INSERT ON todos BEGIN
+    INSERT OR IGNORE INTO counts VALUES (NEW.priority, 0, 0);
+    UPDATE counts SET todos = todos + 1, done = done + NEW.done WHERE priority = NEW.priority;
+END;
+CREATE TRIGGER IF NOT EXISTS counts_delete AFTER DELETE ON todos BEGIN
+    UPDATE counts SET todos = todos - 1, done = done - OLD.done WHERE priority = OLD.priority;
+END;
+CREATE TRIGGER IF NOT EXISTS counts_update AFTER UPDATE OF priority, done ON todos BEGIN
+    UPDATE counts SET todos = todos - 1, done = done - OLD.done WHERE priority = OLD.priority;
+    INSERT OR IGNORE INTO counts VALUES (NEW.priority, 0, 0);
+    UPDATE counts SET todos = todos + 1, done = done + NEW.done WHERE priority = NEW.priority;
+END;
+"""                                                                                 # the rowid is the to-do ID. AUTOINCREMENT keeps SQLite from giving the ID of a removed last row out again. The triggers keep one row of counters per priority in step with every change, inside the same transaction.
+
+SCHEMA_VERSION = 1                                                                  # stored in PRAGMA user_version once the schema exists, so later connections skip creating it
+
+ROWS_PER_QUERY = 500                                                                # stays below SQLite's limit on the number of bound parameters
+
+COLUMNS = {"Description": "description", "Priority": "priority", "Done": "done", "Due": "due"}  # maps to-do dictionary keys to table columns. Tags aren't changed by any mutation, so they have no entry.
+
+Row = Tuple[int, str, int, int, Optional[str], Optional[str]]                       # id, description, priority, done, due, tags
+
+class SQLiteDatabaseHandler(DatabaseHandler):                                       # stores one to-do per row, so single-item changes touch a single row instead of rewriting the whole list
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self._db_path)
+        if connection.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:  # a new database
+            connection.executescript(f"BEGIN; {SCHEMA} PRAGMA user_version = {SCHEMA_VERSION}; COMMIT;")
+        return connection
+
+    @trace.traced("db.read")
+    def read_todos(self) -> DBResponse:
+        try:
+            with closing(self._connect()) as connection:
+                rows = connection.execute(
+                    "SELECT id, description, priority, done, due, tags FROM todos ORDER BY id"
+                ).fetchall()
+                highest = _highest_id(connection)
+        except sqlite3.Error:
+            return DBResponse([], DB_READ_ERROR)
+        trace.add(rows=len(rows))
+        todo_list = [todo_from_columns(*row) for row in rows]
+        if highest > last_id(todo_list):                                            # the last to-dos were removed: a tombstone carries their ID over, for example to a migrated JSON database
+            todo_list.append({"ID": highest, TOMBSTONE: True})
+        return DBResponse(todo_list, SUCCESS)
+
+    def iter_todos(
+        self,
+        reverse: bool = False,
+        offset: int = 0,
+        after: Optional[Tuple[int, int]] = None,
+        stream: bool = False,
+    ) -> Iterator[TodoRow]:                                                         # to-do IDs are rowids, so a cursor continues with an index seek. Rows always stream, so stream changes nothing.
+        try:
+            with closing(self._connect()) as connection:
+                if reverse:
+                    rows = connection.execute(
+                        "SELECT id, description, priority, done, due, tags FROM todos "
+                        "WHERE ? < 0 OR id < ? ORDER BY id DESC LIMIT -1 OFFSET ?",
+                        (after[0] if after else -1, after[0] if after else -1, offset),
+                    )
+                else:
+                    rows = connection.execute(
+                        "SELECT id, description, priority, done, due, tags FROM todos "
+                        "WHERE id > ? ORDER BY id LIMIT -1 OFFSET ?",
+                        (after[0] if after else 0, offset),
+                    )
+                for row in rows:                                                    # the SQLite cursor fetches rows as they are consumed
+                    yield TodoRow(row[0], todo_from_columns(*row), row[0])
+        except sqlite3.Error:
+            return
+
+    def get_todos(self, todo_ids: List[int]) -> DBResponse:                         # looked up through the primary key, without reading the other rows
+        try:
+            with closing(self._connect()) as connection:
+                rows = self._rows_at(connection, todo_ids, partial=True)
+        except sqlite3.Error:
+            return DBResponse([], DB_READ_ERROR)
+        return DBResponse([todo_from_columns(*row) for row in rows], SUCCESS)
+
+    @trace.traced("db.write")
+    def write_todos(
+        self, todo_list: List[Dict[str, Any]], counters: Optional[Counters] = None
+    ) -> DBResponse:                                                                # replaces every row inside a single transaction. The triggers count the rows, so counters isn't needed.
+        try:
+            with closing(self._connect()) as connection, connection:                # the inner "with connection" commits on success and rolls back on error
+                connection.execute("DELETE FROM todos")
+                connection.executemany(
+                    "INSERT INTO todos (id, description, priority, done, due, tags) VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        (todo.get("ID"), todo["Description"], todo["Priority"], todo["Done"], todo.get("Due"), joined_tags(todo))  # to-dos without an ID get the next one
+                        for todo in todo_list if TOMBSTONE not in todo
+                    ),
+                )
+                if todo_list and TOMBSTONE in todo_list[-1]:                        # the ID of a removed last to-do isn't given out again
+                    _raise_highest_id(connection, todo_list[-1]["ID"])
+        except sqlite3.Error:
+            return DBResponse(todo_list, DB_WRITE_ERROR)
+        return DBResponse(todo_list, SUCCESS)
+
+    def read_counts(self) -> Optional[Counters]:                                    # a few rows of the counts table, however many to-dos there are
+        try:
+            with closing(self._connect()) as connection:
+                rows = connection.execute("SELECT priority, todos, done FROM counts WHERE todos > 0").fetchall()
+        except sqlite3.Error:
+            return None
+        return {priority: [todos, done] for priority, todos, done in rows}
+
+    def write_counts(self, counters: Counters) -> int:
+        try:
+            with closing(self._connect()) as connection, connection:
+                connection.execute("DELETE FROM counts")
+                connection.executemany(
+                    "INSERT INTO counts (priority, todos, done) VALUES (?, ?, ?)",
+                    ((priority, todos, done) for priority, (todos, done) in counters.items()),
+                )
+        except sqlite3.Error:
+            return DB_WRITE_ERROR
+        return SUCCESS
+
+    def add_todos(self, todos: List[Dict[str, Any]]) -> DBResponse:
+        try:
+            with closing(self._connect()) as connection, connection:
+                connection.executemany(
+                    "INSERT INTO todos (description, priority, done, due, tags) VALUES (?, ?, ?, ?, ?)",
+                    ((todo["Description"], todo["Priority"], todo["Done"], todo.get("Due"), joined_tags(todo)) for todo in todos),
+                )
+                last = connection.execute("SELECT last_insert_rowid()").fetchone()[0]  # the transaction holds the write lock, so the new rows got consecutive IDs
+        except sqlite3.Error:
+            return DBResponse(todos, DB_WRITE_ERROR)
+        return DBResponse(
+            [{"ID": todo_id, **todo} for todo_id, todo in enumerate(todos, last - len(todos) + 1)], SUCCESS
+        )
+
+    def update_todos(self, todo_ids: List[int], changes: Dict[str, Any]) -> DBResponse:  # an UPDATE of just the rows with the given IDs
+        try:
+            with closing(self._connect()) as connection, connection:
+                rows = self._rows_at(connection, todo_ids)
+                if rows is None:
+                    return DBResponse([], ID_ERROR)
+                todos = [todo_from_columns(*row) for row in rows]
+                for todo in todos:
+                    todo.update(changes)
+                assignments = ", ".join(f"{COLUMNS[key]} = ?" for key in changes)
+                connection.executemany(
+                    f"UPDATE todos SET {assignments} WHERE id = ?",
+                    ((*changes.values(), row[0]) for row in rows),
+                )
+        except sqlite3.Error:
+            return DBResponse([], DB_WRITE_ERROR)
+        return DBResponse(todos, SUCCESS)
+
+    def remove_todos(self, todo_ids: List[int]) -> DBResponse:                      # a DELETE of just the rows with the given IDs. The primary key index already finds them, so SQLite needs no tombstones.
+        try:
+            with closing(self._connect()) as connection, connection:
+                rows = self._rows_at(connection, todo_ids)
+                if rows is None:
+                    return DBResponse([], ID_ERROR)
+                connection.executemany("DELETE FROM todos WHERE id = ?", ((row[0],) for row in rows))
+        except sqlite3.Error:
+            return DBResponse([], DB_WRITE_ERROR)
+        return DBResponse([todo_from_columns(*row) for row in rows], SUCCESS)
+
+    def clear_todos(self) -> DBResponse:                                            # the AUTOINCREMENT counter survives the DELETE, so no ID is given out again
+        return self.write_todos([])
+
+    def commit(self, ops: List[Dict[str, Any]]) -> List[DBResponse]:                # every mutation already touches only its own rows, so a group is run one small transaction at a time
+        responses = []
+        for op in ops:
+            kind = op["op"]
+            if kind == "add":
+                responses.append(self.add_todos(op["todos"]))
+            elif kind == "update":
+                responses.append(self.update_todos(op["ids"], op["set"]))
+            elif kind == "remove":
+                responses.append(self.remove_todos(op["ids"]))
+            else:
+                responses.append(self.clear_todos())
+        return responses
+
+    def import_todos(self, chunks: Iterable[List[Dict[str, Any]]]) -> CountResponse:  # one transaction per chunk, so the to-dos of a failed import are kept up to the last complete chunk
+        count = 0
+        try:
+            with closing(self._connect()) as connection:
+                for chunk in chunks:
+                    with connection:
+                        connection.executemany(
+                            "INSERT INTO todos (description, priority, done, due, tags) VALUES (?, ?, ?, ?, ?)",
+                            ((todo["Description"], todo["Priority"], todo["Done"], todo.get("Due"), joined_tags(todo)) for todo in chunk),
+                        )
+                    count += len(chunk)
+        except sqlite3.Error:
+            return CountResponse(count, DB_WRITE_ERROR)
+        return CountResponse(count, SUCCESS)
+
+    def persist(
+        self, ops: List[Dict[str, Any]], todo_list: List[Dict[str, Any]], counters: Optional[Counters] = None
+    ) -> int:                                                                       # the mutations are replayed as row updates instead of rewriting the table
+        errors = [response.error for response in self.commit(ops) if response.error]
+        return errors[0] if errors else SUCCESS
+
+    def _rows_at(
+        self, connection: sqlite3.Connection, todo_ids: List[int], partial: bool = False
+    ) -> Optional[List[Row]]:                                                       # returns None when any of the IDs names no to-do, unless partial results are wanted
+        rows = {}
+        wanted = list(dict.fromkeys(todo_ids))
+        for start in range(0, len(wanted), ROWS_PER_QUERY):
+            chunk = wanted[start:start + ROWS_PER_QUERY]
+            rows.update(
+                (row[0], row)
+                for row in connection.execute(
+                    "SELECT id, description, priority, done, due, tags FROM todos "
+                    f"WHERE id IN ({', '.join('?' * len(chunk))})",
+                    chunk,
+                )
+            )
+        if partial:
+            return [rows[todo_id] for todo_id in todo_ids if todo_id in rows]
+        if len(rows) < len(wanted):
+            return None
+        return [rows[todo_id] for todo_id in todo_ids]
+
+def _highest_id(connection: sqlite3.Connection) -> int:                             # the AUTOINCREMENT counter, which remembers removed rows too
+    row = connection.execute("SELECT seq FROM sqlite_sequence WHERE name = 'todos'").fetchone()
+    return row[0] if row else 0
+
+def _raise_highest_id(connection: sqlite3.Connection, todo_id: int) -> None:
+    if connection.execute(
+        "UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'todos'", (todo_id,)
+    ).rowcount == 0:
+        connection.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('todos', ?)", (todo_id,))
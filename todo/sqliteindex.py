@@ -0,0 +1,45 @@
+"""This module provides the base of the SQLite indexes kept next to a database"""
+# todo/sqliteindex.py
+
+import json
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+from typing import Optional, Tuple
+
+class SQLiteIndex:                                                                  # an SQLite file stamped with the database state it was last updated against, which can always be rebuilt from the database
+    def __init__(self, index_path: Path, schema: str, index_format: int) -> None:   # schema runs on every connection, so it holds CREATE ... IF NOT EXISTS statements, one of them for the meta table
+        self._index_path = index_path
+        self._schema = schema
+        self._format = index_format                                                 # stored next to the stamp. Indexes of another format are rebuilt.
+
+    def exists(self) -> bool:
+        return self._index_path.exists()
+
+    def is_current(self, stamp: Optional[Tuple[int, ...]]) -> bool:                 # the index is only trusted when it was last updated against the database state identified by stamp
+        if stamp is None or not self.exists():
+            return False
+        try:
+            with closing(self._connect()) as connection:
+                meta = dict(connection.execute("SELECT key, value FROM meta"))
+        except sqlite3.Error:
+            return False
+        return (
+            meta.get("format") == str(self._format)
+            and "stamp" in meta and tuple(json.loads(meta["stamp"])) == tuple(stamp)
+        )
+
+    def drop(self) -> None:                                                         # an index that can't be trusted is deleted. The next command that needs it rebuilds it.
+        self._index_path.unlink(missing_ok=True)
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self._index_path)
+        connection.execute("PRAGMA synchronous = OFF")                              # the index can always be rebuilt from the database, so it skips fsync
+        connection.executescript(self._schema)
+        return connection
+
+    def _set_stamp(self, connection: sqlite3.Connection, stamp: Optional[Tuple[int, ...]]) -> None:
+        connection.executemany(
+            "INSERT OR REPLACE INTO meta VALUES (?, ?)",
+            (("stamp", json.dumps(stamp)), ("format", str(self._format))),
+        )
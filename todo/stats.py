@@ -0,0 +1,80 @@
+"""This module provides the aggregate counters behind the stats command"""
+# todo/stats.py
+
+import marshal
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+COUNTS_FORMAT = 1                                                                   # bumped whenever the layout of the counters file changes
+
+Counters = Dict[int, List[int]]                                                     # maps every priority in use to [to-dos, done to-dos]
+
+class Stats(NamedTuple):                                                            # the totals printed by "todo stats"
+    total: int
+    done: int
+    priorities: Dict[int, Tuple[int, int]]                                          # to-dos and done to-dos of every priority
+
+    @property
+    def open(self) -> int:
+        return self.total - self.done
+
+    @property
+    def ratio(self) -> float:                                                       # 0.0 for an empty list
+        return self.done / self.total if self.total else 0.0
+
+def stats_of(counters: Counters) -> Stats:
+    """Return the totals held by a set of counters"""
+    priorities = {priority: (todos, done) for priority, (todos, done) in sorted(counters.items()) if todos}
+    return Stats(
+        sum(todos for todos, _ in priorities.values()),
+        sum(done for _, done in priorities.values()),
+        priorities,
+    )
+
+def count_todos(todos: Iterable[Dict[str, Any]]) -> Counters:                       # takes live to-dos only, without tombstones
+    """Return the counters of a full scan of the to-dos"""
+    counters: Counters = {}
+    count_in(counters, todos)
+    return counters
+
+def count_in(counters: Counters, todos: Iterable[Dict[str, Any]]) -> None:
+    for todo in todos:
+        counter = counters.setdefault(todo["Priority"], [0, 0])
+        counter[0] += 1
+        counter[1] += bool(todo["Done"])
+
+def count_out(counters: Counters, todos: Iterable[Dict[str, Any]]) -> None:
+    for todo in todos:
+        counter = counters[todo["Priority"]]
+        counter[0] -= 1
+        counter[1] -= bool(todo["Done"])
+        if not counter[0]:                                                          # priorities nobody uses any more are dropped, so equal lists have equal counters
+            del counters[todo["Priority"]]
+
+def counts_path(db_path: Path) -> Path:
+    """Return the path of the counters file kept next to a JSON database"""
+    return db_path.with_name(db_path.name + ".stats")
+
+def load_counts(db_path: Path, stamp: Optional[Tuple[int, ...]]) -> Optional[Counters]:
+    """Return the stored counters of a database, or None when they don't match stamp"""
+    if stamp is None:
+        return None
+    try:
+        with counts_path(db_path).open("rb") as counts:
+            version, stored_stamp, counters = marshal.loads(counts.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if version != (COUNTS_FORMAT, marshal.version) or tuple(stored_stamp) != tuple(stamp):
+        return None
+    return counters
+
+def store_counts(db_path: Path, stamp: Tuple[int, ...], counters: Counters) -> None:
+    """Save the counters of the database version identified by stamp"""
+    path = counts_path(db_path)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        tmp_path.write_bytes(marshal.dumps(((COUNTS_FORMAT, marshal.version), stamp, counters)))
+        os.replace(tmp_path, path)
+    except (OSError, ValueError):                                                   # the next stats command then counts the list again
+        tmp_path.unlink(missing_ok=True)
@@ -0,0 +1,163 @@
+"""This module provides the compact in-memory form of the to-do list"""
+# todo/table.py
+
+import heapq
+import operator
+import sys
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+SORT_KEYS = ("priority", "done", "description", "id")                               # "id" is insertion order, which also breaks the ties the other keys leave
+
+SortKeys = List[Tuple[str, bool]]                                                   # (key, descending) pairs, the most significant key first
+
+def parse_sort_keys(spec: str, reverse: bool = False) -> SortKeys:
+    """Return the sort keys named by a spec such as "priority,-done", reversed with reverse"""
+    keys: SortKeys = []
+    for name in spec.split(","):
+        name = name.strip()
+        descending = name.startswith("-")                                           # a leading "-" sorts that key from high to low
+        name = name.lstrip("-")
+        if name not in SORT_KEYS:
+            raise ValueError(f"unknown sort key {name!r}")
+        if name not in (key for key, _ in keys):
+            keys.append((name, descending != reverse))
+        if name == "id":                                                            # IDs are unique, so any later key would never be consulted
+            break
+    return keys
+
+class TodoTable:                                                                    # holds the to-do list column by column instead of as one dictionary per to-do
+    __slots__ = ("ids", "descriptions", "priorities", "done", "dues", "tags", "tags_of")
+
+    def __init__(self) -> None:
+        self.ids = array("q")                                                       # ascending, like the to-dos of the database
+        self.descriptions: List[str] = []                                           # interned, so repeated descriptions share one string
+        self.priorities = array("b")                                                # one signed byte per to-do
+        self.done = bytearray()                                                     # one byte per to-do, 1 for done
+        self.dues: Dict[int, str] = {}                                              # the due date of every to-do that has one, by ID
+        self.tags: Dict[str, "array[int]"] = {}                                     # the ascending IDs of the to-dos carrying each tag
+        self.tags_of: Dict[int, List[str]] = {}                                     # the tags of every to-do carrying any, by ID
+
+    @classmethod
+    def from_todos(cls, todos: Iterable[Dict[str, Any]]) -> "TodoTable":
+        """Build a table from to-do dictionaries, consuming them one at a time"""
+        table = cls()
+        ids = table.ids.append
+        descriptions = table.descriptions.append                                    # the bound methods are looked up once for the whole load
+        priorities = table.priorities.append
+        done = table.done.append
+        intern = sys.intern
+        for todo in todos:
+            ids(todo["ID"])
+            descriptions(intern(todo["Description"]))
+            priorities(todo["Priority"])
+            done(1 if todo["Done"] else 0)
+            if "Due" in todo:                                                       # most to-dos have neither, so they cost two lookups
+                table.dues[todo["ID"]] = todo["Due"]
+            if "Tags" in todo:
+                table._tag(todo)
+        return table
+
+    def __len__(self) -> int:
+        return len(self.descriptions)
+
+    def append(self, todo: Dict[str, Any]) -> None:
+        self.ids.append(todo["ID"])
+        self.descriptions.append(sys.intern(todo["Description"]))
+        self.priorities.append(todo["Priority"])
+        self.done.append(1 if todo["Done"] else 0)
+        if "Due" in todo:
+            self.dues[todo["ID"]] = todo["Due"]
+        if "Tags" in todo:
+            self._tag(todo)
+
+    def _tag(self, todo: Dict[str, Any]) -> None:
+        self.tags_of[todo["ID"]] = todo["Tags"]
+        for tag in todo["Tags"]:
+            tagged = self.tags.get(tag)
+            if tagged is None:
+                tagged = self.tags[tag] = array("q")
+            tagged.append(todo["ID"])
+
+    def todo(self, todo_id: int) -> Dict[str, Any]:                                 # dictionaries are only built for the to-dos handed out
+        """Return the to-do with the given ID as a dictionary"""
+        index = bisect_left(self.ids, todo_id)
+        if index == len(self.ids) or self.ids[index] != todo_id:
+            raise KeyError(todo_id)
+        todo = {
+            "ID": todo_id,
+            "Description": self.descriptions[index],
+            "Priority": self.priorities[index],
+            "Done": bool(self.done[index]),
+        }
+        if todo_id in self.dues:
+            todo["Due"] = self.dues[todo_id]
+        if todo_id in self.tags_of:
+            todo["Tags"] = list(self.tags_of[todo_id])                              # a copy, so the table can't be changed through the to-do handed out
+        return todo
+
+    def rows(self, todo_ids: Optional[Iterable[int]] = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Yield (ID, to-do) pairs for the given IDs, or for every to-do"""
+        if todo_ids is None:
+            todo_ids = self.ids
+        for todo_id in todo_ids:
+            yield todo_id, self.todo(todo_id)
+
+    def ids_by_priority(self, reverse: bool = False, limit: Optional[int] = None) -> List[int]:  # a counting sort: priorities take a handful of values, so the IDs are collected value by value in O(n)
+        """Return the IDs ordered by priority, keeping insertion order among equal priorities"""
+        priorities = self.priorities.tobytes()
+        ordered: List[int] = []
+        for priority in sorted(set(self.priorities), reverse=reverse):
+            ordered.extend(_positions(priorities, priority & 0xFF, None if limit is None else limit - len(ordered)))
+            if limit is not None and len(ordered) >= limit:                         # the scan stops as soon as the first limit IDs are known
+                break
+        return [self.ids[index] for index in ordered]
+
+    def sorted_ids(self, keys: SortKeys, limit: Optional[int] = None) -> List[int]:
+        """Return the IDs ordered by several keys, or only the first limit of them"""
+        if not keys or keys[0] == ("id", False):
+            return list(self.ids[:limit])
+        if len(keys) == 1 and keys[0][0] == "priority":
+            return self.ids_by_priority(keys[0][1], limit)
+        folded: List[str] = []                                                      # descriptions compare without regard to case
+        if any(name == "description" for name, _ in keys):
+            folded = [description.casefold() for description in self.descriptions]
+        if limit is not None and limit < len(self):                                 # a heap holding limit entries picks them in O(n log limit) instead of sorting everything
+            columns = [_heap_column(self._column(name, folded), descending) for name, descending in keys]
+            return [self.ids[entry[-1]] for entry in heapq.nsmallest(limit, zip(*columns, range(len(self))))]
+        order = list(range(len(self)))                                              # already in insertion order, which the stable sorts below keep among ties
+        for name, descending in reversed(keys):                                     # one stable sort per key, least significant first, each comparing plain column values in C
+            order.sort(key=self._column(name, folded).__getitem__, reverse=descending)
+        return [self.ids[index] for index in order]
+
+    def _column(self, name: str, folded: List[str]) -> Sequence[Any]:
+        return {"priority": self.priorities, "done": self.done, "description": folded, "id": self.ids}[name]
+
+class _Descending:                                                                  # inverts the order of a string, for descending text keys inside heap entries
+    __slots__ = ("value",)
+
+    def __init__(self, value: str) -> None:
+        self.value = value
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, _Descending) and self.value == other.value
+
+    def __lt__(self, other: "_Descending") -> bool:
+        return other.value < self.value
+
+def _heap_column(column: Sequence[Any], descending: bool) -> Iterable[Any]:
+    if not descending:
+        return column
+    if isinstance(column, list):                                                    # descriptions
+        return map(_Descending, column)
+    return map(operator.neg, column)                                                # numbers are negated in C
+
+def _positions(column: bytes, value: int, limit: Optional[int] = None) -> List[int]:  # the column is searched with bytes.find(), which scans in C between matches
+    needle = bytes((value,))
+    found: List[int] = []
+    index = column.find(needle)
+    while index >= 0 and len(found) != limit:
+        found.append(index)
+        index = column.find(needle, index + 1)
+    return found
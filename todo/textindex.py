@@ -0,0 +1,131 @@
+"""This module provides the full-text index used by the search command"""
+# todo/textindex.py
+
+import re
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from todo.database import TOMBSTONE, joined_tags, todo_from_columns
+from todo.sqliteindex import SQLiteIndex
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS docs (
+    key INTEGER PRIMARY KEY,
+    description TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    done INTEGER NOT NULL,
+    due TEXT,
+    tags TEXT
+);
+CREATE TABLE IF NOT EXISTS words (word TEXT NOT NULL, key INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS words_word ON words (word, key);
+CREATE TABLE IF NOT EXISTS trigrams (gram TEXT NOT NULL, key INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS trigrams_gram ON trigrams (gram, key);
+"""                                                                                 # docs.key is the to-do ID, which never changes, so removing a to-do only deletes its own rows
+
+INDEX_FORMAT = 1                                                                    # stored next to the stamp. Indexes of another format are rebuilt.
+
+WORD_RE = re.compile(r"\w+")
+
+def index_path(db_path: Path) -> Path:
+    """Return the path of the text index kept next to a database"""
+    return db_path.with_name(db_path.name + ".textidx")
+
+def words(text: str) -> Set[str]:
+    """Return the lowercased words of a text"""
+    return set(WORD_RE.findall(text.lower()))
+
+def trigrams(text: str) -> Set[str]:
+    """Return every three-character substring of a lowercased text"""
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class TextIndex(SQLiteIndex):                                                       # an SQLite file holding word and trigram postings plus the fields search results are printed with
+    def __init__(self, db_path: Path) -> None:
+        super().__init__(index_path(db_path), SCHEMA, INDEX_FORMAT)
+
+    def rebuild(self, todo_list: List[Dict[str, Any]], stamp: Optional[Tuple[int, ...]]) -> None:
+        self.drop()
+        with closing(self._connect()) as connection, connection:
+            for todo in todo_list:
+                if TOMBSTONE not in todo:
+                    self._insert(connection, todo)
+            self._set_stamp(connection, stamp)
+
+    def add(self, todos: List[Dict[str, Any]], stamp: Optional[Tuple[int, ...]]) -> None:  # takes the to-dos as returned by the database, carrying their new IDs
+        with closing(self._connect()) as connection, connection:
+            for todo in todos:
+                self._insert(connection, todo)
+            self._set_stamp(connection, stamp)
+
+    def update(self, todo_ids: List[int], changes: Dict[str, Any], stamp: Optional[Tuple[int, ...]]) -> None:
+        with closing(self._connect()) as connection, connection:
+            for key, column in (("Done", "done"), ("Priority", "priority")):
+                if key in changes:
+                    connection.executemany(
+                        f"UPDATE docs SET {column} = ? WHERE key = ?",
+                        ((changes[key], todo_id) for todo_id in todo_ids),
+                    )
+            self._set_stamp(connection, stamp)
+
+    def remove(self, todo_ids: List[int], stamp: Optional[Tuple[int, ...]]) -> None:
+        with closing(self._connect()) as connection, connection:
+            for key in set(todo_ids):
+                row = connection.execute("SELECT description FROM docs WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    continue
+                description, = row
+                connection.executemany(                                             # the postings to delete are found again from the description, through the (term, key) indexes
+                    "DELETE FROM words WHERE word = ? AND key = ?",
+                    ((word, key) for word in words(description)),
+                )
+                connection.executemany(
+                    "DELETE FROM trigrams WHERE gram = ? AND key = ?",
+                    ((gram, key) for gram in trigrams(description)),
+                )
+                connection.execute("DELETE FROM docs WHERE key = ?", (key,))
+            self._set_stamp(connection, stamp)
+
+    def clear(self, stamp: Optional[Tuple[int, ...]]) -> None:
+        self.rebuild([], stamp)
+
+    def search(self, text: str, whole_words: bool = False) -> List[Tuple[int, Dict[str, Any]]]:
+        """Return the (ID, to-do) pairs whose description contains text"""
+        needle = text.lower()
+        if whole_words:
+            terms, table, column = words(text), "words", "word"                     # every word of the query must be a word of the description
+        else:
+            terms, table, column = trigrams(text), "trigrams", "gram"               # every trigram of the query must occur in the description
+        with closing(self._connect()) as connection:
+            if terms:
+                candidates = " INTERSECT ".join(
+                    f"SELECT key FROM {table} WHERE {column} = ?" for _ in terms
+                )
+                rows = connection.execute(
+                    "SELECT key, description, priority, done, due, tags FROM docs "
+                    f"WHERE key IN ({candidates}) ORDER BY key",
+                    tuple(terms),
+                )
+            else:                                                                   # queries shorter than a trigram are checked against every stored description
+                rows = connection.execute("SELECT key, description, priority, done, due, tags FROM docs ORDER BY key")
+            results = []
+            for row in rows:
+                if whole_words or needle in row[1].lower():                         # trigram postings only find candidates, the substring itself is checked here
+                    results.append((row[0], todo_from_columns(*row)))
+        return results
+
+    def _insert(self, connection: sqlite3.Connection, todo: Dict[str, Any]) -> None:
+        key, description = todo["ID"], todo["Description"]
+        connection.execute(
+            "INSERT INTO docs (key, description, priority, done, due, tags) VALUES (?, ?, ?, ?, ?, ?)",
+            (key, description, todo["Priority"], todo["Done"], todo.get("Due"), joined_tags(todo)),
+        )
+        connection.executemany("INSERT INTO words VALUES (?, ?)", _postings(words(description), key))
+        connection.executemany("INSERT INTO trigrams VALUES (?, ?)", _postings(trigrams(description), key))
+
+
+def _postings(terms: Iterable[str], key: int) -> Iterable[Tuple[str, int]]:
+    return ((term, key) for term in terms)
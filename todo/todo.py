@@ -1,81 +1,482 @@
 """This module contains the To-Do Model-Controller"""
 # todo/todo.py
 
+import re
+from bisect import bisect_left, bisect_right
 from pathlib import Path
-from typing import Any, Dict, List, NamedTuple
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
 
-from todo import DB_READ_ERROR, ID_ERROR
-from todo.database import DatabaseHandler
+from todo import DB_WRITE_ERROR, ID_ERROR, SUCCESS, trace
+from todo.database import DEFAULT_BACKEND, CountResponse, DBResponse, TodoRow, apply_counted, get_handler, live_todos, slot_index
+from todo.locking import Commit, GroupCommit, exclusive_lock
+from todo.stats import Stats, count_todos, stats_of
+from todo.table import SortKeys, TodoTable
+
+if TYPE_CHECKING:
+    from todo.bitmaps import BitmapIndex, Bitmaps
+    from todo.dueindex import DueIndex
+    from todo.query import Plan
+    from todo.sortindex import SortIndex
+    from todo.textindex import TextIndex                                                # imported lazily below, so commands that never search skip SQLite
+
+MIN_PRIORITY = 1                                                                        # the priorities "todo add" and "todo import" accept
+MAX_PRIORITY = 3
+TAG_RE = re.compile(r"[^\W_][\w.:/-]*")                                                  # a letter or digit followed by word characters, ".", ":", "/" or "-", such as ops, sprint-42 or team/db
+MAX_ID_RANGE = 1000000                                                                  # the most IDs one range such as 10-200 may name, so a mistyped bound fails at once instead of listing a billion IDs
+IMPORT_CHUNK_ROWS = 10000                                                               # to-dos "todo import" commits together, so memory use stays flat however long the file is
+
+Index = Union["TextIndex", "SortIndex", "BitmapIndex", "DueIndex"]                      # the indexes kept next to the database share the upkeep methods _index_op() calls
 
 class CurrentTodo(NamedTuple):                                                          # subclass of typing.NamedTuple
     todo: Dict[str, Any]                                                                # subclssing allows us to create named tuples with type hints for named fields.
     error: int
 
+class CurrentTodos(NamedTuple):                                                         # the batch counterpart of CurrentTodo
+    todos: List[Dict[str, Any]]
+    error: int
+
+class CurrentStats(NamedTuple):                                                         # returned by Todoer.stats()
+    stats: Stats
+    consistent: bool                                                                    # False when the stored counters were missing or disagreed with a full scan, and have been rebuilt
+    error: int
+
+def make_cursor(row: TodoRow, reverse: bool) -> str:                                    # cursors look like "f12.3456": the direction, the last to-do ID shown and the backend's resume position
+    """Return a cursor continuing an iteration right after row"""
+    return f"{'r' if reverse else 'f'}{row.todo_id}.{row.resume}"
+
+def parse_cursor(cursor: str) -> Tuple[bool, Tuple[int, int]]:
+    """Return the direction and position encoded in a cursor"""
+    direction, _, position = cursor.partition(".")
+    if direction[:1] not in ("f", "r") or not direction[1:].isdigit() or not position.isdigit():
+        raise ValueError(f"invalid cursor {cursor!r}")
+    return direction[0] == "r", (int(direction[1:]), int(position))
+
+def parse_due(text: str) -> str:                                                        # accepts what datetime.fromisoformat() does, such as "2026-11-01T09:00", "2026-11-01 09:00" or "2026-11-01"
+    """Return a due date and time in the form to-dos store it, such as "2026-11-01T09:00", or raise ValueError"""
+    from datetime import datetime
+    try:
+        moment = datetime.fromisoformat(text.strip())
+    except ValueError:
+        raise ValueError(f'Invalid due date "{text}", use a form such as 2026-11-01T09:00') from None
+    if moment.tzinfo is not None:                                                       # due dates are kept in local time
+        moment = moment.astimezone().replace(tzinfo=None)
+    return moment.isoformat(timespec="minutes")                                         # always "YYYY-MM-DDTHH:MM", so due dates sort as strings in time order
+
+def parse_tag(text: str) -> str:                                                        # tags ignore case, so "Ops" and "ops" are one tag
+    """Return a tag in the form to-dos store it, or raise ValueError"""
+    tag = text.strip().lower()
+    if not TAG_RE.fullmatch(tag):
+        raise ValueError(f'Invalid tag "{text}", use a word such as ops, sprint-42 or team/db')
+    return tag
+
+def new_todo(
+    description: List[str], priority: int, due: Optional[str] = None, tags: Optional[List[str]] = None
+) -> Dict[str, Any]:                                                                    # due as returned by parse_due(), tags by parse_tag(). To-dos without them have no Due or Tags key at all.
+    """Return a new to-do, without an ID until the database gives it one"""
+    description_text = " ".join(description)                                            # .join() function is used for concatenating description components into single string.
+    if not description_text.endswith("."):                                              # adds a "." add the end of a descriptor if the user doesn't to maintain uniformity.
+        description_text += "."
+    todo = {
+        "Description": description_text,
+        "Priority": priority,
+        "Done": False,
+    }
+    if due is not None:
+        todo["Due"] = due
+    if tags:
+        todo["Tags"] = sorted(set(tags))
+    return todo
+
+def select_page(
+    todo_ids: List[int], reverse: bool = False, offset: int = 0, limit: Optional[int] = None, after: Optional[int] = None
+) -> List[int]:                                                                         # todo_ids ascending, as a query returns them. after is the last ID of the previous page.
+    """Return the IDs of one page of a listing"""
+    if after is not None:
+        position = bisect_left(todo_ids, after) if reverse else bisect_right(todo_ids, after)
+        todo_ids = todo_ids[:position] if reverse else todo_ids[position:]
+    if reverse:
+        todo_ids = todo_ids[::-1]
+    return todo_ids[offset:None if limit is None else offset + limit]
+
+def due_now() -> str:
+    """Return the current local time in the form of stored due dates"""
+    from datetime import datetime
+    return datetime.now().isoformat(timespec="minutes")
+
+def scan_due(
+    todos: Iterable[Dict[str, Any]], now: str, overdue: bool = False, limit: Optional[int] = None
+) -> List[Tuple[int, Dict[str, Any]]]:                                                  # what the due index answers, worked out by reading and sorting every to-do
+    """Return the (ID, to-do) pairs of the open to-dos due from now on, or before now with overdue set, earliest first"""
+    dues = sorted(
+        (todo["Due"], todo["ID"], todo) for todo in todos
+        if todo.get("Due") is not None and not todo["Done"] and (todo["Due"] < now) == overdue
+    )
+    return [(todo_id, todo) for _, todo_id, todo in dues[:limit]]
+
+def parse_ids(values: List[str]) -> List[int]:                                          # turns IDs such as ["1", "5", "10-200"] into a list of to-do IDs
+    """Return the to-do IDs named by single IDs and inclusive ranges"""
+    todo_ids = []
+    for value in values:
+        first, _, last = value.partition("-")
+        try:
+            start, stop = int(first), int(last or first)
+        except ValueError:
+            raise ValueError(f'Invalid TODO_ID "{value}"') from None
+        if start > stop:
+            raise ValueError(f'Invalid TODO_ID range "{value}"')
+        if stop - start >= MAX_ID_RANGE:
+            raise ValueError(f'TODO_ID range "{value}" names more than {MAX_ID_RANGE} IDs')
+        todo_ids.extend(range(start, stop + 1))
+    return list(dict.fromkeys(todo_ids))                                                # drops repeated IDs while keeping the order they were given in
+
 class Todoer:                                                                           # this class using 'composition', so it has a DatabaseHandler component to directly communicate with the to-do database
-    def __init__(self, db_path: Path) -> None:
-        self._db_handler = DatabaseHandler(db_path)
+    def __init__(self, db_path: Path, backend: str = DEFAULT_BACKEND) -> None:
+        self._db_handler = get_handler(db_path, backend)                                # picks the DatabaseHandler implementation for the configured storage backend
+        self._group_commit = GroupCommit(db_path)                                       # serializes the mutations of concurrent processes and commits queued ones together
+        self._db_path = db_path
+        self._index: Optional["TextIndex"] = None
+        self._order_index: Optional["SortIndex"] = None
+        self._bitmaps: Optional["BitmapIndex"] = None
+        self._dues: Optional["DueIndex"] = None
+
+    @property
+    def _text_index(self) -> "TextIndex":                                               # full-text index kept next to the database, created by the first search
+        if self._index is None:
+            from todo.textindex import TextIndex
+            self._index = TextIndex(self._db_path)
+        return self._index
+
+    @property
+    def _sort_index(self) -> "SortIndex":                                               # sort orders kept next to the database, created by the first sort of a big list
+        if self._order_index is None:
+            from todo.sortindex import SortIndex
+            self._order_index = SortIndex(self._db_path)
+        return self._order_index
+
+    @property
+    def _due_index(self) -> "DueIndex":                                                 # the open to-dos in due order, kept next to the database, created by the first "todo due"
+        if self._dues is None:
+            from todo.dueindex import DueIndex
+            self._dues = DueIndex(self._db_path)
+        return self._dues
+
+    @property
+    def _bitmap_index(self) -> "BitmapIndex":                                           # bitmaps of the Priority and Done values kept next to the database, created by the first query
+        if self._bitmaps is None:
+            from todo.bitmaps import BitmapIndex
+            self._bitmaps = BitmapIndex(self._db_path)
+        return self._bitmaps
 
     def get_todo_list(self) -> List[Dict[str, Any]]:                                    # .get_todo_list() first gets the entire to-do list from the database by calling .read_todos() on the database handler. The call .read_todos() returns a named tuple, DBResponse containing the to-do list and return code. To retrieve only the list, .get_todo_list() returns the .todo_list field only
         """Return the current To-Do List"""
         read = self._db_handler.read_todos()
-        return read.todo_list
+        return live_todos(read.todo_list)                                               # without the tombstones that removed to-dos leave until the list is compacted
+
+    def get_todos(self, todo_ids: List[int]) -> List[Dict[str, Any]]:                   # looked up by ID, so the rest of the list isn't read. IDs that name no to-do are skipped.
+        """Return the to-dos with the given IDs"""
+        return self._db_handler.get_todos(todo_ids).todo_list
+
+    def load_table(self) -> TodoTable:                                                  # streams the database into columns, so the whole list never exists as dictionaries
+        """Return the current To-Do List in its compact columnar form"""
+        return TodoTable.from_todos(row.todo for row in self._db_handler.iter_todos())
 
-    def add(self, description: List[str], priority: int = 2) -> CurrentTodo:            # defines .add(), which takes description and priority as arguments. The description is a list of strings. Typer builds this list from the words entered by the user at the command line to describe the current to-do. In the case of priority, it’s an integer value representing the to-do’s priority. The default is 2, indicating a medium priority.
+    def iter_todos(
+        self, reverse: bool = False, offset: int = 0, cursor: Optional[str] = None, stream: bool = False
+    ) -> Iterator[TodoRow]:                                                             # stream trades the speed of the snapshot cache for flat memory use, for reading every to-do once such as "todo export" does
+        """Yield the to-dos one at a time without loading the whole list"""
+        after = None
+        if cursor is not None:
+            cursor_reverse, after = parse_cursor(cursor)                                # raises ValueError for a malformed cursor
+            if cursor_reverse != reverse:
+                raise ValueError("the cursor was created for the other listing order")
+        return self._db_handler.iter_todos(reverse, offset, after, stream)
+
+    def search_text(self, text: str, whole_words: bool = False) -> List[Tuple[int, Dict[str, Any]]]:
+        """Return the (ID, to-do) pairs whose description contains text"""
+        import sqlite3
+        stamp = self._db_handler.stamp()
+        try:
+            if not self._text_index.is_current(stamp):                                  # builds the index on first use, or again when the database was changed without going through a Todoer
+                read = self._db_handler.read_todos()
+                if read.error:
+                    return []
+                with trace.span("textindex.build"):
+                    self._text_index.rebuild(read.todo_list, stamp)
+            return self._text_index.search(text, whole_words)
+        except sqlite3.Error:                                                           # without a usable index the search falls back to scanning the whole list
+            self._text_index.drop()
+            from todo.textindex import words
+            if whole_words:
+                matches = lambda description: words(text) <= words(description)
+            else:
+                matches = lambda description: text.lower() in description.lower()
+            return [(todo["ID"], todo) for todo in self.get_todo_list() if matches(todo["Description"])]
+
+    def sort_todos(self, keys: SortKeys, limit: Optional[int] = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Return the (ID, to-do) pairs ordered by keys, or only the first limit of them"""
+        import sqlite3
+        from todo.sortindex import SORT_INDEX_MIN_ROWS
+        stamp = self._db_handler.stamp()
+        try:
+            if self._sort_index.is_current(stamp):                                      # answered from the index without reading the database
+                return self._sort_index.rows(keys, limit)
+            table = self.load_table()
+            if len(table) >= SORT_INDEX_MIN_ROWS:                                       # big lists get an index, so later sorts skip loading and sorting them
+                self._sort_index.rebuild((todo for _, todo in table.rows()), stamp)
+                return self._sort_index.rows(keys, limit)
+        except sqlite3.Error:                                                           # without a usable index the list is sorted in memory
+            self._sort_index.drop()
+            table = self.load_table()
+        return table.rows(table.sorted_ids(keys, limit))
+
+    def due_todos(
+        self, limit: Optional[int] = None, overdue: bool = False, now: Optional[str] = None
+    ) -> List[Tuple[int, Dict[str, Any]]]:                                              # answered by walking the due index from now, so it reads only the to-dos it returns
+        """Return the (ID, to-do) pairs of the open to-dos due from now on, or of those overdue, earliest first"""
+        import sqlite3
+        now = now if now is not None else due_now()
+        stamp = self._db_handler.stamp()
+        try:
+            if not self._due_index.is_current(stamp):                                   # built on first use, or again when the database was changed without going through a Todoer
+                read = self._db_handler.read_todos()
+                if read.error:
+                    return []
+                with trace.span("dueindex.build"):
+                    self._due_index.rebuild(read.todo_list, stamp)
+            return self._due_index.rows(now, overdue, limit)
+        except sqlite3.Error:                                                           # without a usable index the list is scanned and sorted
+            self._due_index.drop()
+            return scan_due(self.get_todo_list(), now, overdue, limit)
+
+    def query(
+        self,
+        plan: "Plan",
+        reverse: bool = False,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> List[Tuple[int, Dict[str, Any]]]:                                              # the paging arguments are those of select_page()
+        """Return the (ID, to-do) pairs matched by a compiled query"""
+        from todo.bitmaps import ids_of
+        matches = ids_of(plan(self._load_bitmaps(), self._text_ids))                    # the plan combines whole bitmaps, so only the matching to-dos are looked at one by one
+        matches = select_page(matches, reverse, offset, limit, after)                   # and only those of the page are read from the database
+        if not matches:
+            return []
+        read = self._db_handler.get_todos(matches)
+        todos = {todo["ID"]: todo for todo in read.todo_list}
+        return [(todo_id, todos[todo_id]) for todo_id in matches if todo_id in todos]  # in the order of the page, which may be descending
+
+    @trace.traced("bitmaps.load")
+    def _load_bitmaps(self) -> "Bitmaps":
+        from todo.bitmaps import Bitmaps
+        stamp = self._db_handler.stamp()
+        bitmaps = self._bitmap_index.load(stamp)
+        if bitmaps is None:                                                             # built on first use, or again when the database was changed without going through a Todoer
+            bitmaps = Bitmaps.from_table(self.load_table())
+            try:
+                self._bitmap_index.store(bitmaps, stamp)
+            except OSError:
+                pass
+        return bitmaps
+
+    def _text_ids(self, text: str, whole_words: bool) -> List[int]:
+        return [todo_id for todo_id, _ in self.search_text(text, whole_words)]
+
+    def stats(self, verify: bool = False) -> CurrentStats:                              # answered from counters every mutation updates, without reading a single to-do
+        """Return the totals of the to-do list, recounted with a full scan when verify is set"""
+        if not verify:
+            counters = self._db_handler.read_counts()
+            if counters is not None:
+                return CurrentStats(stats_of(counters), True, SUCCESS)
+        with exclusive_lock(self._db_path):                                             # no writer changes the list between the scan and storing its counters
+            read = self._db_handler.read_todos()
+            if read.error:
+                return CurrentStats(stats_of({}), False, read.error)
+            counters = count_todos(live_todos(read.todo_list))
+            consistent = self._db_handler.read_counts() == counters
+            error = SUCCESS if consistent else self._db_handler.write_counts(counters)
+        return CurrentStats(stats_of(counters), consistent, error)
+
+    def add(
+        self, description: List[str], priority: int = 2, due: Optional[str] = None, tags: Optional[List[str]] = None
+    ) -> CurrentTodo:  # defines .add(), which takes description and priority as arguments. The description is a list of strings. Typer builds this list from the words entered by the user at the command line to describe the current to-do. In the case of priority, it’s an integer value representing the to-do’s priority. The default is 2, indicating a medium priority.
         """Adding a new to-do item to the database"""
-        description_text = " ".join(description)                                        # .join() function is used for concatenating description components into single string.
-        if not description_text.endswith("."):                                          # adds a "." add the end of a descriptor if the user doesn't to maintain uniformity.
-            description_text += "."
-        todo = {                                                                        # build a new to-do item based on the user input
-            "Description": description_text,
-            "Priority": priority,
-            "Done": False,
-        }
-        read = self._db_handler.read_todos()                                            # reads the to-do list from the database by calling the .read_todos() on the database handler.
-        if read.error == DB_READ_ERROR:                                                 # checks if .read_todos() returned a DB_READ_ERROR. If so, then returns a named tuple, CurrentTodo, containing the current to-do and the error code.
-            return CurrentTodo(todo, read.error)
-        read.todo_list.append(todo)                                                     # appends the new to-do to the list.
-        write = self._db_handler.write_todos(read.todo_list)                            # writes the updated to-do list to the database by calling .write_todos() on the database handler
-        return CurrentTodo(todo, write.error)                                           # returns an instance of CurrentTodo with the current to-do and an appropriate return code.
+        todo = new_todo(description, priority, due, tags)                               # build a new to-do item based on the user input
+        write = self._commit({"op": "add", "todos": [todo]})                            # hands the new to-do to the database handler, which decides how to store it (a full rewrite for JSON, a single appended record for the journal backend) and gives it the next ID
+        return CurrentTodo(write.todo_list[0] if write.todo_list else todo, write.error)  # returns an instance of CurrentTodo with the current to-do, carrying its ID, and an appropriate return code.
 
     def set_done(self, todo_id: int) -> CurrentTodo:                                    # defines .set_done(). The method takes an argument called todo_id, which holds an integer representing the ID of the to-do to be marked as done.
         """Set a to-do as done"""
-        read = self._db_handler.read_todos()                                            # reads all the to-dos by calling .read_todos() on the database handler
-        if(read.error):                                                                 # checks if any error occurs during the reading
-            return CurrentTodo({}, read.error)                                          # returns a named tuple, CurrentTodo, with an empty to-do and the error
-        try:                                                                            # try...except block to catch invalid to-do IDs that translate to invalid indices in the list.
-            todo = read.todo_list[todo_id - 1]
-        except IndexError:
-            return CurrentTodo({}, ID_ERROR)                                            # returns a CurrentTodo instance with an empty to-do and the corresponding error code
-        todo["Done"] = True                                                             # assigns True to the "Done" key in the target to-do dictionary
-        write = self._db_handler.write_todos(read.todo_list)                            # writes the update back to the database by calling .write_todos() on the database handler
-        return CurrentTodo(todo, write.error)                                           # returns a CurrentTodo instance with the target to-do and a return code indicating how the operation went
+        write = self._commit({"op": "update", "ids": [todo_id], "set": {"Done": True}})  # assigns True to the "Done" key of the target to-do through the database handler, which also validates todo_id
+        return CurrentTodo(write.todo_list[0] if write.todo_list else {}, write.error)  # returns a CurrentTodo instance with the target to-do (empty on an invalid todo_id) and a return code indicating how the operation went
 
     def set_undone(self, todo_id: int) -> CurrentTodo:                                  # defines .set_undone(). The method takes an argument called todo_id, which holds an integer representing the ID of the to-do to be marked as undone.
         """Set a to-do as done"""
-        read = self._db_handler.read_todos()                                            # reads all the to-dos by calling .read_todos() on the database handler
-        if(read.error):                                                                 # checks if any error occurs during the reading
-            return CurrentTodo({}, read.error)                                          # returns a named tuple, CurrentTodo, with an empty to-do and the error
-        try:                                                                            # try...except block to catch invalid to-do IDs that translate to invalid indices in the list.
-            todo = read.todo_list[todo_id - 1]
-        except IndexError:
-            return CurrentTodo({}, ID_ERROR)                                            # returns a CurrentTodo instance with an empty to-do and the corresponding error code
-        todo["Done"] = False                                                            # assigns False to the "Done" key in the target to-do dictionary
-        write = self._db_handler.write_todos(read.todo_list)                            # writes the update back to the database by calling .write_todos() on the database handler
-        return CurrentTodo(todo, write.error)                                           # returns a CurrentTodo instance with the target to-do and a return code indicating how the operation went
+        write = self._commit({"op": "update", "ids": [todo_id], "set": {"Done": False}})  # assigns False to the "Done" key of the target to-do through the database handler
+        return CurrentTodo(write.todo_list[0] if write.todo_list else {}, write.error)
 
     def remove(self, todo_id: int) -> CurrentTodo:                                      # defines .remove(). This method takes a to-do ID as an argument and removes the corresponding to-do from the database
         """Remove a To-Do from the database using its id of index"""
-        read = self._db_handler.read_todos()                                            # reads the to-do list
-        if read.error:                                                                  # checks if any error occurs during the reading process
-            return CurrentTodo({}, read.error)
-        try:                                                                            # try...except block to catch invalid ID input from user
-            todo = read.todo_list.pop(todo_id - 1)                                      # removes the to-do at index todo_id - 1 from the to-do list
-        except IndexError:
-            return CurrentTodo({}, ID_ERROR)
-        write = self._db_handler.write_todos(read.todo_list)                            # writes the updated to-do list back to the database
-        return CurrentTodo(todo, write.error)                                           # returns a CurrentTodo tuple holding the removed to-do and a return code indicating a successful operation
+        write = self._commit({"op": "remove", "ids": [todo_id]})                        # removes the to-do with the ID todo_id through the database handler. The other to-dos keep their IDs.
+        return CurrentTodo(write.todo_list[0] if write.todo_list else {}, write.error)  # returns a CurrentTodo tuple holding the removed to-do and a return code indicating a successful operation
 
     def remove_all(self) -> CurrentTodo:                                                # removes all the to-dos from the database by replacing the current to-do list with an empty list
         """Clear entire list of to-dos"""
-        write = self._db_handler.write_todos([])
-        return CurrentTodo({}, write.error)                                             # For consistency, the method returns a CurrentTodo tuple with an empty dictionary and an appropriate return or error code
\ No newline at end of file
+        write = self._commit({"op": "clear"})
+        return CurrentTodo({}, write.error)                                             # For consistency, the method returns a CurrentTodo tuple with an empty dictionary and an appropriate return or error code
+
+    def add_many(
+        self,
+        descriptions: List[List[str]],
+        priority: int = 2,
+        due: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+    ) -> CurrentTodos:                                                                  # the batch methods read and write the database once for the whole batch
+        """Add several to-dos to the database"""
+        todos = [new_todo(description, priority, due, tags) for description in descriptions]
+        write = self._commit({"op": "add", "todos": todos})
+        return CurrentTodos(write.todo_list or todos, write.error)
+
+    def set_done_many(self, todo_ids: List[int]) -> CurrentTodos:
+        """Set several to-dos as done"""
+        write = self._commit({"op": "update", "ids": todo_ids, "set": {"Done": True}})
+        return CurrentTodos(write.todo_list, write.error)
+
+    def set_undone_many(self, todo_ids: List[int]) -> CurrentTodos:
+        """Set several to-dos as not done"""
+        write = self._commit({"op": "update", "ids": todo_ids, "set": {"Done": False}})
+        return CurrentTodos(write.todo_list, write.error)
+
+    def remove_many(self, todo_ids: List[int]) -> CurrentTodos:
+        """Remove several to-dos from the database"""
+        write = self._commit({"op": "remove", "ids": todo_ids})                         # a batch holding an invalid ID fails with ID_ERROR and changes nothing
+        return CurrentTodos(write.todo_list, write.error)
+
+    def import_todos(self, todos: Iterable[Dict[str, Any]], chunk_size: int = IMPORT_CHUNK_ROWS) -> CountResponse:  # todos may be a generator reading a file, which is then consumed a chunk at a time
+        """Add many to-dos, writing them chunk_size at a time"""
+        from todo.transfer import chunked
+        with exclusive_lock(self._db_path), trace.span("db.import") as span:            # the import is a single writer: other commands wait for it, as for any commit
+            imported = self._db_handler.import_todos(chunked(todos, chunk_size))
+            span.add(rows=imported.count)
+        if imported.count:
+            for index in (self._text_index, self._sort_index, self._bitmap_index, self._due_index):
+                index.drop()                                                            # rebuilt by their next use, which costs less than updating them row by row
+        return imported
+
+    def archive(
+        self, compression: str = "gz", done_over: Optional[float] = None, min_done: int = 1
+    ) -> CountResponse:                                                                 # done_over is the share of done to-dos, in percent, the list must exceed for anything to be archived
+        """Move the done to-dos into a new compressed segment of the archive and return how many were moved"""
+        from todo.archive import Archive
+        with exclusive_lock(self._db_path), trace.span("db.archive") as span:           # no writer marks a to-do undone between writing the segment and removing its to-dos
+            read = self._db_handler.read_todos()
+            if read.error:
+                return CountResponse(0, read.error)
+            todo_list = read.todo_list
+            live = live_todos(todo_list)
+            done = [todo for todo in live if todo["Done"]]
+            if len(done) < max(min_done, 1) or (done_over is not None and len(done) * 100 <= done_over * len(live)):
+                return CountResponse(0, SUCCESS)
+            try:
+                segment = Archive(self._db_path).write_segment(done, compression)       # written first: a crash before the database is rewritten leaves the to-dos in both places, never in neither
+            except OSError:
+                return CountResponse(0, DB_WRITE_ERROR)
+            op = {"op": "remove", "ids": [todo["ID"] for todo in done]}
+            counters = self._db_handler.read_counts()
+            removed = apply_counted(todo_list, op, slot_index(todo_list), counters)
+            def rewrite(ops: List[Dict[str, Any]]) -> List[DBResponse]:                 # the whole list is written again, which drops the archived to-dos from the file instead of leaving tombstones or deleted records behind
+                return [removed._replace(error=self._db_handler.write_todos(todo_list, counters).error)]
+            error = self._commit_group([op], rewrite)[0].error
+            if error:
+                segment.unlink(missing_ok=True)                                         # the to-dos are still in the database
+                return CountResponse(0, error)
+            span.add(rows=len(done))
+        return CountResponse(len(done), SUCCESS)
+
+    def commit_ops(self, ops: List[Dict[str, Any]]) -> List[DBResponse]:                # for writers that gather their own groups, such as todo.aio.AsyncTodoer
+        """Apply several mutations with one read-modify-write under the database lock, one response per mutation"""
+        with exclusive_lock(self._db_path):
+            responses = self._commit_group(ops)
+        self._auto_archive(ops, responses)
+        return responses
+
+    def run_batch(self, ops: List[Dict[str, Any]], dry_run: bool = False) -> List[DBResponse]:  # all or nothing: the mutations are tried on the list in memory, and written only when every one of them succeeds
+        """Apply several mutations with one read and one write if none fails, one response per mutation"""
+        with exclusive_lock(self._db_path):                                             # no other writer changes the list between the try and the write
+            read = self._db_handler.read_todos()
+            if read.error:
+                return [DBResponse([], read.error) for _ in ops]
+            todo_list = read.todo_list
+            counters = self._db_handler.read_counts()
+            slots = slot_index(todo_list)
+            responses = [apply_counted(todo_list, op, slots, counters) for op in ops]
+            if dry_run or any(response.error for response in responses):
+                return responses
+            def persist(ops: List[Dict[str, Any]]) -> List[DBResponse]:                 # the list already holds the mutations, so it is written without being read again
+                error = self._db_handler.persist(ops, todo_list, counters)
+                return [response._replace(error=error) for response in responses]
+            responses = self._commit_group(ops, persist)
+        self._auto_archive(ops, responses)
+        return responses
+
+    def _commit(self, op: Dict[str, Any]) -> DBResponse:                                # every mutation goes through the group commit, which holds the database lock for the whole read-modify-write
+        response = self._group_commit.submit(op, self._commit_group)
+        self._auto_archive([op], [response])
+        return response
+
+    def _auto_archive(self, ops: List[Dict[str, Any]], responses: List[DBResponse]) -> None:  # called once the database lock is released, after mutations that may have marked to-dos done
+        if not any(op["op"] == "update" and op["set"].get("Done") and not response.error for op, response in zip(ops, responses)):
+            return
+        from todo.archive import AUTO_ARCHIVE_MIN_DONE, read_policy
+        done_over = read_policy(self._db_path)                                          # the policy set by "todo archive --auto"
+        if done_over is None:
+            return
+        counters = self._db_handler.read_counts()
+        if counters is not None:                                                        # the counters answer without reading the list, which most mutations leave below the policy
+            totals = stats_of(counters)
+            if totals.done < AUTO_ARCHIVE_MIN_DONE or totals.done * 100 <= done_over * totals.total:
+                return
+        self.archive(done_over=done_over, min_done=AUTO_ARCHIVE_MIN_DONE)               # checked again under the lock, against the list itself
+
+    @trace.traced("commit")
+    def _commit_group(self, ops: List[Dict[str, Any]], commit: Optional[Commit] = None) -> List[DBResponse]:  # runs under the database lock, for this writer's mutation and those queued by other writers
+        indexes = [
+            index for index in (self._text_index, self._sort_index, self._bitmap_index, self._due_index) if index.exists()
+        ]                                                                               # nothing to maintain until the first search, query, big sort or "todo due" has built an index
+        fresh = [self._index_is_current(index) for index in indexes]
+        responses = (commit or self._db_handler.commit)(ops)
+        for index, index_fresh in zip(indexes, fresh):
+            self._update_index(index, index_fresh, ops, responses)
+        return responses
+
+    def _index_is_current(self, index: "Index") -> bool:                                # checked before every commit: only an index that matched the database beforehand can be updated incrementally
+        return index.exists() and index.is_current(self._db_handler.stamp())
+
+    def _update_index(
+        self, index: "Index", fresh: bool, ops: List[Dict[str, Any]], responses: List[DBResponse]
+    ) -> None:
+        import sqlite3
+        if fresh and all(response.error in (SUCCESS, ID_ERROR) for response in responses):  # mutations rejected for an invalid ID changed nothing
+            stamp = self._db_handler.stamp()                                            # records the database stamp after the commit along with the changes
+            try:
+                for op, response in zip(ops, responses):
+                    if not response.error:
+                        _index_op(index, op, response, stamp)
+                return
+            except (sqlite3.Error, OSError):
+                pass
+        if not self._index_is_current(index):                                           # a group whose mutations were all rejected leaves both the database and the index as they were
+            index.drop()                                                                # otherwise the stale index is thrown away and rebuilt when it is next needed
+
+def _index_op(
+    index: Index, op: Dict[str, Any], response: DBResponse, stamp: Optional[Tuple[int, ...]]
+) -> None:
+    kind = op["op"]
+    if kind == "add":
+        index.add(response.todo_list, stamp)                                            # the added to-dos as numbered by the database
+    elif kind == "update":
+        index.update(op["ids"], op["set"], stamp)
+    elif kind == "remove":
+        index.remove(op["ids"], stamp)
+    else:
+        index.clear(stamp)
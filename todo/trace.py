@@ -0,0 +1,173 @@
+"""This module times the phases of a command for --profile and TODO_TRACE"""
+# todo/trace.py
+
+import functools
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+TRACE_ENV = "TODO_TRACE"                                                            # path of a JSON lines file every traced command appends its spans to
+SAMPLE_ENV = "TODO_TRACE_SAMPLE"                                                    # share of the commands traced with TODO_TRACE, from 0 to 1. Default: 1
+MEMORY_ENV = "TODO_TRACE_MEMORY"                                                    # "0" leaves out peak_bytes: tracemalloc makes allocation-heavy phases several times slower
+
+Function = TypeVar("Function", bound=Callable[..., Any])
+
+class Span:                                                                         # one named phase: its wall time, the bytes it read and wrote and the memory it allocated at its peak
+    __slots__ = ("name", "depth", "start", "counts", "base", "peak")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.counts: Dict[str, int] = {}
+
+    def add(self, **counts: int) -> None:                                           # e.g. span.add(bytes_read=size)
+        for key, value in counts.items():
+            self.counts[key] = self.counts.get(key, 0) + value
+
+    def __enter__(self) -> "Span":
+        _tracer.enter(self)
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        _tracer.exit(self)
+
+class _NoSpan:                                                                      # handed out while tracing is off, so an instrumented phase costs one call and a global lookup
+    __slots__ = ()
+
+    def add(self, **counts: int) -> None:
+        pass
+
+    def __enter__(self) -> "_NoSpan":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        pass
+
+NO_SPAN = _NoSpan()
+
+class _Tracer:
+    def __init__(self, output: Optional[str], command: str, memory: bool) -> None:
+        self.output = output                                                        # None for standard error
+        self.command = command
+        self.records: List[Dict[str, Any]] = []
+        self.stack: List[Span] = []
+        self.origin = time.perf_counter()
+        self._tracemalloc = None
+        self.started_tracemalloc = False
+        if memory:
+            import tracemalloc                                                      # only traced commands pay for tracking allocations
+            self._tracemalloc = tracemalloc
+            self.started_tracemalloc = not tracemalloc.is_tracing()
+            if self.started_tracemalloc:
+                tracemalloc.start()
+
+    def enter(self, span: Span) -> None:
+        span.depth = len(self.stack)
+        if self._tracemalloc is not None:
+            current, peak = self._tracemalloc.get_traced_memory()
+            for outer in self.stack:                                                # the peak is reset for the new span, so the spans around it keep the peak reached so far
+                outer.peak = max(outer.peak, peak)
+            self._tracemalloc.reset_peak()
+            span.base = span.peak = current
+        self.stack.append(span)
+        span.start = time.perf_counter()
+
+    def exit(self, span: Span) -> None:
+        end = time.perf_counter()
+        self.stack.pop()
+        record = {
+            "command": self.command,
+            "span": span.name,
+            "depth": span.depth,
+            "start_ms": round((span.start - self.origin) * 1000, 3),
+            "wall_ms": round((end - span.start) * 1000, 3),
+        }
+        if self._tracemalloc is not None:
+            span.peak = max(span.peak, self._tracemalloc.get_traced_memory()[1])
+            if self.stack:
+                self.stack[-1].peak = max(self.stack[-1].peak, span.peak)
+            record["peak_bytes"] = span.peak - span.base                            # allocated beyond what was live when the span started
+        record.update(span.counts)
+        self.records.append(record)
+
+    def stop(self) -> None:
+        if self.started_tracemalloc:
+            self._tracemalloc.stop()
+
+    def write(self) -> None:
+        pid = os.getpid()
+        lines = "".join(json.dumps({**record, "pid": pid}) + "\n" for record in self.records)
+        if self.output is None:
+            sys.stderr.write(lines)
+            sys.stderr.flush()
+            return
+        try:
+            with open(self.output, "a") as trace_file:                              # one write per command, so concurrent commands don't interleave their lines
+                trace_file.write(lines)
+        except OSError:                                                             # tracing never makes a command fail
+            pass
+
+_tracer: Optional[_Tracer] = None
+_root: Optional[Span] = None
+
+def enabled() -> bool:
+    return _tracer is not None
+
+def span(name: str) -> Any:                                                         # a Span, or NO_SPAN while tracing is off
+    """Return a context manager timing the phase called name"""
+    if _tracer is None:
+        return NO_SPAN
+    return Span(name)
+
+def traced(name: str) -> Callable[[Function], Function]:
+    """Decorate a function to run as the span called name"""
+    def decorate(function: Function) -> Function:
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if _tracer is None:
+                return function(*args, **kwargs)
+            with Span(name):
+                return function(*args, **kwargs)
+        return wrapper                                                              # type: ignore
+    return decorate
+
+def add(**counts: int) -> None:
+    """Add to the counts, such as bytes_read, of the innermost open span"""
+    if _tracer is not None and _tracer.stack:
+        _tracer.stack[-1].add(**counts)
+
+def start(command: str, profile: bool = False) -> None:
+    """Trace the rest of the command, to standard error with profile set, or to the TODO_TRACE file"""
+    global _tracer, _root
+    if _tracer is not None:
+        return
+    output = None
+    if not profile:
+        output = os.environ.get(TRACE_ENV)
+        if not output or not _sampled(os.environ.get(SAMPLE_ENV)):
+            return
+    _tracer = _Tracer(output, command, os.environ.get(MEMORY_ENV) != "0")
+    _root = Span("command")                                                         # spans the whole command, so the other spans can be compared with it
+    _root.__enter__()
+
+def finish() -> None:
+    """Write the spans of the traced command and stop tracing"""
+    global _tracer, _root
+    if _tracer is None:
+        return
+    tracer, root = _tracer, _root
+    root.__exit__(None, None, None)
+    _tracer = _root = None
+    tracer.stop()
+    tracer.write()
+
+def _sampled(rate: Optional[str]) -> bool:
+    if rate is None:
+        return True
+    try:
+        share = float(rate)
+    except ValueError:
+        return True
+    import random
+    return random.random() < share
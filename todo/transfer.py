@@ -0,0 +1,112 @@
+"""This module reads the to-dos of the import command from JSON lines or CSV"""
+# todo/transfer.py
+
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, TypeVar
+
+from todo.todo import MAX_PRIORITY, MIN_PRIORITY, new_todo, parse_due, parse_tag
+
+IMPORT_FORMATS = ("jsonl", "csv", "tsv")                                            # every value accepted by the --format option of "todo import"
+TRUE_WORDS = ("true", "yes", "1")                                                   # values of the Done column read as done, ignoring case
+FALSE_WORDS = ("false", "no", "0", "")
+
+Item = TypeVar("Item")
+
+class RowError(NamedTuple):                                                         # a row that was skipped, with its line number in the file
+    line: int
+    message: str
+
+def guess_format(path: Path) -> Optional[str]:
+    """Return the import format named by the extension of a file, if any"""
+    suffix = path.suffix.lower().lstrip(".")
+    if suffix in ("jsonl", "ndjson"):
+        return "jsonl"
+    return suffix if suffix in ("csv", "tsv") else None
+
+def read_todos(lines: Iterable[str], file_format: str, errors: List[RowError]) -> Iterator[Dict[str, Any]]:  # a generator, so the file is read as the to-dos are committed
+    """Yield the to-dos of a JSON lines or CSV file, appending the rows that aren't valid to errors"""
+    for line_number, record in _records(lines, file_format):
+        try:
+            yield parse_todo(record)
+        except ValueError as error:
+            errors.append(RowError(line_number, str(error)))
+
+def parse_todo(record: Any) -> Dict[str, Any]:                                      # Description is required, Priority defaults to 2, Done to false and Due and Tags to none, like "todo add". Other keys, such as the ID of an export, are ignored.
+    """Return the to-do described by one record, or raise ValueError"""
+    if not isinstance(record, dict):
+        raise ValueError("expected an object with a Description")
+    if "Description" in record:                                                     # the capitalised keys of an export, which need no lowercasing
+        fields = {
+            "description": record["Description"],
+            "priority": record.get("Priority", 2),
+            "done": record.get("Done", False),
+            "due": record.get("Due"),
+            "tags": record.get("Tags"),
+        }
+    else:
+        fields = {str(key).lower(): value for key, value in record.items()}
+    description = fields.get("description")
+    if not isinstance(description, str) or not description.strip():
+        raise ValueError("the description is missing")
+    priority = _priority(fields.get("priority", 2))
+    due = fields.get("due")
+    todo = new_todo(
+        [description.strip()],
+        priority,
+        parse_due(str(due)) if due not in (None, "") else None,                     # an empty CSV cell means no due date
+        _tags(fields.get("tags")),
+    )                                                                               # descriptions get the same final "." as those typed on the command line
+    todo["Done"] = _done(fields.get("done", False))
+    return todo
+
+def chunked(items: Iterable[Item], size: int) -> Iterator[List[Item]]:
+    """Yield lists of up to size consecutive items"""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _records(lines: Iterable[str], file_format: str) -> Iterator[Tuple[int, Any]]:  # (line number, record) pairs
+    if file_format == "jsonl":
+        for line_number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except ValueError:
+                yield line_number, None                                             # reported by parse_todo() like any other invalid row
+        return
+    import csv                                                                      # only the csv and tsv formats need it
+    reader = csv.DictReader(lines, delimiter="," if file_format == "csv" else "\t")  # the first row names the columns, as in the output of "todo export"
+    for record in reader:
+        yield reader.line_num, record
+
+def _priority(value: Any) -> int:
+    if value is None or value == "":                                                # an empty CSV cell
+        return 2
+    if isinstance(value, str) and value.strip().lstrip("-").isdigit():
+        value = int(value)
+    if not isinstance(value, int) or isinstance(value, bool) or not MIN_PRIORITY <= value <= MAX_PRIORITY:
+        raise ValueError(f"the priority must be a number from {MIN_PRIORITY} to {MAX_PRIORITY}, not {value!r}")
+    return value
+
+def _tags(value: Any) -> List[str]:                                                 # a list, as exported, or a string of tags separated by commas or spaces, as in a CSV cell
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = value.replace(",", " ").split()
+    if not isinstance(value, list) or not all(isinstance(tag, str) for tag in value):
+        raise ValueError(f"the tags must be a list of words, not {value!r}")
+    return [parse_tag(tag) for tag in value]
+
+def _done(value: Any) -> bool:
+    if value is None or isinstance(value, bool):
+        return bool(value)
+    if isinstance(value, str) and value.strip().lower() in TRUE_WORDS + FALSE_WORDS:
+        return value.strip().lower() in TRUE_WORDS
+    raise ValueError(f"done must be true or false, not {value!r}")